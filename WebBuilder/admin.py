@@ -9,7 +9,7 @@ from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils.html import format_html
 
-from .models import APIRequest, GeneratedSite, GenerationLog
+from .models import APIRequest, GeneratedSite, GenerationJob, GenerationLog
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -91,7 +91,7 @@ class APIRequestAdmin(admin.ModelAdmin):
     date_hierarchy = "date"
     search_fields  = ("api_url", "user__username", "user__email")
     ordering       = ("-date",)
-    list_select_related = ("user",)
+    list_select_related = ("user", "raw_blob", "parsed_blob")
     list_per_page  = 40
     actions = ["mark_pending"]
 
@@ -122,7 +122,7 @@ class APIRequestAdmin(admin.ModelAdmin):
         "edit_link",
     )
 
-    exclude = ("raw_data", "parsed_data", "field_mapping")
+    exclude = ("raw_data", "parsed_data", "raw_blob", "parsed_blob", "field_mapping", "analysis", "analysis_key")
 
     @admin.display(description="Estado")
     def status_badge(self, obj):
@@ -136,24 +136,34 @@ class APIRequestAdmin(admin.ModelAdmin):
 
     @admin.display(description="Chars")
     def raw_chars(self, obj):
+        if obj.raw_blob_id:
+            return obj.raw_blob.size
         return len(obj.raw_data or "")
 
     @admin.display(description="Fmt")
     def fmt(self, obj):
-        raw = (obj.raw_data or "").lstrip()
+        if obj.detected_format:
+            return obj.detected_format
+        raw = (obj.get_raw_data() or "")[:64].lstrip()
         if raw.startswith(("{", "[")): return "json"
         if raw.startswith("<"): return "xml"
         return "-"
 
     @admin.display(description="Raíz")
     def root_type(self, obj):
-        if isinstance(obj.parsed_data, dict): return "dict"
-        if isinstance(obj.parsed_data, list): return "list"
+        if obj.analysis:
+            return obj.analysis.get("root_type") or "-"
+        data = obj.get_parsed_data()
+        if isinstance(data, dict): return "dict"
+        if isinstance(data, list): return "list"
         return "-"
 
     @admin.display(description="Items")
     def main_items_hint(self, obj):
-        data = obj.parsed_data
+        main = (obj.analysis or {}).get("main_collection") or {}
+        if main.get("found"):
+            return f"{main.get('path_display')} ({main.get('count')})"
+        data = obj.get_parsed_data()
         if isinstance(data, list):
             return f"root list ({len(data)})"
         if isinstance(data, dict):
@@ -184,11 +194,13 @@ class APIRequestAdmin(admin.ModelAdmin):
 
     @admin.display(description="Raw data")
     def raw_data_pretty(self, obj):
-        return _pre(_truncate(obj.raw_data or "", 8000)) if obj.raw_data else "—"
+        raw = obj.get_raw_data()
+        return _pre(_truncate(raw, 8000)) if raw else "—"
 
     @admin.display(description="Parsed data")
     def parsed_data_pretty(self, obj):
-        return _pre(_pretty_json(obj.parsed_data)) if obj.parsed_data is not None else "—"
+        data = obj.get_parsed_data()
+        return _pre(_pretty_json(data)) if data is not None else "—"
 
     @admin.display(description="Field mapping")
     def field_mapping_pretty(self, obj):
@@ -437,4 +449,39 @@ class GenerationLogAdmin(admin.ModelAdmin):
 
     @admin.display(description="Errores de consistencia")
     def consistency_errors_pretty(self, obj):
-        return _pre(_pretty_json(obj.consistency_errors)) if obj.consistency_errors else "—"
\ No newline at end of file
+        return _pre(_pretty_json(obj.consistency_errors)) if obj.consistency_errors else "—"
+
+
+# ══════════════════════════════════════════════════════════════════
+# GenerationJob — cola de generación
+# ══════════════════════════════════════════════════════════════════
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+
+    list_display = (
+        "id",
+        "site",
+        "status_badge",
+        "mode",
+        "attempts",
+        "worker",
+        "heartbeat_at",
+        "created_at",
+    )
+
+    list_filter   = ("status", "mode", "created_at")
+    search_fields = ("site__project_name", "worker")
+    ordering      = ("-created_at",)
+    list_per_page = 50
+    readonly_fields = ("created_at", "started_at", "finished_at", "heartbeat_at", "checkpoint_steps")
+    exclude = ("checkpoint",)
+
+    @admin.display(description="Pasos guardados")
+    def checkpoint_steps(self, obj):
+        return ", ".join(obj.checkpoint or {}) or "—"
+
+    @admin.display(description="Estado")
+    def status_badge(self, obj):
+        colors = {"queued": "blue", "running": "purple", "done": "green", "failed": "red", "cancelled": "gray"}
+        return _badge(obj.get_status_display(), colors.get(obj.status, "gray"))
@@ -51,7 +51,7 @@ class APIRequestForm(forms.ModelForm):
         required=False,
         widget=forms.FileInput(attrs={
             "class": "form-control",
-            "accept": ".json,.xml,.csv,.geojson",
+            "accept": ".json,.ndjson,.jsonl,.xml,.csv,.geojson",
         })
     )
 
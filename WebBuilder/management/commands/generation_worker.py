@@ -0,0 +1,166 @@
+"""
+generation_worker — Procesa la cola de generaciones (GenerationJob).
+
+Uso:
+    python manage.py generation_worker [--threads N] [--poll S] [--once] [--async]
+
+Cada hilo reclama un job, lo ejecuta y vuelve a por el siguiente. Con
+--async no hay un hilo por generación: las N son tareas de un único event
+loop (arun_job) y pueden ser muchas más con la misma memoria. Un hilo
+aparte marca el latido de los jobs en marcha y recupera los huérfanos de
+workers caídos. Con SIGTERM/SIGINT deja de reclamar y espera a que terminen
+las generaciones en curso.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from ...utils.generator.jobs import arun_job, claim_next_job, heartbeat, recover_orphans, run_job
+from ...utils.llm.client import aclose_async_clients
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Ejecuta las generaciones encoladas (GenerationJob) fuera del servidor web."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=getattr(settings, "GENERATION_WORKER_THREADS", 2),
+                            help="Generaciones simultáneas en este proceso.")
+        parser.add_argument("--poll", type=float, default=2.0,
+                            help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument("--once", action="store_true",
+                            help="Procesa los jobs listos y termina.")
+        parser.add_argument("--async", action="store_true", dest="use_async",
+                            help="Generaciones como tareas de un event loop (--threads = cuántas a la vez).")
+
+    def handle(self, *args, **options):
+        threads = max(1, options["threads"])
+        poll = max(0.1, options["poll"])
+        once = options["once"]
+
+        self._stop = threading.Event()
+        self._running: dict[int, int] = {}   # hilo (o tarea async) -> id del job en marcha
+        self._lock = threading.Lock()
+        base_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self._request_stop)
+            signal.signal(signal.SIGINT, self._request_stop)
+
+        recover_orphans()
+        close_old_connections()
+
+        beat = threading.Thread(target=self._heartbeat_loop, name="generation-heartbeat", daemon=True)
+        beat.start()
+
+        if options["use_async"]:
+            self.stdout.write(f"[generation_worker] {base_id} con {threads} tarea(s) async")
+            asyncio.run(self._async_main(base_id, threads, poll, once))
+        else:
+            workers = [
+                threading.Thread(target=self._work_loop, args=(f"{base_id}:{i}", poll, once), name=f"generation-{i}")
+                for i in range(threads)
+            ]
+            for worker in workers:
+                worker.start()
+            self.stdout.write(f"[generation_worker] {base_id} con {threads} hilo(s)")
+
+            for worker in workers:
+                worker.join()
+        self._stop.set()
+        beat.join()
+        self.stdout.write("[generation_worker] Detenido")
+
+    def _request_stop(self, signum, frame):
+        logger.info("[generation_worker] Señal %s: terminando los jobs en curso", signum)
+        self._stop.set()
+
+    # Bucle de cada hilo: reclamar → ejecutar → repetir (espera `poll` si no hay nada)
+    def _work_loop(self, worker_id: str, poll: float, once: bool) -> None:
+        while not self._stop.is_set():
+            close_old_connections()
+            try:
+                job = claim_next_job(worker_id)
+            except Exception:
+                logger.exception("[generation_worker] Error reclamando job")
+                job = None
+
+            if job is None:
+                if once:
+                    break
+                self._stop.wait(poll)
+                continue
+
+            ident = threading.get_ident()
+            with self._lock:
+                self._running[ident] = job.pk
+            try:
+                run_job(job)
+            except Exception:
+                # run_job ya gestiona los errores de la generación; esto es un fallo de DB
+                logger.exception("[generation_worker] Error ejecutando job #%s", job.pk)
+            finally:
+                with self._lock:
+                    self._running.pop(ident, None)
+        close_old_connections()
+
+    async def _async_main(self, base_id: str, tasks: int, poll: float, once: bool) -> None:
+        try:
+            await asyncio.gather(*(
+                self._async_work_loop(f"{base_id}:{i}", i, poll, once) for i in range(tasks)
+            ))
+        finally:
+            await aclose_async_clients()
+
+    # Igual que _work_loop pero como tarea del event loop (en _running, clave = nº de tarea)
+    async def _async_work_loop(self, worker_id: str, slot: int, poll: float, once: bool) -> None:
+        while not self._stop.is_set():
+            try:
+                job = await sync_to_async(claim_next_job)(worker_id)
+            except Exception:
+                logger.exception("[generation_worker] Error reclamando job")
+                job = None
+
+            if job is None:
+                if once:
+                    break
+                await asyncio.sleep(poll)
+                continue
+
+            with self._lock:
+                self._running[slot] = job.pk
+            try:
+                await arun_job(job)
+            except Exception:
+                logger.exception("[generation_worker] Error ejecutando job #%s", job.pk)
+            finally:
+                with self._lock:
+                    self._running.pop(slot, None)
+
+    # Latido de los jobs en marcha + recuperación periódica de huérfanos
+    def _heartbeat_loop(self) -> None:
+        interval = getattr(settings, "GENERATION_HEARTBEAT_SECONDS", 15)
+        ticks = 0
+        while not self._stop.wait(interval):
+            close_old_connections()
+            try:
+                with self._lock:
+                    job_ids = list(self._running.values())
+                heartbeat(job_ids)
+                ticks += 1
+                if ticks % 4 == 0:
+                    recover_orphans()
+            except Exception:
+                logger.exception("[generation_worker] Error en el latido")
+        close_old_connections()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebBuilder', '0016_userprofile_preferred_language'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apirequest',
+            name='ingest_meta',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebBuilder', '0017_apirequest_ingest_meta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apirequest',
+            name='detected_format',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
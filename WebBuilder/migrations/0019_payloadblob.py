@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:18
+
+import hashlib
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Mueve raw_data / parsed_data de las filas existentes a blobs deduplicados
+def move_payloads_to_blobs(apps, schema_editor):
+    APIRequest = apps.get_model('WebBuilder', 'APIRequest')
+    PayloadBlob = apps.get_model('WebBuilder', 'PayloadBlob')
+
+    def store(payload):
+        digest = hashlib.sha256(payload).hexdigest()
+        if not PayloadBlob.objects.filter(sha256=digest).exists():
+            compressed = zlib.compress(payload, 6)
+            PayloadBlob.objects.create(
+                sha256=digest, data=compressed, size=len(payload), stored_size=len(compressed),
+            )
+        return digest
+
+    rows = APIRequest.objects.filter(
+        models.Q(raw_data__isnull=False) | models.Q(parsed_data__isnull=False)
+    ).only('id', 'raw_data', 'parsed_data')
+    for row in rows.iterator(chunk_size=50):
+        raw_id = store(row.raw_data.encode('utf-8')) if row.raw_data else None
+        parsed_id = None
+        if row.parsed_data is not None:
+            text = json.dumps(row.parsed_data, ensure_ascii=False, separators=(',', ':'))
+            parsed_id = store(text.encode('utf-8'))
+        APIRequest.objects.filter(id=row.id).update(
+            raw_blob_id=raw_id, parsed_blob_id=parsed_id, raw_data=None, parsed_data=None,
+        )
+
+
+# Inverso: vuelve a copiar el contenido de los blobs en raw_data / parsed_data
+def move_blobs_to_payloads(apps, schema_editor):
+    APIRequest = apps.get_model('WebBuilder', 'APIRequest')
+    PayloadBlob = apps.get_model('WebBuilder', 'PayloadBlob')
+
+    def read(digest):
+        blob = PayloadBlob.objects.filter(sha256=digest).only('data').first()
+        return zlib.decompress(bytes(blob.data)).decode('utf-8') if blob else None
+
+    rows = APIRequest.objects.filter(
+        models.Q(raw_blob__isnull=False) | models.Q(parsed_blob__isnull=False)
+    ).only('id', 'raw_blob_id', 'parsed_blob_id')
+    for row in rows.iterator(chunk_size=50):
+        raw_data = read(row.raw_blob_id) if row.raw_blob_id else None
+        parsed_text = read(row.parsed_blob_id) if row.parsed_blob_id else None
+        APIRequest.objects.filter(id=row.id).update(
+            raw_data=raw_data,
+            parsed_data=json.loads(parsed_text) if parsed_text is not None else None,
+            raw_blob=None,
+            parsed_blob=None,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebBuilder', '0018_apirequest_detected_format'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayloadBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('stored_size', models.PositiveBigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='apirequest',
+            name='parsed_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='parsed_requests', to='WebBuilder.payloadblob'),
+        ),
+        migrations.AddField(
+            model_name='apirequest',
+            name='raw_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='raw_requests', to='WebBuilder.payloadblob'),
+        ),
+        migrations.RunPython(move_payloads_to_blobs, move_blobs_to_payloads),
+    ]
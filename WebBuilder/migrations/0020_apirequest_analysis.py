@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebBuilder', '0019_payloadblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apirequest',
+            name='analysis',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='apirequest',
+            name='analysis_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
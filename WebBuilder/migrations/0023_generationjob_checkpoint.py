@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebBuilder', '0022_generationjob_reuse_steps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
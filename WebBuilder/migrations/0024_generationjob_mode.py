@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebBuilder', '0023_generationjob_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='mode',
+            field=models.CharField(choices=[('llm', 'Con IA'), ('fast', 'Rápida (sin IA)')], default='llm', max_length=10),
+        ),
+    ]
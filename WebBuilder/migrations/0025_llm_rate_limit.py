@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebBuilder', '0024_generationjob_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMRateBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('requests', models.FloatField(default=0)),
+                ('tokens', models.FloatField(default=0)),
+                ('blocked_until', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LLMRateTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_key', models.CharField(max_length=255)),
+                ('user_key', models.CharField(blank=True, default='', max_length=64)),
+                ('round', models.PositiveIntegerField(default=0)),
+                ('seen_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_key', 'round', 'id'], name='WebBuilder__bucket__f273df_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+import json
+import zlib
+
+from django.db import migrations, models
+
+
+# Detección mínima congelada aquí (la migración no debe depender del sniffer):
+# mismas reglas que parse_raw, pero parseando el JSON entero de cada fila
+def _detect_format(text):
+    stripped = text.lstrip('\ufeff \t\r\n')
+    if not stripped:
+        return 'unknown'
+    first = stripped[0]
+    if first == '{':
+        try:
+            data = json.loads(stripped)
+        except json.JSONDecodeError as exc:
+            return 'ndjson' if exc.msg == 'Extra data' else 'json'
+        return 'geojson' if data.get('type') == 'FeatureCollection' else 'json'
+    if first == '[':
+        return 'json'
+    if first == '<':
+        return 'xml'
+    first_line = stripped.split('\n', 1)[0]
+    if ',' in first_line or ';' in first_line:
+        return 'csv'
+    return 'unknown'
+
+
+# Rellena detected_format en las filas anteriores a 0018 a partir del raw guardado
+def backfill_detected_format(apps, schema_editor):
+    APIRequest = apps.get_model('WebBuilder', 'APIRequest')
+    PayloadBlob = apps.get_model('WebBuilder', 'PayloadBlob')
+
+    def raw_text(row):
+        if row.raw_blob_id:
+            blob = PayloadBlob.objects.filter(sha256=row.raw_blob_id).only('data').first()
+            return zlib.decompress(bytes(blob.data)).decode('utf-8', errors='replace') if blob else None
+        return row.raw_data
+
+    rows = APIRequest.objects.filter(detected_format='').filter(
+        models.Q(raw_blob__isnull=False) | models.Q(raw_data__isnull=False)
+    ).only('id', 'raw_blob_id', 'raw_data')
+    for row in rows.iterator(chunk_size=50):
+        text = raw_text(row)
+        if text:
+            APIRequest.objects.filter(id=row.id).update(detected_format=_detect_format(text))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebBuilder', '0026_llm_response_cache'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_detected_format, migrations.RunPython.noop),
+    ]
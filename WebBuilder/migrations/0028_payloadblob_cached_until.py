@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:29
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Los blobs que ya no referencia ningún APIRequest solo los retenía la cache de
+# GET condicional: se les da la caducidad de los validadores (7 días)
+def expire_unreferenced_blobs(apps, schema_editor):
+    PayloadBlob = apps.get_model('WebBuilder', 'PayloadBlob')
+    PayloadBlob.objects.filter(
+        raw_requests__isnull=True, parsed_requests__isnull=True,
+    ).update(cached_until=timezone.now() + timedelta(days=7))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebBuilder', '0027_backfill_detected_format'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payloadblob',
+            name='cached_until',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(expire_unreferenced_blobs, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,107 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+import hashlib
+import json
 import uuid
+import zlib
 from encrypted_model_fields.fields import EncryptedCharField
 
 
+# Payload comprimido (zlib) direccionado por contenido: la clave es el SHA-256
+# de los bytes sin comprimir, así que el mismo payload se guarda una sola vez
+# aunque lo analicen muchos usuarios o se re-analice muchas veces.
+class PayloadBlob(models.Model):
+
+    sha256 = models.CharField(max_length=64, primary_key=True)                             # Hash del contenido
+    data = models.BinaryField()                                                             # Contenido comprimido
+    size = models.PositiveBigIntegerField(default=0)                                        # Bytes sin comprimir
+    stored_size = models.PositiveBigIntegerField(default=0)                                 # Bytes comprimidos
+    created_at = models.DateTimeField(auto_now_add=True)
+    cached_until = models.DateTimeField(null=True, blank=True, db_index=True)              # Lo retiene la cache de GET condicional hasta
+
+    # Guarda (o reutiliza) el blob de esos bytes
+    @classmethod
+    def store(cls, payload: bytes) -> "PayloadBlob":
+        digest = hashlib.sha256(payload).hexdigest()
+        blob = cls.objects.filter(sha256=digest).only("sha256", "size", "stored_size").first()
+        if blob is not None:
+            return blob
+        compressed = zlib.compress(payload, 6)
+        blob, _ = cls.objects.get_or_create(
+            sha256=digest,
+            defaults={"data": compressed, "size": len(payload), "stored_size": len(compressed)},
+        )
+        return blob
+
+    # Guarda un payload ya comprimido con zlib (p. ej. mientras se descargaba) que
+    # retiene la cache de GET condicional hasta `cached_until`
+    @classmethod
+    def store_compressed(cls, digest: str, compressed: bytes, size: int, *, cached_until) -> "PayloadBlob":
+        blob, created = cls.objects.get_or_create(
+            sha256=digest,
+            defaults={
+                "data": compressed, "size": size, "stored_size": len(compressed), "cached_until": cached_until,
+            },
+        )
+        if not created:
+            cls.objects.filter(sha256=digest).update(cached_until=cached_until)
+        return blob
+
+    # Guarda una estructura JSON (serialización compacta y estable)
+    @classmethod
+    def store_json(cls, value: object) -> "PayloadBlob":
+        text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        return cls.store(text.encode("utf-8"))
+
+    def read(self) -> bytes:
+        return zlib.decompress(bytes(self.data))
+
+    def read_json(self) -> object:
+        return json.loads(self.read())
+
+    # Blobs que nadie usa: sin APIRequest que los referencie y sin validadores vivos
+    @classmethod
+    def _unused(cls):
+        return cls.objects.filter(
+            models.Q(cached_until__isnull=True) | models.Q(cached_until__lt=timezone.now()),
+            raw_requests__isnull=True,
+            parsed_requests__isnull=True,
+        )
+
+    # Borra los blobs indicados que ya no usa nadie (devuelve cuántos)
+    @classmethod
+    def release(cls, *digests: str | None) -> int:
+        digests = [d for d in digests if d]
+        if not digests:
+            return 0
+        deleted, _ = cls._unused().filter(sha256__in=digests).delete()
+        return deleted
+
+    # La cache de GET condicional deja de retener estos blobs (y se borran si nadie más los usa)
+    @classmethod
+    def uncache(cls, *digests: str | None) -> int:
+        digests = [d for d in digests if d]
+        cls.objects.filter(sha256__in=digests).update(cached_until=None)
+        return cls.release(*digests)
+
+    # Borra los blobs de la cache de GET condicional ya caducados que no usa nadie.
+    # Los que no tienen cached_until se dejan: pueden ser de un análisis a medio guardar.
+    @classmethod
+    def purge_expired(cls) -> int:
+        deleted, _ = cls._unused().filter(cached_until__isnull=False).delete()
+        return deleted
+
+    # ¿Siguen existiendo todos estos blobs? (None = sin blob, siempre vale)
+    @classmethod
+    def all_exist(cls, *digests: str | None) -> bool:
+        digests = {d for d in digests if d}
+        return cls.objects.filter(sha256__in=digests).count() == len(digests)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes → {self.stored_size})"
+
+
 # Modelo para cada peticion URL
 class APIRequest(models.Model):
 
@@ -16,8 +114,18 @@ class APIRequest(models.Model):
     )   
 
     date = models.DateTimeField(auto_now_add=True)                                          # Fecha del análisis
-    raw_data = models.TextField(blank=True, null=True)                                      # Datos en crudo (raw)
-    parsed_data = models.JSONField(blank=True, null=True)                                   # Datos parseados
+    raw_data = models.TextField(blank=True, null=True)                                      # Datos en crudo (legacy, ahora en raw_blob)
+    parsed_data = models.JSONField(blank=True, null=True)                                   # Datos parseados (legacy, ahora en parsed_blob)
+    raw_blob = models.ForeignKey(                                                           # Datos en crudo (blob compartido)
+        PayloadBlob, on_delete=models.PROTECT, null=True, blank=True, related_name="raw_requests",
+    )
+    parsed_blob = models.ForeignKey(                                                        # Datos parseados (blob compartido)
+        PayloadBlob, on_delete=models.PROTECT, null=True, blank=True, related_name="parsed_requests",
+    )
+    ingest_meta = models.JSONField(blank=True, null=True)                                   # Estadisticas del ingest en streaming
+    detected_format = models.CharField(max_length=20, blank=True, default="")               # Formato detectado (cacheado)
+    analysis = models.JSONField(blank=True, null=True)                                      # Resultado de build_analysis (cacheado)
+    analysis_key = models.CharField(max_length=64, blank=True, default="")                  # Hash del payload con el que se calculó
 
     # Posibles estados del analisis
     STATUS_CHOICES = [
@@ -34,6 +142,41 @@ class APIRequest(models.Model):
 
     plan_accepted = models.BooleanField(default=False)                                      # Aceptacion del mapping del llm
 
+    # ── Payload (blobs con fallback a las columnas legacy) ──
+
+    # Guarda raw y parsed como blobs compartidos (no se copian en la fila)
+    def set_payload(self, raw_text: str | None, parsed: object) -> None:
+        self.raw_blob = PayloadBlob.store((raw_text or "").encode("utf-8")) if raw_text else None
+        self.parsed_blob = PayloadBlob.store_json(parsed) if parsed is not None else None
+        self.raw_data = None
+        self.parsed_data = None
+        self._parsed_cache = parsed
+
+    # Reutiliza los blobs de otro análisis del mismo payload
+    def share_payload(self, raw_blob_id: str | None, parsed_blob_id: str | None) -> None:
+        self.raw_blob_id = raw_blob_id
+        self.parsed_blob_id = parsed_blob_id
+        self.raw_data = None
+        self.parsed_data = None
+        self._parsed_cache = None
+
+    def get_raw_data(self) -> str | None:
+        if self.raw_blob_id:
+            return self.raw_blob.read().decode("utf-8", errors="replace")
+        return self.raw_data
+
+    # Descomprime una sola vez por instancia
+    def get_parsed_data(self) -> object:
+        if self.parsed_blob_id:
+            if getattr(self, "_parsed_cache", None) is None:
+                self._parsed_cache = self.parsed_blob.read_json()
+            return self._parsed_cache
+        return self.parsed_data
+
+    @property
+    def has_parsed_data(self) -> bool:
+        return bool(self.parsed_blob_id) or bool(self.parsed_data)
+
     # Representación en texto del objeto
     def __str__(self):
         return f"{self.api_url} ({self.user.username})"
@@ -99,6 +242,105 @@ class GeneratedSite(models.Model):
         return f"GeneratedSite #{self.id} — {self.project_name} ({self.public_id})"
 
 
+# Trabajo de generación persistente. Lo encolan las vistas y lo ejecuta el
+# comando `manage.py generation_worker` (fuera de gunicorn), así que un
+# reinicio o un timeout del worker web no deja generaciones colgadas.
+class GenerationJob(models.Model):
+
+    STATUS_CHOICES = [
+        ("queued",    "En cola"),
+        ("running",   "Ejecutándose"),
+        ("done",      "Terminado"),
+        ("failed",    "Fallido"),
+        ("cancelled", "Cancelado"),
+    ]
+
+    MODE_CHOICES = [
+        ("llm",  "Con IA"),
+        ("fast", "Rápida (sin IA)"),
+    ]
+
+    site = models.ForeignKey(
+        GeneratedSite,
+        on_delete=models.CASCADE,
+        related_name="generation_jobs",
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default="llm")    # "fast": determinista, sin LLM
+    attempts = models.PositiveIntegerField(default=0)                   # Intentos ya empezados
+    max_attempts = models.PositiveIntegerField(default=2)
+    run_after = models.DateTimeField(auto_now_add=True)                 # No se reclama antes (reintentos con espera)
+    cancel_requested = models.BooleanField(default=False)               # Cancelación cooperativa de un job en marcha
+    reuse_steps = models.BooleanField(default=True)                     # Reutilizar pasos cacheados cuyas entradas no cambian
+    checkpoint = models.JSONField(default=dict, blank=True)             # {paso: {key, outputs}} de los pasos ya terminados (reanudar)
+    worker = models.CharField(max_length=120, blank=True, default="")   # host:pid:hilo que lo ejecuta
+    heartbeat_at = models.DateTimeField(null=True, blank=True)          # Latido del worker (detecta huérfanos)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "run_after"])]
+
+    def __str__(self):
+        return f"Job #{self.id} — site {self.site_id} ({self.status}, intento {self.attempts}/{self.max_attempts})"
+
+
+# Token bucket compartido por todos los workers para un proveedor/modelo
+# (clave "base_url|modelo"). Lo gestiona utils/llm/rate_limit.py: cada llamada
+# al LLM consume una petición y sus tokens estimados; se rellena a ritmo de
+# LLM_RATE_LIMIT_RPM / LLM_RATE_LIMIT_TPM.
+class LLMRateBucket(models.Model):
+
+    key = models.CharField(max_length=255, unique=True)                 # "base_url|modelo"
+    requests = models.FloatField(default=0)                             # Peticiones disponibles
+    tokens = models.FloatField(default=0)                               # Tokens disponibles (negativo = deuda)
+    blocked_until = models.DateTimeField(null=True, blank=True)         # Retry-After del último 429
+    updated_at = models.DateTimeField()                                 # Último relleno
+
+    def __str__(self):
+        return f"{self.key} ({self.requests:.1f} peticiones, {self.tokens:.0f} tokens)"
+
+
+# Llamada esperando turno en un LLMRateBucket. El turno se da por (round, id):
+# la n-ésima llamada en espera de un usuario va en la ronda n, así que un
+# usuario con muchas llamadas en cola no deja sin turno a los demás.
+class LLMRateTicket(models.Model):
+
+    bucket_key = models.CharField(max_length=255)
+    user_key = models.CharField(max_length=64, blank=True, default="")  # Usuario dueño de la llamada ("" = sin usuario)
+    round = models.PositiveIntegerField(default=0)                      # Llamadas de ese usuario ya en espera al llegar
+    seen_at = models.DateTimeField()                                    # Último sondeo (los abandonados se borran)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["bucket_key", "round", "id"])]
+
+    def __str__(self):
+        return f"{self.bucket_key} — usuario {self.user_key or '-'} (ronda {self.round})"
+
+
+# Respuesta del LLM a una llamada con temperatura 0 (traducción, estructura de
+# páginas, design system, plan del asistente). La clave es el hash de (modelo,
+# endpoint, system, user, temperatura): la misma llamada devuelve lo mismo, así
+# que se reutiliza sin ir al proveedor. Lo gestiona utils/llm/response_cache.py
+# (caducidad LLM_RESPONSE_CACHE_TTL y expulsión LRU por número y tamaño).
+class LLMResponse(models.Model):
+
+    key = models.CharField(max_length=64, primary_key=True)             # sha256 de la llamada
+    llm_model = models.CharField(max_length=100)
+    response = models.TextField()
+    size = models.PositiveIntegerField(default=0)                       # Bytes de la respuesta
+    hits = models.PositiveIntegerField(default=0)                       # Veces reutilizada
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)                  # Para la expulsión LRU
+
+    def __str__(self):
+        return f"{self.key[:12]} — {self.llm_model} ({self.hits} aciertos)"
+
+
 class GenerationLog(models.Model):
     site = models.ForeignKey(
         GeneratedSite,
@@ -27,6 +27,7 @@ urlpatterns = [
     path("site/<int:api_request_id>/codigo/", views.site_code_viewer, name="site_code_viewer"),
 
     path("site/<int:api_request_id>/generate/", views.site_generate, name="site_generate"),
+    path("site/<int:api_request_id>/cancel/", views.site_cancel_generation, name="site_cancel_generation"),
     path("site/<int:api_request_id>/download/", views.site_download_zip, name="site_download_zip"),
     path("site/<int:api_request_id>/status/", views.site_status, name="site_status"),
 	
@@ -0,0 +1,138 @@
+"""
+benchmark.py — Mide find_main_items sobre payloads grandes y anidados.
+
+Compara la implementación actual (pila explícita + conteo de keys en C) con
+la anterior (recursiva, path + [k] en cada nodo y conteo de keys en Python) y
+comprueba que ambas devuelven exactamente lo mismo.
+
+Uso:
+    python -m WebBuilder.utils.analysis.benchmark [--repeat N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from .detection import _score_list, find_main_items
+
+
+# ========================== REFERENCIA: implementación anterior ==========================
+
+# Recorrido anterior: recursivo y copiando el path en cada nodo (solo para comparar).
+def _recursive_collect_best(node: object, path: list, best: dict) -> None:
+    if isinstance(node, list):
+        idxs = sum(1 for p in path if isinstance(p, int))
+        name = next((p.lower() for p in reversed(path) if isinstance(p, str)), "")
+        s = _score_list(node, idxs, len(path), name)
+        if s > best["score"]:
+            best.update({"found": True, "path": path[:], "count": len(node), "items": node, "score": s})
+        for i, it in enumerate(node[:6]):
+            _recursive_collect_best(it, path + [i], best)
+    elif isinstance(node, dict):
+        for k, v in node.items():
+            _recursive_collect_best(v, path + [k], best)
+
+
+def _reference_find_main_items(parsed_data: object) -> dict:
+    best = {"found": False, "path": None, "count": 0, "items": None, "score": float("-inf")}
+    _recursive_collect_best(parsed_data, [], best)
+    if not best["found"]:
+        return {"found": False, "path": None, "count": 0, "sample_keys": [], "top_keys": []}
+
+    items = best["items"] or []
+    key_counts: dict[str, int] = {}
+    for item in items:
+        if isinstance(item, dict):
+            for key in item.keys():
+                k = str(key)
+                key_counts[k] = key_counts.get(k, 0) + 1
+    top_keys = sorted(key_counts.items(), key=lambda kv: kv[1], reverse=True)
+    sample_keys = next(([str(k) for k in item] for item in items if isinstance(item, dict)), [])
+    return {
+        "found": True,
+        "path": best["path"],
+        "count": best["count"],
+        "sample_keys": sample_keys[:25],
+        "top_keys": top_keys[:40],
+    }
+
+
+# ========================== PAYLOADS SINTETICOS ==========================
+
+# Item con muchos campos escalares y algún subárbol anidado (como un registro XML)
+def _item(i: int, width: int, nested: int) -> dict:
+    item: dict = {"id": i, "title": f"Item {i}", "url": f"https://example.org/{i}"}
+    for j in range(width):
+        item[f"attr_{j}"] = f"valor {i}-{j}"
+    node = item
+    for level in range(nested):
+        child = {"level": level, "code": f"L{level}", "notes": [{"text": "x"}, {"text": "y"}]}
+        node["child"] = child
+        node = child
+    return item
+
+
+# Árbol con varias secciones de metadatos y la colección principal a media profundidad
+def _wide_payload(n_items: int, width: int, nested: int) -> dict:
+    return {
+        "meta": {"status": "ok", "total": n_items, "links": [{"rel": "self", "href": "/"}]},
+        "response": {
+            "header": {f"h{k}": k for k in range(200)},
+            "body": {"records": {"record": [_item(i, width, nested) for i in range(n_items)]}},
+        },
+    }
+
+
+# Cadena muy profunda de dicts (XML mal anidado): el recorrido recursivo revienta
+def _deep_payload(depth: int) -> dict:
+    root: dict = {}
+    node = root
+    for level in range(depth):
+        node["items"] = [{"id": level, "name": f"n{level}"}]
+        node["next"] = {}
+        node = node["next"]
+    return root
+
+
+# ========================== EJECUCION ==========================
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _run_case(label: str, payload: object, repeat: int) -> None:
+    current = find_main_items(payload)
+    t_new = _time(lambda: find_main_items(payload), repeat)
+    try:
+        reference = _reference_find_main_items(payload)
+        t_old = _time(lambda: _reference_find_main_items(payload), repeat)
+    except RecursionError:
+        print(f"{label:<28} nuevo {t_new * 1000:8.1f} ms | anterior: RecursionError")
+        return
+
+    same = "sí" if current == reference else "NO"
+    print(
+        f"{label:<28} nuevo {t_new * 1000:8.1f} ms | anterior {t_old * 1000:8.1f} ms"
+        f" | x{t_old / t_new:4.1f} | mismo resultado: {same}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de find_main_items")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    _run_case("5k items, 40 campos", _wide_payload(5_000, 40, 2), args.repeat)
+    _run_case("20k items, 10 campos", _wide_payload(20_000, 10, 4), args.repeat)
+    _run_case("raíz con 6 niveles", [_wide_payload(500, 20, 6) for _ in range(6)], args.repeat)
+    _run_case("cadena de 5000 niveles", _deep_payload(5_000), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 from ..ingest.parsers import detect_format
+from ..ingest.streaming import collection_stats
 from .helpers import get_by_path, _path_display
 from .detection import find_main_items
+from .profiler import profile_items
 
 """
 Construye el dict final de análisis para UI
@@ -11,18 +13,32 @@ Pasos del analisis:
 1. Detecta el formato del raw_text
 2. Determina el tipo de la raíz
 3. Encuentra la colección principal de items
-4. Construye un dict consolidado para el frontend
+4. Perfila cada campo sobre la colección completa (profiler)
+5. Construye un dict consolidado para el frontend
 
 Args:
 1. parsed_data: Datos parseados (dict, list, etc.)
 2. raw_text: Texto crudo original (opcional, para detectar formato)
+3. data_format: Formato ya detectado (opcional). Si se pasa, no se vuelve a
+   mirar raw_text.
+4. ingest_meta: Estadísticas del ingest en streaming (opcional). Si existen para
+   la colección principal, el conteo y las keys se toman del payload completo
+   en lugar de la muestra guardada en parsed_data.
 """
 
-def build_analysis(parsed_data: object, raw_text: str | None = None) -> dict:
+def build_analysis(
+    parsed_data: object,
+    raw_text: str | None = None,
+    ingest_meta: dict | None = None,
+    data_format: str | None = None,
+) -> dict:
 
     # ========================== 1) METADATA PAYLOAD ==========================
 
-    detected_format = detect_format(raw_text) if raw_text else "unknown"
+    if data_format:
+        detected_format = data_format
+    else:
+        detected_format = detect_format(raw_text) if raw_text else "unknown"
 
     if isinstance(parsed_data, dict):
         root_type = "dict"
@@ -44,6 +60,15 @@ def build_analysis(parsed_data: object, raw_text: str | None = None) -> dict:
         "path_display": _path_display(main.get("path")),
     }
 
+    # En streaming parsed_data solo tiene una muestra: usamos los conteos reales
+    stats = collection_stats(ingest_meta, main_collection["path"])
+    if stats:
+        main_collection["count"] = int(stats.get("count") or 0)
+        key_counts = stats.get("key_counts") or {}
+        if key_counts:
+            top_keys = sorted(key_counts.items(), key=lambda kv: kv[1], reverse=True)
+            main_collection["top_keys"] = top_keys[:40]
+
     # ========================== 3) KEYS DISPONIBLES ==========================
 
     top_keys_only = [k for (k, _) in main_collection["top_keys"]] if main_collection["top_keys"] else []
@@ -56,7 +81,17 @@ def build_analysis(parsed_data: object, raw_text: str | None = None) -> dict:
         if key not in all_keys:
             all_keys.append(key)
 
-    # ========================== 4) MENSAJE + OUTPUT FINAL ==========================
+    # ========================== 4) PERFIL DE CAMPOS ==========================
+
+    # Si la ingesta perfiló el dataset completo (CSV) se usa ese; si no, se
+    # perfila la colección que hay en parsed_data (completa salvo en streaming)
+    field_profile = (ingest_meta or {}).get("field_profile") or {}
+    if not field_profile and main_collection["found"]:
+        items = get_by_path(parsed_data, main_collection["path"])
+        if isinstance(items, list):
+            field_profile = profile_items(items, keys=all_keys)
+
+    # ========================== 5) MENSAJE + OUTPUT FINAL ==========================
 
     analysis_message = ""
     if not main_collection["found"]:
@@ -72,4 +107,5 @@ def build_analysis(parsed_data: object, raw_text: str | None = None) -> dict:
         "message": analysis_message,
         "main_collection": main_collection,
         "keys": {"all": all_keys, "top": top_keys_only[:40]},
+        "field_profile": field_profile,
     }
\ No newline at end of file
@@ -8,6 +8,9 @@ MAX_SAMPLE_ITEMS = 6
 MIN_DICT_DENSITY = 0.55
 # Tamaño máximo para scoring (se satura después)
 MAX_SIZE_SCORE = 500
+# Presupuesto del recorrido en busca de colecciones (profundidad y nodos visitados)
+MAX_WALK_DEPTH = 64
+MAX_WALK_NODES = 200_000
 
 
 # =========== ELIMINAR =========== (Parte de la calidad del analisis) ===========
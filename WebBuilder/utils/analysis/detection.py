@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+from collections import Counter
+from itertools import chain, islice, repeat
+from operator import itemgetter
+
 from .constants import (
     BAD_NAMES,
     GOOD_KEYS,
@@ -10,41 +14,33 @@ from .constants import (
     PATH_LENGTH_PENALTY,
     PATH_LENGTH_THRESHOLD,
     MAX_SAMPLE_ITEMS,
+    MAX_WALK_DEPTH,
+    MAX_WALK_NODES,
 )
 
 # ========================== SCORING: penalizaciones / nombres ==========================
 
-# Penalizacion por paths complejos
-def _path_penalty(path: list) -> float:
-
-    idxs = sum(1 for p in path if isinstance(p, int))
+# Penalizacion por paths complejos (idxs = nº de índices enteros, length = longitud del path)
+def _path_penalty(idxs: int, length: int) -> float:
     # Una lista cuyo path contiene un índice entero está anidada DENTRO de un item
     # de otra colección (p.ej. data -> [0] -> citations). Casi nunca es la colección
     # principal, así que la penalizamos con fuerza para preferir el array de nivel superior.
     nested_pen = 8.0 if idxs > 0 else 0.0
-    return PATH_INDEX_PENALTY * idxs + PATH_LENGTH_PENALTY * max(0, len(path) - PATH_LENGTH_THRESHOLD) + nested_pen
-
-
-# Devuelve el último nombre de key en el path (ignorando índices).
-def _last_key_name(path: list) -> str:
-    """
-    """
-    for p in reversed(path):
-        if isinstance(p, str):
-            return p.lower()
-    return ""
+    return PATH_INDEX_PENALTY * idxs + PATH_LENGTH_PENALTY * max(0, length - PATH_LENGTH_THRESHOLD) + nested_pen
 
 
 # ========================== SCORING: lista candidata ==========================
 
 # Calcula score de calidad para una lista como colección de items.
-def _score_list(node: list, path: list) -> float:
+# Del path solo se necesita el resumen que mantiene el recorrido: nº de índices,
+# longitud y último nombre de key (en minúsculas).
+def _score_list(node: list, idxs: int, length: int, name: str) -> float:
     n = len(node)
     if n == 0:
         return float("-inf")
 
-    dict_items = [x for x in node if isinstance(x, dict)]
-    dict_count = len(dict_items)
+    # Conteo en C (map + isinstance) sin construir la lista de dicts
+    dict_count = sum(map(isinstance, node, repeat(dict)))
     density = dict_count / n
 
     # Si no hay dicts, no es una colección de items
@@ -60,8 +56,8 @@ def _score_list(node: list, path: list) -> float:
     size_score = min(n, MAX_SIZE_SCORE) ** 0.5
 
     # Consistencia de keys: mirar primeros items dict
-    sample = dict_items[:MAX_SAMPLE_ITEMS]
-    key_sets = [set(d.keys()) for d in sample if isinstance(d, dict)]
+    sample = islice((x for x in node if isinstance(x, dict)), MAX_SAMPLE_ITEMS)
+    key_sets = [set(d.keys()) for d in sample]
     if not key_sets:
         return float("-inf")
 
@@ -85,7 +81,6 @@ def _score_list(node: list, path: list) -> float:
     good_bonus = min(hits, 6) * 0.35
 
     # Penaliza nombres típicos de metadata en el "último tramo" del path
-    name = _last_key_name(path)
     meta_pen = 0.0
     if name in BAD_NAMES:
         meta_pen += 1.6
@@ -102,60 +97,107 @@ def _score_list(node: list, path: list) -> float:
         + 0.25 * avg_size / 10.0
         + good_bonus
         - meta_pen
-        - _path_penalty(path)
+        - _path_penalty(idxs, length)
         - density_pen
     )
 
 
-# ========================== TRAVERSAL: búsqueda recursiva ==========================
+# ========================== TRAVERSAL: búsqueda iterativa ==========================
+
+# Reconstruye el path a partir de la cadena de prefijos compartidos (key, padre).
+def _materialize_path(link: tuple | None) -> list:
+    path: list = []
+    while link is not None:
+        path.append(link[0])
+        link = link[1]
+    path.reverse()
+    return path
+
+
+# Recorre la estructura con una pila explícita buscando la mejor lista candidata.
+# - Sin recursión: no hay límite de recursión en árboles profundos (XML).
+# - Los paths se comparten como tuplas (key, padre); solo se construye la lista
+#   del ganador.
+# - Solo se apilan hijos list/dict: los escalares nunca contienen colecciones.
+# - Se para en MAX_WALK_DEPTH niveles y MAX_WALK_NODES nodos visitados.
+# El orden de visita es el mismo que el del recorrido recursivo (preorden), así
+# que los empates se resuelven igual.
+def _walk_collect_best(root: object) -> dict:
+    best = {"found": False, "path": None, "count": 0, "items": None, "score": float("-inf")}
+    best_link = None
 
-# Recorre recursivamente la estructura buscando listas candidatas.
-def _walk_collect_best(node: object, path: list, best: dict) -> None:
-    if isinstance(node, list):
-        s = _score_list(node, path)
-        if s > best["score"]:
-            best.update(
-                {
-                    "found": True,
-                    "path": path[:],
-                    "count": len(node),
-                    "items": node,
-                    "score": s,
-                }
-            )
+    # (nodo, prefijo del path, longitud del path, nº de índices, último nombre de key)
+    stack: list[tuple] = [(root, None, 0, 0, "")]
+    visited = 0
 
-        # Recorre dentro de la lista (limitado) para encontrar listas anidadas
-        for i, it in enumerate(node[:MAX_SAMPLE_ITEMS]):
-            _walk_collect_best(it, path + [i], best)
+    while stack:
+        node, link, length, idxs, name = stack.pop()
+        visited += 1
+        if visited > MAX_WALK_NODES:
+            break
 
-    elif isinstance(node, dict):
-        for k, v in node.items():
-            _walk_collect_best(v, path + [k], best)
+        if isinstance(node, list):
+            s = _score_list(node, idxs, length, name)
+            if s > best["score"]:
+                best.update({"found": True, "count": len(node), "items": node, "score": s})
+                best_link = link
+            if length >= MAX_WALK_DEPTH:
+                continue
+            # Recorre dentro de la lista (limitado) para encontrar listas anidadas
+            children = [
+                (it, (i, link), length + 1, idxs + 1, name)
+                for i, it in enumerate(node[:MAX_SAMPLE_ITEMS])
+                if isinstance(it, (list, dict))
+            ]
+
+        elif isinstance(node, dict):
+            if length >= MAX_WALK_DEPTH:
+                continue
+            children = [
+                (
+                    v,
+                    (k, link),
+                    length + 1,
+                    idxs + 1 if isinstance(k, int) else idxs,
+                    k.lower() if isinstance(k, str) else name,
+                )
+                for k, v in node.items()
+                if isinstance(v, (list, dict))
+            ]
+
+        else:
+            continue
+
+        # En orden inverso para que el primer hijo salga primero de la pila
+        children.reverse()
+        stack.extend(children)
+
+    if best["found"]:
+        best["path"] = _materialize_path(best_link)
+    return best
 
 
 # ========================== API PUBLICA ==========================
 
 
 def find_main_items(parsed_data: object) -> dict:
-    # Mejor candidato encontrado durante el recorrido
-    best = {"found": False, "path": None, "count": 0, "items": None, "score": float("-inf")}
-
-    # Inicia la búsqueda desde la raíz
-    _walk_collect_best(parsed_data, [], best)
+    # Mejor candidato encontrado recorriendo desde la raíz
+    best = _walk_collect_best(parsed_data)
 
     if not best["found"]:
         return {"found": False, "path": None, "count": 0, "sample_keys": [], "top_keys": []}
 
     # Analiza las keys de los items encontrados
     items = best["items"] or []
-    key_counts: dict[str, int] = {}
-    for item in items:
-        if isinstance(item, dict):
-            for key in item.keys():
-                k = str(key)
-                key_counts[k] = key_counts.get(k, 0) + 1
-
-    top_keys = sorted(key_counts.items(), key=lambda kv: kv[1], reverse=True)
+    # Counter + chain cuentan las keys en C; conserva el orden de primera aparición
+    key_counts: dict[str, int] = Counter(chain.from_iterable(item for item in items if isinstance(item, dict)))
+    if not all(isinstance(key, str) for key in key_counts):
+        raw_counts, key_counts = key_counts, {}
+        for key, n in raw_counts.items():
+            k = str(key)
+            key_counts[k] = key_counts.get(k, 0) + n
+
+    top_keys = sorted(key_counts.items(), key=itemgetter(1), reverse=True)
 
     # Obtiene keys de muestra del primer item dict
     sample_keys: list[str] = []
@@ -5,8 +5,9 @@ field_roles.py — Inferencia del ROL SEMÁNTICO de cada campo del dataset.
 
 A diferencia de detection.py (que localiza la colección de items) y de
 field_extractor.py (que lee nombres del models.py ya generado), este módulo
-trabaja ANTES de generar nada: observa los valores de ejemplo y deduce qué
-representa cada campo.
+trabaja ANTES de generar nada: observa los valores del dataset y deduce qué
+representa cada campo. Las reglas se evalúan sobre el perfil de la columna
+(profiler.py), calculado sobre la colección completa cuando está disponible.
 
 Roles posibles:
   - "numeric"   → valor numérico real (precio, capitalización, volumen, rank…),
@@ -28,9 +29,10 @@ El resultado se usa para:
   - saber cuál es la imagen y el título en catálogos y portfolios.
 """
 
-import re
 from typing import Any
 
+from .profiler import NUMERIC_VALUE_RE, profile_values
+
 # ── Patrones de nombre que refuerzan la inferencia ────────────────────────
 
 _IMAGE_NAME_HINTS = ("image", "img", "thumbnail", "thumb", "photo", "picture", "avatar", "cover", "poster", "logo")
@@ -38,15 +40,11 @@ _PERCENT_NAME_HINTS = ("percent", "change", "pct", "growth", "delta", "variation
 _DATE_NAME_HINTS = ("date", "_at", "time", "created", "updated", "published", "release", "fecha")
 _TITLE_NAME_HINTS = ("name", "title", "headline", "label", "symbol", "nameid")
 _CATEGORY_NAME_HINTS = ("type", "category", "categoria", "status", "estado", "genre", "género", "kind", "tag", "rank", "tier", "group", "class")
-_IMAGE_EXT_RE = re.compile(r"\.(jpg|jpeg|png|gif|webp|svg|avif|bmp)(\?|$)", re.IGNORECASE)
-_DATE_VALUE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2})?")
-_NUMERIC_VALUE_RE = re.compile(r"^-?\d+(\.\d+)?$")
-_INT_VALUE_RE = re.compile(r"^-?\d+$")
 
 
 def _is_numeric_string(value: str) -> bool:
     """True si la string representa limpiamente un número (incluye negativos y decimales)."""
-    return bool(_NUMERIC_VALUE_RE.match(value.strip())) if value.strip() else False
+    return bool(NUMERIC_VALUE_RE.match(value.strip())) if value.strip() else False
 
 
 def _collect_values(sample_items: list[dict], key: str, limit: int = 12) -> list[Any]:
@@ -65,11 +63,17 @@ def _collect_values(sample_items: list[dict], key: str, limit: int = 12) -> list
     return values
 
 
-def infer_field_role(key: str, values: list[Any]) -> str:
-    """Infiere el rol de un único campo a partir de su nombre y sus valores."""
+def infer_field_role(key: str, values: list[Any] | None = None, *, profile: dict | None = None) -> str:
+    """
+    Infiere el rol de un único campo a partir de su nombre y de su perfil
+    (profiler.profile_values). Si no se pasa `profile` se calcula sobre `values`.
+    """
     name = (key or "").lower()
+    if profile is None:
+        profile = profile_values(values or [])
+    n = profile.get("non_null") or 0
 
-    if not values:
+    if not n:
         # Sin datos, decidimos solo por el nombre.
         if any(h in name for h in _IMAGE_NAME_HINTS):
             return "image"
@@ -79,32 +83,30 @@ def infer_field_role(key: str, values: list[Any]) -> str:
             return "title"
         return "text"
 
-    # Trabajamos sobre representaciones string para uniformar APIs que mezclan tipos.
-    str_values = [str(v).strip() for v in values]
+    # Los contadores del perfil se calculan sobre representaciones string para
+    # uniformar APIs que mezclan tipos.
 
     # ── Booleano ──
-    bool_like = {"true", "false", "0", "1", "yes", "no"}
-    if all(isinstance(v, bool) for v in values):
+    if profile["bool_type"] == n:
         return "boolean"
-    if all(s.lower() in bool_like for s in str_values) and len({s.lower() for s in str_values}) <= 2 and not all(_INT_VALUE_RE.match(s) for s in str_values):
+    if profile["bool_like"] == n and len(profile["bool_values"]) <= 2 and profile["int_like"] < n:
         return "boolean"
 
     # ── Imagen / URL ──
-    url_like = [s for s in str_values if s.startswith("http://") or s.startswith("https://")]
-    if url_like and len(url_like) >= max(1, len(str_values) // 2):
-        if any(_IMAGE_EXT_RE.search(s) for s in url_like) or any(h in name for h in _IMAGE_NAME_HINTS):
+    url_count = profile["url"]
+    if url_count and url_count >= max(1, n // 2):
+        if profile["image_url"] or any(h in name for h in _IMAGE_NAME_HINTS):
             return "image"
         return "url"
 
     # ── Numérico (incluye strings numéricas tipo "76753.69") ──
-    numeric_count = sum(1 for s in str_values if _is_numeric_string(s))
-    if numeric_count >= max(1, int(len(str_values) * 0.8)):
+    if profile["numeric"] >= max(1, int(n * 0.8)):
         # Un campo cuyo nombre sugiere fecha (creation_date, year…) con años sueltos
         # NO es una métrica agregable: lo tratamos como texto/fecha, no numeric.
         if any(h in name for h in _DATE_NAME_HINTS) or "year" in name or "año" in name:
             return "text"
         # ¿Es una variación/porcentaje? (nombre sugiere cambio, o hay negativos)
-        has_negative = any(s.startswith("-") for s in str_values)
+        has_negative = profile["negative"] > 0
         if any(h in name for h in _PERCENT_NAME_HINTS):
             return "percent"
         if has_negative and "rank" not in name:
@@ -112,23 +114,21 @@ def infer_field_role(key: str, values: list[Any]) -> str:
         return "numeric"
 
     # ── Fecha ──
-    if any(h in name for h in _DATE_NAME_HINTS) or all(_DATE_VALUE_RE.match(s) for s in str_values):
-        if all(_DATE_VALUE_RE.match(s) for s in str_values):
-            return "date"
+    if profile["date"] == n:
+        return "date"
 
     # ── Texto: distinguir título / categoría / largo / corto ──
-    max_len = max((len(s) for s in str_values), default=0)
-    avg_len = (sum(len(s) for s in str_values) / len(str_values)) if str_values else 0
-    if max_len > 90 or avg_len > 60:
+    max_len = profile["max_len"]
+    if max_len > 90 or profile["avg_len"] > 60:
         return "long_text"
 
-    distinct = {s.lower() for s in str_values}
-    repetition_ratio = 1 - (len(distinct) / len(str_values)) if str_values else 0
+    # Con perfiles grandes `distinct` es una estimación (HyperLogLog)
+    repetition_ratio = 1 - (min(profile["distinct"], n) / n)
 
     if any(h in name for h in _CATEGORY_NAME_HINTS):
         return "category"
     # Pocos valores distintos y repetidos → categoría (género, estado, tipo…)
-    if len(str_values) >= 4 and repetition_ratio >= 0.4 and max_len <= 40:
+    if n >= 4 and repetition_ratio >= 0.4 and max_len <= 40:
         return "category"
     if any(h in name for h in _TITLE_NAME_HINTS):
         return "title"
@@ -140,18 +140,32 @@ def is_numeric_role(role: str) -> bool:
     return role in ("numeric", "percent")
 
 
-def infer_roles(fields: list[dict], sample_items: list[dict]) -> dict[str, str]:
+def infer_roles(
+    fields: list[dict],
+    sample_items: list[dict],
+    known_roles: dict[str, str] | None = None,
+    profiles: dict[str, dict] | None = None,
+) -> dict[str, str]:
     """
     Devuelve {key: role} para cada campo del schema.
 
     `fields` es la lista [{key, label}, ...] del plan; `sample_items` son
-    los items de ejemplo del dataset.
+    los items de ejemplo del dataset. `known_roles` son roles ya inferidos
+    sobre la columna completa durante la ingesta (CSV) y tienen prioridad.
+    `profiles` son los perfiles de la colección completa (profiler); solo se
+    recurre a `sample_items` para los campos sin perfil.
     """
     roles: dict[str, str] = {}
     for field in fields or []:
         key = field.get("key") if isinstance(field, dict) else None
         if not key:
             continue
+        if known_roles and key in known_roles:
+            roles[key] = known_roles[key]
+            continue
+        if profiles and key in profiles:
+            roles[key] = infer_field_role(key, profile=profiles[key])
+            continue
         values = _collect_values(sample_items or [], key)
         roles[key] = infer_field_role(key, values)
     return roles
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+"""
+profiler.py — Perfil por columnas de la colección principal del dataset.
+
+Recorre la colección COMPLETA una vez por campo (cada campo se extrae como
+una columna y se resume entera) y devuelve, por key:
+
+  - count / non_null / null_ratio   → presencia del campo,
+  - distinct / distinct_exact       → valores distintos (en columnas de texto
+                                      largo, HyperLogLog por encima de
+                                      SKETCH_EXACT_LIMIT),
+  - min / max                       → rango de los valores numéricos,
+  - numeric_rate                    → fracción de valores que parsean como número,
+  - length_hist / max_len / avg_len → distribución de longitudes del texto,
+  - contadores de forma (bool, url, imagen, fecha, negativos…) que usa
+    field_roles.infer_field_role para decidir el rol.
+
+Las columnas numéricas nativas (solo int o solo float) de más de
+NUMPY_MIN_VALUES valores se resumen con NumPy, sin pasar por expresiones
+regulares; el resto usa una expresión regular por valor. Ambos caminos dan
+los mismos contadores y cuentan los distintos con DistinctSketch (memoria
+acotada).
+
+El perfil es JSON serializable: se guarda dentro del análisis persistido y en
+el ingest_meta de los CSV (calculado sobre todas las filas).
+"""
+
+import math
+import re
+from itertools import compress, repeat
+from typing import Any, Iterable
+
+import numpy as np
+
+# ── Patrones de valor (compartidos con field_roles) ───────────────────────
+
+BOOL_LIKE = frozenset({"true", "false", "0", "1", "yes", "no"})
+IMAGE_EXT_RE = re.compile(r"\.(jpg|jpeg|png|gif|webp|svg|avif|bmp)(\?|$)", re.IGNORECASE)
+DATE_VALUE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2})?")
+NUMERIC_VALUE_RE = re.compile(r"^-?\d+(\.\d+)?$")
+INT_VALUE_RE = re.compile(r"^-?\d+$")
+
+# ── Límites del perfil ────────────────────────────────────────────────────
+
+# Valores distintos que se cuentan de forma exacta antes de pasar al sketch
+SKETCH_EXACT_LIMIT = 4096
+# Precisión del HyperLogLog: 2^12 registros (error típico ~1.6%)
+SKETCH_PRECISION = 12
+# Límites superiores de los tramos del histograma de longitudes (el último es abierto)
+LENGTH_BUCKETS = (10, 30, 60, 90, 200)
+# Columnas numéricas a partir de las que se resumen con NumPy (por debajo el
+# coste de crear los arrays no compensa)
+NUMPY_MIN_VALUES = 256
+
+_POWERS_OF_TEN = np.array([10 ** k for k in range(1, 20)], dtype=np.uint64)
+
+
+class DistinctSketch:
+    """
+    Contador de valores distintos: conjunto exacto mientras es pequeño y
+    HyperLogLog (hash de 64 bits) cuando supera SKETCH_EXACT_LIMIT.
+    La memoria queda acotada a 2^SKETCH_PRECISION bytes por campo.
+    """
+
+    __slots__ = ("exact", "registers")
+
+    def __init__(self) -> None:
+        self.exact: set[str] | None = set()
+        self.registers: bytearray | None = None
+
+    def update(self, values: Iterable[str]) -> None:
+        values = iter(values)
+        if self.exact is not None:
+            exact = self.exact
+            for value in values:
+                exact.add(value)
+                if len(exact) > SKETCH_EXACT_LIMIT:
+                    self._to_sketch()
+                    break
+            else:
+                return
+        # Lo que queda del iterable va directo al sketch
+        self._add_hashed(values)
+
+    def _to_sketch(self) -> None:
+        self.registers = bytearray(1 << SKETCH_PRECISION)
+        exact, self.exact = self.exact, None
+        self._add_hashed(exact)
+
+    def _add_hashed(self, values: Iterable[str]) -> None:
+        # hash() de str es SipHash de 64 bits en C: mucho más barato que hashlib.
+        # Su semilla cambia entre procesos, pero solo tiene que ser estable
+        # durante una pasada (la estimación no depende de la semilla).
+        hashes = np.fromiter(map(hash, values), dtype=np.int64).view(np.uint64)
+        if not hashes.size:
+            return
+        rest_bits = 64 - SKETCH_PRECISION
+        idx = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = (hashes & np.uint64((1 << rest_bits) - 1)).astype(np.float64)
+        # rest tiene 52 bits: cabe exacto en un float64, así que frexp da su bit_length
+        bit_length = np.frexp(rest)[1]
+        rank = (rest_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(np.frombuffer(self.registers, dtype=np.uint8), idx, rank)
+
+    @property
+    def is_exact(self) -> bool:
+        return self.exact is not None
+
+    def estimate(self) -> int:
+        if self.exact is not None:
+            return len(self.exact)
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Corrección de rango pequeño (linear counting)
+        if raw <= 2.5 * m and zeros:
+            raw = m * math.log(m / zeros)
+        return int(round(raw))
+
+
+def _count(iterable: Iterable) -> int:
+    return sum(1 for _ in iterable)
+
+
+def _length_hist(lengths) -> dict[str, int]:
+    labels = [f"<={b}" for b in LENGTH_BUCKETS] + [f">{LENGTH_BUCKETS[-1]}"]
+    buckets = np.searchsorted(LENGTH_BUCKETS, np.asarray(lengths, dtype=np.int64), side="left")
+    counts = np.bincount(buckets, minlength=len(labels))
+    return dict(zip(labels, map(int, counts)))
+
+
+# ── Resumen por valor ─────────────────────────────────────────────────────
+# Las dos variantes devuelven las mismas claves y los mismos valores.
+
+def _column_python(present: list) -> dict:
+    """Una expresión regular por valor. Para columnas pequeñas o de texto largo."""
+    strs = [str(v).strip() for v in present]
+    lowered = list(map(str.lower, strs))
+    lengths = list(map(len, strs))
+
+    numeric = list(filter(NUMERIC_VALUE_RE.match, strs))
+    urls = list(compress(strs, map(str.startswith, strs, repeat(("http://", "https://")))))
+    bool_like = list(filter(BOOL_LIKE.__contains__, lowered))
+    numbers = list(map(float, numeric))
+
+    sketch = DistinctSketch()
+    sketch.update(lowered)
+
+    return {
+        "distinct": sketch.estimate(),
+        "distinct_exact": sketch.is_exact,
+        "min": min(numbers) if numbers else None,
+        "max": max(numbers) if numbers else None,
+        "max_len": max(lengths, default=0),
+        "len_sum": sum(lengths),
+        "length_hist": _length_hist(lengths),
+        "numeric": len(numeric),
+        # -?\d+ es un caso de -?\d+(\.\d+)?: basta mirar los numéricos
+        "int_like": _count(filter(INT_VALUE_RE.match, numeric)),
+        "negative": sum(map(str.startswith, strs, repeat("-"))),
+        "bool_like": len(bool_like),
+        "bool_values": sorted(set(bool_like))[:3],
+        "url": len(urls),
+        "image_url": _count(filter(IMAGE_EXT_RE.search, urls)),
+        "date": _count(filter(DATE_VALUE_RE.match, strs)),
+    }
+
+
+def _numeric_array(present: list):
+    """Array int64/float64 si la columna es homogénea de int o de float (sin bool)."""
+    kinds = set(map(type, present))
+    if kinds == {float}:
+        return np.array(present, dtype=np.float64)
+    if kinds == {int}:
+        try:
+            return np.array(present, dtype=np.int64)
+        except OverflowError:
+            return None
+    return None
+
+
+def _column_numbers(nums) -> dict:
+    """
+    Columnas numéricas nativas: los contadores se deducen de los números sin
+    pasar por expresiones regulares, con las mismas reglas que str(v) + regex.
+    Los distintos se cuentan sobre el texto (como en _column_python), así el
+    sketch acota la memoria igual que en las columnas de texto.
+    """
+    sketch = DistinctSketch()
+    if nums.dtype.kind == "i":
+        # str(int): todas numéricas y enteras; "0"/"1" son además booleanos
+        magnitude = np.where(nums < 0, -(nums + 1), nums).astype(np.uint64) + (nums < 0)
+        digits = np.searchsorted(_POWERS_OF_TEN, magnitude, side="right") + 1
+        lengths = digits + (nums < 0)
+        bool_mask = (nums == 0) | (nums == 1)
+        sketch.update(map(str, nums.tolist()))
+        return {
+            "distinct": sketch.estimate(),
+            "distinct_exact": sketch.is_exact,
+            "min": float(nums.min()),
+            "max": float(nums.max()),
+            "max_len": int(lengths.max()),
+            "len_sum": int(lengths.sum()),
+            "length_hist": _length_hist(lengths),
+            "numeric": int(nums.size),
+            "int_like": int(nums.size),
+            "negative": int((nums < 0).sum()),
+            "bool_like": int(bool_mask.sum()),
+            "bool_values": sorted(str(v) for v in np.unique(nums[bool_mask]).tolist()),
+            "url": 0,
+            "image_url": 0,
+            "date": 0,
+        }
+
+    # repr(float) lleva exponente fuera de [1e-4, 1e16) y "inf"/"nan" no son números
+    finite = np.isfinite(nums)
+    magnitude = np.abs(nums)
+    numeric_mask = finite & ((nums == 0) | ((magnitude >= 1e-4) & (magnitude < 1e16)))
+    numbers = nums[numeric_mask]
+    # Longitudes y distintos necesitan el texto: repr en C es más rápido que astype(str)
+    texts = list(map(repr, nums.tolist()))
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=nums.size)
+    sketch.update(texts)
+    return {
+        "distinct": sketch.estimate(),
+        "distinct_exact": sketch.is_exact,
+        "min": float(numbers.min()) if numbers.size else None,
+        "max": float(numbers.max()) if numbers.size else None,
+        "max_len": int(lengths.max()),
+        "len_sum": int(lengths.sum()),
+        "length_hist": _length_hist(lengths),
+        "numeric": int(numeric_mask.sum()),
+        "int_like": 0,
+        "negative": int((np.signbit(nums) & ~np.isnan(nums)).sum()),
+        "bool_like": 0,
+        "bool_values": [],
+        "url": 0,
+        "image_url": 0,
+        "date": 0,
+    }
+
+
+def profile_values(values: Iterable[Any], *, total: int | None = None) -> dict:
+    """
+    Perfil de una columna. `values` son los valores del campo (los None y ""
+    cuentan como nulos); `total` es el nº de filas si `values` ya viene sin
+    nulos (columnas CSV). Las columnas numéricas grandes se resumen con NumPy.
+    """
+    values = list(values)
+    present = [v for v in values if v is not None and v != ""]
+    non_null = len(present)
+    count = total if total is not None else len(values)
+
+    nums = _numeric_array(present) if non_null >= NUMPY_MIN_VALUES else None
+    column = _column_numbers(nums) if nums is not None else _column_python(present)
+    len_sum = column.pop("len_sum")
+
+    profile = {
+        "count": count,
+        "non_null": non_null,
+        "null_ratio": round(max(0, count - non_null) / count, 4) if count else None,
+        "distinct": column.pop("distinct"),
+        "distinct_exact": column.pop("distinct_exact"),
+        "min": column.pop("min"),
+        "max": column.pop("max"),
+        "numeric_rate": round(column["numeric"] / non_null, 4) if non_null else 0.0,
+        "max_len": column.pop("max_len"),
+        "avg_len": round(len_sum / non_null, 2) if non_null else 0.0,
+        "length_hist": column.pop("length_hist"),
+        # Contadores de forma para la inferencia de roles
+        "bool_type": sum(map(isinstance, present, repeat(bool))),
+        **column,
+    }
+    return profile
+
+
+def profile_items(items: list, keys: Iterable[str] | None = None) -> dict[str, dict]:
+    """
+    Perfil {key: perfil} de una colección de items (dicts). Si no se pasan
+    `keys` se perfilan todas las keys que aparecen en los items. Los items que
+    no son dict o no tienen la key cuentan como nulos.
+    """
+    rows = [item for item in (items or []) if isinstance(item, dict)]
+    if keys is None:
+        keys = list(dict.fromkeys(k for row in rows for k in row))
+    total = len(items or [])
+    return {
+        str(key): profile_values([row.get(key) for row in rows], total=total)
+        for key in keys
+    }
+
+
+__all__ = [
+    "DistinctSketch",
+    "profile_items",
+    "profile_values",
+]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import random
+from typing import Iterable
+
+from .field_roles import infer_field_role
+
+# ========================== CONSTANTES ==========================
+
+# Items que se guardan como muestra en el plan aceptado
+SAMPLE_SIZE = 6
+# Estratos distintos que se siguen; el resto comparte un estrato común
+MAX_STRATA = 64
+# Rango de valores distintos para usar un campo como estrato de categoría
+MIN_CATEGORY_VALUES = 2
+MAX_CATEGORY_VALUES = 50
+
+_OVERFLOW = ("__otros__",)
+
+
+# ========================== ELECCION DEL CAMPO CATEGORIA ==========================
+
+# Campo del schema por el que estratificar: rol "category" con pocos valores
+# distintos (según el perfil de la colección completa). None si no hay ninguno.
+def pick_stratify_key(fields: list[dict], profiles: dict[str, dict] | None) -> str | None:
+    best = None
+    for field in fields or []:
+        key = field.get("key") if isinstance(field, dict) else None
+        profile = (profiles or {}).get(key)
+        if not key or not profile:
+            continue
+        distinct = profile.get("distinct") or 0
+        if not MIN_CATEGORY_VALUES <= distinct <= MAX_CATEGORY_VALUES:
+            continue
+        if infer_field_role(key, profile=profile) != "category":
+            continue
+        if best is None or distinct < best[1]:
+            best = (key, distinct)
+    return best[0] if best else None
+
+
+# ========================== MUESTREO ==========================
+
+def _is_empty(value: object) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+# Estrato de un item: (valores vacíos por campo, valor de la categoría)
+def _stratum(item: dict, keys: list[str], stratify_key: str | None) -> tuple:
+    nulls = tuple(_is_empty(item.get(k)) for k in keys)
+    category = item.get(stratify_key) if stratify_key else None
+    if not isinstance(category, (str, int, float, bool)) and category is not None:
+        category = str(category)
+    return nulls, category
+
+
+# Recorre la colección UNA vez y devuelve [(índice, item)] con una muestra
+# variada de `size` items:
+#   - cada estrato (patrón de vacíos + valor de categoría) tiene su reservoir
+#     de `size` items (algoritmo R), así que la memoria no depende del tamaño,
+#   - se reparte por turnos entre estratos, empezando por los que tienen menos
+#     campos vacíos (los items completos van primero: los prompts solo leen
+#     los 3-4 primeros),
+#   - el resultado es determinista para un mismo `seed`.
+def stratified_sample(
+    items: Iterable[object],
+    fields: list[dict],
+    *,
+    size: int = SAMPLE_SIZE,
+    stratify_key: str | None = None,
+    seed: int = 0,
+) -> list[tuple[int, dict]]:
+    keys = [f["key"] for f in fields or [] if isinstance(f, dict) and f.get("key")]
+    rng = random.Random(seed)
+
+    # estrato -> [vistos, orden de aparición, reservoir [(índice, item)]]
+    strata: dict[tuple, list] = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        stratum = _stratum(item, keys, stratify_key)
+        if stratum not in strata and len(strata) >= MAX_STRATA:
+            stratum = _OVERFLOW
+        entry = strata.get(stratum)
+        if entry is None:
+            entry = strata[stratum] = [0, len(strata), []]
+        entry[0] += 1
+        reservoir = entry[2]
+        if len(reservoir) < size:
+            reservoir.append((index, item))
+        else:
+            slot = rng.randrange(entry[0])
+            if slot < size:
+                reservoir[slot] = (index, item)
+
+    # Menos vacíos primero; a igualdad, el estrato que apareció antes
+    def _order(item: tuple) -> tuple:
+        stratum, (_, first_seen, _) = item
+        empty = sum(stratum[0]) if stratum is not _OVERFLOW else len(keys) + 1
+        return empty, first_seen
+
+    queues = [sorted(entry[2]) for _, entry in sorted(strata.items(), key=_order)]
+    picked: list[tuple[int, dict]] = []
+    while len(picked) < size and any(queues):
+        for queue in queues:
+            if queue and len(picked) < size:
+                picked.append(queue.pop(0))
+    return picked
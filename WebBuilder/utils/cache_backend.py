@@ -0,0 +1,83 @@
+"""
+cache_backend.py — Backend de cache compartido entre workers de gunicorn.
+
+Basado en FileBasedCache de Django (cada entrada ya se guarda pickled +
+comprimida con zlib en un fichero), así que todos los workers del mismo host
+ven la misma cache y sobrevive a reinicios si el directorio es persistente.
+
+Sobre el backend original añade:
+  - límite de tamaño total en disco (OPTIONS["MAX_SIZE"], en bytes),
+  - expulsión LRU aproximada: cada acierto actualiza el mtime del fichero y
+    al hacer sitio se borran primero las entradas usadas hace más tiempo
+    (en lugar de una muestra aleatoria como hace FileBasedCache).
+"""
+
+from __future__ import annotations
+
+import os
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+# Tamaño total por defecto (256 MB) y fracción a la que se baja al limpiar
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+CULL_TARGET_RATIO = 0.9
+
+_MISSING = object()
+
+
+class SizeBoundedFileCache(FileBasedCache):
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        options = params.get("OPTIONS") or {}
+        self._max_size = int(options.get("MAX_SIZE", DEFAULT_MAX_SIZE))
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            return default
+        # Marca la entrada como usada recientemente (orden LRU)
+        try:
+            os.utime(self._key_to_file(key, version))
+        except OSError:
+            pass
+        return value
+
+    def _cull(self):
+        """
+        Se llama antes de cada set. Si se supera MAX_ENTRIES o MAX_SIZE borra
+        las entradas menos usadas hasta bajar al 90% del tamaño y liberar
+        1/CULL_FREQUENCY de las entradas.
+        """
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self._dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(self.cache_suffix):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue   # Borrada por otro worker
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except FileNotFoundError:
+            return
+
+        count = len(entries)
+        if count < self._max_entries and total <= self._max_size:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        target_size = self._max_size * CULL_TARGET_RATIO
+        target_count = count - max(1, count // self._cull_frequency) if count >= self._max_entries else count
+
+        entries.sort()   # Más antiguas primero
+        for _, size, path in entries:
+            if total <= target_size and count <= target_count:
+                break
+            if self._delete(path):
+                total -= size
+                count -= 1
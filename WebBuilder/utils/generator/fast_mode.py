@@ -0,0 +1,516 @@
+"""
+fast_mode.py — Generación rápida: el proyecto completo sin llamar al LLM.
+
+Ensambla cada artefacto de forma determinista a partir de lo que ya existe:
+  - páginas: estructura de fallback_pages según el tipo de sitio
+  - models.py / load_data.py: un campo por cada campo del plan, con el tipo
+    Django que corresponde a su rol (numeric → FloatField, image → URLField...)
+  - templates: los ejemplos de llm/examples (tipo de sitio × estilo del preset)
+    con los placeholders CAMPO_* sustituidos por los campos reales según
+    field_roles; los que no tienen campo se eliminan
+  - base.html y design system: paleta fija por estilo (dark / light / editorial)
+
+El mismo plan produce siempre los mismos archivos. La generación con LLM
+queda como refinamiento opcional sobre este resultado.
+"""
+from __future__ import annotations
+
+import keyword
+import re
+
+from django.utils.html import escape
+from django.utils.text import slugify
+
+from ..llm.examples import EXAMPLES_BY_TYPE
+
+# ──────────────────────────────────────────────────────────────────────────────
+# NOMBRES DE CAMPO Y ESTILO
+# ──────────────────────────────────────────────────────────────────────────────
+
+# Nombres que no puede usar un campo del modelo (o que ya usa el propio modelo)
+_RESERVED_NAMES = {"id", "pk", "objects", "created_at", "delete", "save", "clean"}
+
+# Presets con su estilo de ejemplo; el resto usan "light"
+_PRESET_STYLE = {
+    "neo_terminal": "dark",
+    "magazine_split": "editorial",
+    "quiet_editorial": "editorial",
+}
+
+# Tipo de campo Django por rol semántico (field_roles)
+_ROLE_FIELD = {
+    "numeric":   "models.FloatField(null=True, blank=True)",
+    "percent":   "models.FloatField(null=True, blank=True)",
+    "boolean":   "models.BooleanField(null=True, blank=True)",
+    "long_text": "models.TextField(blank=True)",
+    "image":     "models.URLField(max_length=1000, blank=True)",
+    "url":       "models.URLField(max_length=1000, blank=True)",
+}
+_DEFAULT_FIELD = "models.CharField(max_length=500, blank=True)"
+
+# Conversión que aplica load_data a cada rol (ver _LOAD_DATA_HELPERS)
+_ROLE_KIND = {
+    "numeric": "number", "percent": "number", "boolean": "boolean",
+    "long_text": "long_text", "image": "url", "url": "url",
+}
+
+# Pistas de nombre para los placeholders que no tienen un rol propio
+_PLACEHOLDER_HINTS = {
+    "DESCRIPCION": ("description", "descripcion", "summary", "resumen", "body", "content", "overview", "bio"),
+    "PRECIO":      ("price", "precio", "cost", "coste", "amount", "importe"),
+    "AUTOR":       ("author", "autor", "creator", "writer", "user", "by"),
+    "CLIENTE":     ("client", "cliente", "company", "empresa", "customer"),
+    "ESTADO":      ("status", "estado", "state"),
+}
+
+
+def fast_field_names(fields: list[dict]) -> dict[str, str]:
+    """
+    {key del plan: nombre del campo en el modelo}. Nombres válidos en Python,
+    sin colisiones con el modelo ni entre sí.
+    """
+    names: dict[str, str] = {}
+    used: set[str] = set()
+    for f in fields:
+        key = f.get("key")
+        if not key or key in names:
+            continue
+        name = slugify(str(key)).replace("-", "_") or "field"
+        if name[0].isdigit():
+            name = f"f_{name}"
+        if keyword.iskeyword(name) or name in _RESERVED_NAMES:
+            name = f"{name}_value"
+        base, n = name, 2
+        while name in used:
+            name = f"{base}_{n}"
+            n += 1
+        used.add(name)
+        names[key] = name
+    return names
+
+
+def fast_style(preset: dict) -> str:
+    """Estilo de ejemplo (dark / light / editorial) que corresponde al preset."""
+    return _PRESET_STYLE.get(preset.get("id", ""), "light")
+
+
+def fast_placeholders(fields: list[dict], field_roles: dict, primary_numeric: str | None) -> dict[str, str]:
+    """
+    {placeholder de los ejemplos (TITULO, IMAGEN...): key del plan}.
+    Cada campo se usa una vez, salvo el numérico principal (PRECIO y VALOR).
+    """
+    keys = [f["key"] for f in fields if f.get("key")]
+    taken: set[str] = set()
+
+    def by_role(*roles: str) -> str | None:
+        for role in roles:
+            for key in keys:
+                if key not in taken and field_roles.get(key) == role:
+                    taken.add(key)
+                    return key
+        return None
+
+    def by_hint(placeholder: str) -> str | None:
+        hints = _PLACEHOLDER_HINTS[placeholder]
+        for key in keys:
+            words = set(re.split(r"[^a-z0-9]+", key.lower()))
+            if key not in taken and (words & set(hints)):
+                taken.add(key)
+                return key
+        return None
+
+    mapping: dict[str, str | None] = {
+        "TITULO": by_role("title") or by_role("text"),
+        "IMAGEN": by_role("image"),
+        "URL": by_role("url"),
+        "FECHA": by_role("date"),
+    }
+    mapping["PRECIO"] = by_hint("PRECIO") or primary_numeric
+    mapping["VALOR"] = primary_numeric or mapping["PRECIO"]
+    if primary_numeric:
+        taken.add(primary_numeric)
+    mapping["DESCRIPCION"] = by_role("long_text") or by_hint("DESCRIPCION")
+    mapping["AUTOR"] = by_hint("AUTOR")
+    mapping["CLIENTE"] = by_hint("CLIENTE")
+    mapping["ESTADO"] = by_hint("ESTADO") or by_role("boolean")
+    mapping["CATEGORIA"] = by_role("category")
+    mapping["EXTRA"] = by_role("category", "text", "numeric", "percent", "date")
+    if mapping["TITULO"] is None and keys:
+        mapping["TITULO"] = keys[0]
+    return {k: v for k, v in mapping.items() if v}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# DESIGN SYSTEM Y BASE.HTML POR ESTILO
+# ──────────────────────────────────────────────────────────────────────────────
+
+_THEMES = {
+    "dark": {
+        "body": "bg-gray-950 text-gray-100 antialiased",
+        "nav": "border-b border-gray-800 bg-gray-950/90 backdrop-blur",
+        "brand": "text-lg font-bold tracking-tight text-emerald-400",
+        "link": "text-gray-400 transition hover:text-white",
+        "link_active": "text-white font-semibold",
+        "auth_button": "border-gray-700 hover:border-emerald-400",
+        "footer": "border-t border-gray-800 text-gray-500",
+        "design_system": {
+            "container": "max-w-7xl mx-auto px-6 sm:px-8",
+            "card": "rounded-3xl border border-gray-800 bg-gray-900 p-8",
+            "h1": "text-3xl font-bold tracking-tight text-white mb-6 text-center",
+            "h2": "text-2xl font-semibold text-white",
+            "h3": "text-lg font-bold text-white",
+            "text_muted": "text-sm text-gray-400",
+            "badge_positive": "inline-flex items-center rounded-full px-3 py-1 text-xs font-medium bg-emerald-500/10 text-emerald-400",
+            "badge_negative": "inline-flex items-center rounded-full px-3 py-1 text-xs font-medium bg-red-500/10 text-red-400",
+            "badge_neutral": "inline-flex items-center rounded-full px-3 py-1 text-xs font-medium bg-gray-800 text-gray-300",
+            "btn_primary": "w-full rounded-xl bg-emerald-500 px-5 py-3 text-sm font-semibold text-gray-950 transition hover:bg-emerald-400",
+            "btn_secondary": "inline-block rounded-xl border border-gray-700 px-5 py-3 text-sm font-semibold text-white transition hover:bg-gray-900",
+            "input": "w-full rounded-xl border border-gray-700 bg-gray-950 px-4 py-3 text-sm text-white placeholder:text-gray-500 focus:outline-none focus:border-emerald-400",
+            "link": "text-emerald-400 hover:text-emerald-300 transition-colors",
+            "divider": "border-t border-gray-800 my-8",
+        },
+    },
+    "light": {
+        "body": "bg-gray-50 text-gray-900 antialiased",
+        "nav": "border-b border-gray-200 bg-white/90 backdrop-blur",
+        "brand": "text-lg font-bold tracking-tight text-gray-900",
+        "link": "text-gray-500 transition hover:text-gray-900",
+        "link_active": "text-gray-900 font-semibold",
+        "auth_button": "border-gray-300 hover:bg-gray-100",
+        "footer": "border-t border-gray-200 text-gray-500",
+        "design_system": {
+            "container": "max-w-7xl mx-auto px-6 sm:px-8",
+            "card": "rounded-3xl bg-white p-8 shadow-sm ring-1 ring-gray-200",
+            "h1": "text-3xl font-bold tracking-tight text-gray-900 mb-6 text-center",
+            "h2": "text-2xl font-semibold text-gray-900",
+            "h3": "text-lg font-bold text-gray-900",
+            "text_muted": "text-sm text-gray-500",
+            "badge_positive": "inline-flex items-center rounded-full px-3 py-1 text-xs font-medium bg-green-100 text-green-700",
+            "badge_negative": "inline-flex items-center rounded-full px-3 py-1 text-xs font-medium bg-red-100 text-red-700",
+            "badge_neutral": "inline-flex items-center rounded-full px-3 py-1 text-xs font-medium bg-gray-100 text-gray-600",
+            "btn_primary": "w-full rounded-xl bg-gray-900 px-5 py-3 text-sm font-semibold text-white transition hover:bg-gray-800",
+            "btn_secondary": "inline-block rounded-xl border border-gray-300 bg-white px-5 py-3 text-sm font-semibold text-gray-900 transition hover:bg-gray-100",
+            "input": "w-full rounded-xl border border-gray-300 bg-white px-4 py-3 text-sm text-gray-900 placeholder:text-gray-400 focus:outline-none focus:border-gray-900",
+            "link": "text-gray-900 underline underline-offset-4 hover:text-gray-600 transition-colors",
+            "divider": "border-t border-gray-200 my-8",
+        },
+    },
+    "editorial": {
+        "body": "bg-stone-50 text-stone-900 antialiased",
+        "nav": "border-b border-stone-300 bg-stone-50",
+        "brand": "font-serif text-xl font-semibold tracking-tight text-stone-900",
+        "link": "text-stone-500 transition hover:text-stone-900",
+        "link_active": "text-stone-900 underline underline-offset-4",
+        "auth_button": "border-stone-400 hover:bg-stone-100",
+        "footer": "border-t border-stone-300 text-stone-500",
+        "design_system": {
+            "container": "max-w-6xl mx-auto px-6 sm:px-8",
+            "card": "border border-stone-300 bg-white p-8",
+            "h1": "font-serif text-3xl font-semibold tracking-tight text-stone-900 mb-6 text-center",
+            "h2": "font-serif text-2xl font-semibold text-stone-900",
+            "h3": "font-serif text-lg font-semibold text-stone-900",
+            "text_muted": "text-sm text-stone-500",
+            "badge_positive": "inline-flex items-center px-2 py-0.5 text-xs uppercase tracking-widest border border-green-700 text-green-800",
+            "badge_negative": "inline-flex items-center px-2 py-0.5 text-xs uppercase tracking-widest border border-red-700 text-red-800",
+            "badge_neutral": "inline-flex items-center px-2 py-0.5 text-xs uppercase tracking-widest border border-stone-400 text-stone-600",
+            "btn_primary": "w-full bg-stone-900 px-5 py-3 text-sm font-semibold text-stone-50 transition hover:bg-stone-700",
+            "btn_secondary": "inline-block border border-stone-900 px-5 py-3 text-sm font-semibold text-stone-900 transition hover:bg-stone-100",
+            "input": "w-full border border-stone-300 bg-white px-4 py-3 text-sm text-stone-900 placeholder:text-stone-400 focus:outline-none focus:border-stone-900",
+            "link": "text-stone-900 underline underline-offset-4 hover:text-stone-600 transition-colors",
+            "divider": "border-t border-stone-300 my-8",
+        },
+    },
+}
+
+
+def _safe_text(text: str) -> str:
+    """Texto literal dentro de un template: escapado y sin abrir etiquetas Django."""
+    return escape(text).replace("{", "&#123;").replace("}", "&#125;")
+
+
+def fast_design_system(style: str) -> dict:
+    """Design system (mismas claves que el del LLM) para el estilo dado."""
+    return dict(_THEMES[style]["design_system"])
+
+
+def fast_base_html(site_title: str, pages: list[dict], style: str, site_type: str) -> str:
+    """base.html con navegación, auth (salvo portfolio) y footer en la paleta del estilo."""
+    theme = _THEMES[style]
+    title = _safe_text(site_title)
+    nav_links = "\n".join(
+        f"        <a href=\"{{% url '{p['name']}' %}}\" "
+        f"class=\"{{% if request.resolver_match.url_name == '{p['name']}' %}}{theme['link_active']}"
+        f"{{% else %}}{theme['link']}{{% endif %}}\">{_safe_text(p['name'].replace('_', ' ').title())}</a>"
+        for p in pages if not p.get("is_detail")
+    )
+    auth_block = "" if site_type == "portfolio" else (
+        "        {% if user.is_authenticated %}\n"
+        "          <span class=\"opacity-70\">{{ user.username }}</span>\n"
+        "          <form method=\"post\" action=\"{% url 'logout' %}\">\n"
+        "            {% csrf_token %}\n"
+        f"            <button type=\"submit\" class=\"{theme['link']}\">Cerrar sesión</button>\n"
+        "          </form>\n"
+        "        {% else %}\n"
+        f"          <a href=\"{{% url 'login' %}}\" class=\"{theme['link']}\">Entrar</a>\n"
+        f"          <a href=\"{{% url 'register' %}}\" class=\"rounded-lg border px-3 py-1 transition {theme['auth_button']}\">Registro</a>\n"
+        "        {% endif %}\n"
+    )
+    return (
+        "<!doctype html>\n"
+        "<html lang=\"es\">\n"
+        "<head>\n"
+        "  <meta charset=\"utf-8\">\n"
+        "  <meta name=\"viewport\" content=\"width=device-width,initial-scale=1\">\n"
+        f"  <title>{{% block title %}}{title}{{% endblock %}}</title>\n"
+        "  <script src=\"https://cdn.tailwindcss.com\"></script>\n"
+        "</head>\n"
+        f"<body class=\"{theme['body']} min-h-screen flex flex-col\">\n"
+        f"  <nav class=\"{theme['nav']} sticky top-0 z-40\">\n"
+        "    <div class=\"mx-auto flex max-w-7xl flex-wrap items-center justify-between gap-4 px-6 py-4 sm:px-8 lg:px-12\">\n"
+        f"      <a href=\"{{% url '{pages[0]['name']}' %}}\" class=\"{theme['brand']}\">{title}</a>\n"
+        "      <div class=\"flex flex-wrap items-center gap-5 text-sm\">\n"
+        f"{nav_links}\n"
+        f"{auth_block}"
+        "      </div>\n"
+        "    </div>\n"
+        "  </nav>\n"
+        "  <main class=\"flex-1\">\n"
+        "    {% block content %}{% endblock %}\n"
+        "  </main>\n"
+        f"  <footer class=\"{theme['footer']} py-8 text-center text-xs\">\n"
+        f"    © {{% now 'Y' %}} {title}\n"
+        "  </footer>\n"
+        "</body>\n"
+        "</html>\n"
+    )
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# MODELS / VIEWS / LOAD_DATA
+# ──────────────────────────────────────────────────────────────────────────────
+
+def fast_models(fields: list[dict], field_roles: dict, title_key: str | None = None) -> str:
+    """models.py con un campo por cada campo del plan, tipado por su rol."""
+    names = fast_field_names(fields)
+    lines = ["from django.db import models", "", "", "class Item(models.Model):"]
+    for key, name in names.items():
+        lines.append(f"    {name} = {_ROLE_FIELD.get(field_roles.get(key), _DEFAULT_FIELD)}")
+    lines += [
+        "    created_at = models.DateTimeField(auto_now_add=True)",
+        "",
+        "    def __str__(self):",
+    ]
+    if title_key in names:
+        lines.append(f"        return str(self.{names[title_key]} or self.pk)")
+    else:
+        lines.append("        return str(self.pk)")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def fast_views(pages: list[dict], site_title: str) -> str:
+    """views.py con el contexto que esperan los ejemplos (items, featured, page_obj, item)."""
+    lines = [
+        "from django.core.paginator import Paginator",
+        "from django.shortcuts import get_object_or_404, render",
+        "",
+        "from .models import Item",
+        "",
+        f"SITE_TITLE = {site_title!r}",
+        "",
+    ]
+    for page in pages:
+        lines.append("")
+        if page.get("is_detail"):
+            lines += [
+                f"def {page['view_name']}(request, pk):",
+                "    item = get_object_or_404(Item, pk=pk)",
+                f"    return render(request, '{page['template']}', {{'item': item, 'site_title': SITE_TITLE}})",
+                "",
+            ]
+        elif page.get("is_list"):
+            lines += [
+                f"def {page['view_name']}(request):",
+                "    paginator = Paginator(Item.objects.order_by('pk'), 12)",
+                "    page_obj = paginator.get_page(request.GET.get('page'))",
+                f"    return render(request, '{page['template']}', {{'page_obj': page_obj, 'site_title': SITE_TITLE}})",
+                "",
+            ]
+        else:
+            lines += [
+                f"def {page['view_name']}(request):",
+                "    items = list(Item.objects.order_by('pk')[:12])",
+                f"    return render(request, '{page['template']}', {{",
+                "        'items': items,",
+                "        'featured': items[:6],",
+                "        'site_title': SITE_TITLE,",
+                "    })",
+                "",
+            ]
+    return "\n".join(lines)
+
+
+_LOAD_DATA_HELPERS = '''
+
+def _find_items(data):
+    """Colección principal (MAIN_PATH) o, si no está, la primera lista que aparezca."""
+    node = data
+    for part in MAIN_PATH:
+        if isinstance(part, int) and isinstance(node, list) and 0 <= part < len(node):
+            node = node[part]
+        elif isinstance(part, str) and isinstance(node, dict):
+            node = node.get(part)
+        else:
+            node = None
+            break
+    if isinstance(node, list):
+        return node
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        return next((v for v in data.values() if isinstance(v, list)), [])
+    return []
+
+
+def _convert(value, kind):
+    if value is None:
+        return None if kind in ('number', 'boolean') else ''
+    if kind == 'number':
+        try:
+            return float(str(value).replace('%', '').replace(',', '.').strip())
+        except ValueError:
+            return None
+    if kind == 'boolean':
+        if isinstance(value, bool):
+            return value
+        return str(value).strip().lower() in ('1', 'true', 'yes', 'si', 'sí', 'y', 't')
+    text = json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else str(value)
+    if kind == 'long_text':
+        return text
+    return text[:1000] if kind == 'url' else text[:500]
+'''
+
+
+def fast_load_data(fields: list[dict], field_roles: dict, api_url: str, main_path: list | None) -> str:
+    """management command load_data: descarga la API y crea un Item por registro."""
+    names = fast_field_names(fields)
+    mapping = {key: (name, _ROLE_KIND.get(field_roles.get(key), "text")) for key, name in names.items()}
+    return (
+        "import json\n"
+        "\n"
+        "import requests\n"
+        "from django.core.management.base import BaseCommand\n"
+        "\n"
+        "from siteapp.models import Item\n"
+        "\n"
+        f"API_URL = {api_url!r}\n"
+        f"MAIN_PATH = {list(main_path or [])!r}\n"
+        "# key de la API -> (campo del modelo, conversión)\n"
+        f"FIELDS = {mapping!r}\n"
+        + _LOAD_DATA_HELPERS +
+        "\n"
+        "\n"
+        "class Command(BaseCommand):\n"
+        "    help = 'Carga datos desde la API'\n"
+        "\n"
+        "    def handle(self, *args, **options):\n"
+        "        if Item.objects.exists():\n"
+        "            self.stdout.write('Ya hay datos cargados, no se repite la carga.')\n"
+        "            return\n"
+        "\n"
+        "        try:\n"
+        "            response = requests.get(API_URL, timeout=30)\n"
+        "            response.raise_for_status()\n"
+        "            data = response.json()\n"
+        "        except Exception as e:\n"
+        "            self.stderr.write(f'Error descargando datos: {e}')\n"
+        "            return\n"
+        "\n"
+        "        created = 0\n"
+        "        for raw in _find_items(data):\n"
+        "            if not isinstance(raw, dict):\n"
+        "                continue\n"
+        "            try:\n"
+        "                Item.objects.create(**{\n"
+        "                    name: _convert(raw.get(key), kind) for key, (name, kind) in FIELDS.items()\n"
+        "                })\n"
+        "                created += 1\n"
+        "            except Exception as e:\n"
+        "                self.stderr.write(f'Registro omitido: {e}')\n"
+        "\n"
+        "        self.stdout.write(self.style.SUCCESS(f'Creados {created} items.'))\n"
+    )
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# TEMPLATES DE PÁGINA (ejemplos con los campos reales)
+# ──────────────────────────────────────────────────────────────────────────────
+
+_PLACEHOLDER_RE = re.compile(r"\b(\w+)\.CAMPO_([A-Z]+)\b")
+_VAR_TAG_RE = re.compile(r"\{\{[^}]*\}\}")
+
+
+def _page_kind(page: dict) -> str:
+    if page.get("is_detail"):
+        return "detail"
+    if page.get("is_list"):
+        return "list"
+    return "home"
+
+
+def fast_template(
+    page: dict,
+    pages: list[dict],
+    *,
+    site_type: str,
+    style: str,
+    placeholders: dict[str, str],
+    fields: list[dict],
+    field_roles: dict,
+) -> str:
+    """
+    Template de una página: el ejemplo de su tipo con los placeholders
+    CAMPO_* y NOMBRE_URL_* sustituidos por los campos y URLs reales.
+    """
+    examples = EXAMPLES_BY_TYPE.get(site_type) or EXAMPLES_BY_TYPE["catalog"]
+    html = examples[_page_kind(page)][style]
+
+    # URLs: home, listado y detalle reales (portfolio no tiene listado → home)
+    home = next((p for p in pages if not p.get("is_list") and not p.get("is_detail")), pages[0])
+    listing = next((p for p in pages if p.get("is_list")), home)
+    detail = next((p for p in pages if p.get("is_detail")), home)
+    for placeholder, target in (("HOME", home), ("LISTADO", listing), ("DETALLE", detail)):
+        html = html.replace(f"NOMBRE_URL_{placeholder}", target["name"])
+    # Algunas portadas llaman "featured" al primer item ({% with items.0 as featured %})
+    # y recorren "featured" como lista dentro del with: ahí van los siguientes items
+    if "{% with items.0 as featured %}" in html:
+        html = html.replace("{% for item in featured %}", "{% for item in items|slice:\"1:7\" %}")
+
+    names = fast_field_names(fields)
+    attrs = {ph: names[key] for ph, key in placeholders.items() if key in names}
+    numeric = {ph for ph, key in placeholders.items() if field_roles.get(key) in ("numeric", "percent")}
+
+    def replace_tag(match: re.Match) -> str:
+        tag = match.group(0)
+        found = _PLACEHOLDER_RE.search(tag)
+        if not found:
+            return tag
+        obj, ph = found.groups()
+        if ph in attrs:
+            value = f"{obj}.{attrs[ph]}"
+            if ph in numeric and tag.replace(" ", "") == f"{{{{{found.group(0)}}}}}":
+                return f"{{{{ {value}|floatformat:\"-2\" }}}}"
+            return tag.replace(found.group(0), value)
+        # Sin campo: el título cae en __str__; el resto no se pinta
+        return tag.replace(found.group(0), obj) if ph == "TITULO" else ""
+
+    html = _VAR_TAG_RE.sub(replace_tag, html)
+
+    # Condiciones ({% if item.CAMPO_X %}): campo real o None (el bloque no se pinta)
+    html = _PLACEHOLDER_RE.sub(
+        lambda m: f"{m.group(1)}.{attrs[m.group(2)]}" if m.group(2) in attrs else "None",
+        html,
+    )
+    # Comentarios de ayuda de los ejemplos ({# campo título principal #})
+    html = re.sub(r"[ \t]*\{#.*?#\}", "", html)
+    return html
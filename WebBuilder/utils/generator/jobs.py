@@ -0,0 +1,401 @@
+"""
+jobs.py — Cola persistente de generaciones (tabla GenerationJob).
+
+Las vistas encolan un job y responden al momento; el comando
+`manage.py generation_worker` los ejecuta fuera de gunicorn.
+
+  - enqueue_generation: crea el job (cancela los anteriores del mismo sitio).
+  - generate_fast: generación rápida sin LLM, ejecutada al momento en la vista.
+  - cancel_generation: cancela el job activo de un sitio.
+  - claim_next_job: reclama un job con SELECT ... FOR UPDATE SKIP LOCKED,
+    respetando el máximo global de generaciones simultáneas.
+  - run_job: ejecuta la generación con reintentos y cancelación cooperativa
+    (arun_job: lo mismo sobre asyncio, para el worker --async).
+  - heartbeat / recover_orphans: los workers marcan latido; los jobs "running"
+    sin latido reciente (worker muerto) se reencolan o se dan por fallidos.
+  - JobCheckpoint: guarda en el job el resultado de cada paso al terminar; un
+    reintento (o una regeneración tras un fallo) continúa desde ahí.
+"""
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import json
+import logging
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ...models import GeneratedSite, GenerationJob
+from ..llm.rate_limit import llm_user
+from .step_cache import NO_CACHE, step_key
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock de Postgres que serializa los claims (cap global exacto)
+_CLAIM_LOCK_ID = 0x57424A4F42  # "WBJOB"
+
+CANCELLED_MESSAGE = "Generación cancelada por el usuario."
+
+
+class GenerationCancelled(Exception):
+    """Se lanza dentro de la generación cuando el job se ha cancelado."""
+
+
+# Job que se está ejecutando en este contexto (lo mira raise_if_cancelled)
+_current_job: contextvars.ContextVar[int | None] = contextvars.ContextVar("generation_job", default=None)
+
+
+@contextlib.contextmanager
+def generation_job(job_id: int):
+    """Los puntos de cancelación dentro del bloque miran solo el job `job_id`."""
+    token = _current_job.set(job_id)
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ENCOLAR / CANCELAR (vistas)
+# ──────────────────────────────────────────────────────────────────────────────
+
+def enqueue_generation(site: GeneratedSite, *, reuse_steps: bool = True) -> GenerationJob:
+    """
+    Encola la generación del sitio, lo marca como "generating" y vacía sus archivos.
+    Un job anterior del mismo sitio se cancela (si ya corre, al siguiente paso).
+    Con reuse_steps=False se regenera desde cero, sin la cache de pasos.
+    """
+    with transaction.atomic():
+        # Reanudar: se parte de los pasos del último intento fallido o cancelado.
+        # Las claves dependen de las entradas, así que lo que haya cambiado se repite.
+        previous = (
+            GenerationJob.objects
+            .filter(site=site, status__in=("failed", "cancelled", "queued", "running"))
+            .exclude(checkpoint={})
+            .order_by("-created_at")
+            .values_list("checkpoint", flat=True)
+            .first()
+        ) if reuse_steps else None
+        _cancel_active(site)
+        site.generation_status = "generating"
+        site.generation_error = ""
+        site.generation_step = "En cola..."
+        site.project_files = {}
+        site.save(update_fields=["generation_status", "generation_error", "generation_step", "project_files"])
+        job = GenerationJob.objects.create(
+            site=site,
+            max_attempts=getattr(settings, "GENERATION_MAX_ATTEMPTS", 2),
+            reuse_steps=reuse_steps,
+            checkpoint=previous or {},
+        )
+    logger.info("[jobs] Job #%s encolado para el sitio %s", job.pk, site.pk)
+    return job
+
+
+def generate_fast(site: GeneratedSite) -> GenerationJob:
+    """
+    Generación rápida (determinista, sin LLM): no pasa por la cola. El job se
+    crea ya en marcha y se ejecuta en el propio proceso, porque tarda menos
+    que lo que el worker tardaría en recogerlo.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        _cancel_active(site)
+        site.generation_status = "generating"
+        site.generation_error = ""
+        site.generation_step = "Generando versión rápida..."
+        site.project_files = {}
+        site.save(update_fields=["generation_status", "generation_error", "generation_step", "project_files"])
+        job = GenerationJob.objects.create(
+            site=site,
+            mode="fast",
+            status="running",
+            attempts=1,
+            max_attempts=1,
+            worker="web",
+            started_at=now,
+            heartbeat_at=now,
+        )
+    logger.info("[jobs] Job #%s: generación rápida del sitio %s", job.pk, site.pk)
+    run_job(job)
+    job.refresh_from_db(fields=["status", "error", "finished_at"])
+    return job
+
+
+def cancel_generation(site: GeneratedSite) -> bool:
+    """Cancela la generación en curso del sitio. Devuelve False si no había ninguna."""
+    with transaction.atomic():
+        cancelled = _cancel_active(site)
+        if cancelled:
+            site.generation_status = "error"
+            site.generation_error = CANCELLED_MESSAGE
+            site.generation_step = ""
+            site.save(update_fields=["generation_status", "generation_error", "generation_step"])
+    return cancelled
+
+
+def _cancel_active(site: GeneratedSite) -> bool:
+    now = timezone.now()
+    queued = GenerationJob.objects.filter(site=site, status="queued").update(
+        status="cancelled", finished_at=now, error=CANCELLED_MESSAGE,
+    )
+    running = GenerationJob.objects.filter(site=site, status="running").update(cancel_requested=True)
+    return bool(queued or running)
+
+
+def raise_if_cancelled(site: GeneratedSite) -> None:
+    """
+    Punto de cancelación cooperativa: se llama entre pasos de la generación.
+    Dentro de un job (generation_job) solo cuenta la cancelación de ese job:
+    el job anterior del sitio sigue "running" hasta su siguiente punto de
+    cancelación y su marca no debe cortar la regeneración que lo sustituye.
+    """
+    job_id = _current_job.get()
+    if job_id is not None:
+        cancelled = GenerationJob.objects.filter(pk=job_id, cancel_requested=True)
+    else:
+        cancelled = GenerationJob.objects.filter(site=site, status="running", cancel_requested=True)
+    if cancelled.exists():
+        raise GenerationCancelled(CANCELLED_MESSAGE)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CHECKPOINTS (reanudar una generación a medias)
+# ──────────────────────────────────────────────────────────────────────────────
+
+class JobCheckpoint:
+    """
+    Almacén de run_steps sobre GenerationJob.checkpoint: cada paso terminado
+    se escribe en la BD en el momento, con el hash de sus entradas. Si el
+    worker muere o el job se reintenta, los pasos con la misma clave no se
+    vuelven a ejecutar.
+    """
+
+    def __init__(self, job: GenerationJob):
+        self.job = job
+        self.data = dict(job.checkpoint or {})
+        self.resumed = 0
+
+    def lookup(self, step: dict, kwargs: dict) -> dict | None:
+        entry = self.data.get(step["name"])
+        if not entry or entry.get("key") != step_key(step, kwargs):
+            return None
+        self.resumed += 1
+        logger.info("[jobs] Job #%s: paso '%s' recuperado del checkpoint", self.job.pk, step["name"])
+        return entry["outputs"]
+
+    def store(self, step: dict, kwargs: dict, result: dict) -> None:
+        if result.get(NO_CACHE):
+            return   # Salió de un fallback: al reanudar se reintenta con el LLM
+        entry = {"key": step_key(step, kwargs), "outputs": {k: result[k] for k in step["provides"]}}
+        try:
+            # Ida y vuelta por JSON: lo mismo que se leerá al reanudar
+            self.data[step["name"]] = json.loads(json.dumps(entry, cls=DjangoJSONEncoder))
+            GenerationJob.objects.filter(pk=self.job.pk).update(checkpoint=self.data)
+        except (TypeError, ValueError):
+            self.data.pop(step["name"], None)
+            logger.warning("[jobs] Job #%s: el paso '%s' no es serializable, sin checkpoint", self.job.pk, step["name"])
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# WORKER
+# ──────────────────────────────────────────────────────────────────────────────
+
+def claim_next_job(worker_id: str) -> GenerationJob | None:
+    """
+    Reclama el siguiente job listo, o None si no hay ninguno o ya se ha
+    alcanzado GENERATION_MAX_CONCURRENCY (contando todos los workers).
+    """
+    max_running = getattr(settings, "GENERATION_MAX_CONCURRENCY", 4)
+    now = timezone.now()
+    with transaction.atomic():
+        # El conteo + claim debe ser atómico entre procesos para que el cap sea exacto
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [_CLAIM_LOCK_ID])
+        if GenerationJob.objects.filter(status="running").count() >= max_running:
+            return None
+        job = (
+            GenerationJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status="queued", run_after__lte=now)
+            .order_by("run_after", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = "running"
+        job.attempts += 1
+        job.worker = worker_id
+        job.started_at = now
+        job.heartbeat_at = now
+        job.save(update_fields=["status", "attempts", "worker", "started_at", "heartbeat_at"])
+    return job
+
+
+def heartbeat(job_ids: list[int]) -> None:
+    """Marca como vivos los jobs que está ejecutando este worker."""
+    if job_ids:
+        GenerationJob.objects.filter(pk__in=job_ids, status="running").update(heartbeat_at=timezone.now())
+
+
+def recover_orphans() -> int:
+    """
+    Jobs "running" cuyo worker dejó de latir (reinicio, OOM, kill): se
+    reencolan si les quedan intentos o se dan por fallidos.
+    """
+    orphan_after = getattr(settings, "GENERATION_ORPHAN_AFTER", 180)
+    limit = timezone.now() - timedelta(seconds=orphan_after)
+    recovered = 0
+    with transaction.atomic():
+        orphans = (
+            GenerationJob.objects
+            .select_for_update(skip_locked=True)
+            .select_related("site")
+            .filter(status="running", heartbeat_at__lt=limit)
+        )
+        for job in orphans:
+            message = f"El worker {job.worker or '?'} dejó de responder."
+            if job.cancel_requested:
+                _finish(job, "cancelled", CANCELLED_MESSAGE, site_error=CANCELLED_MESSAGE)
+            elif job.attempts < job.max_attempts:
+                _requeue(job, message)
+            else:
+                _finish(job, "failed", message, site_error=message)
+            recovered += 1
+    if recovered:
+        logger.warning("[jobs] %s job(s) huérfanos recuperados", recovered)
+    return recovered
+
+
+def run_job(job: GenerationJob) -> None:
+    """Ejecuta un job ya reclamado y deja el job y el sitio en su estado final."""
+    # Import local: project_generator importa este módulo
+    from .project_generator import generate_fast_project_files, generate_project_files
+
+    site = job.site
+    start_time = time.time()
+    _log_start(job, site)
+
+    try:
+        with generation_job(job.pk):
+            if job.mode == "fast":
+                files = generate_fast_project_files(site)
+            else:
+                # Las llamadas al LLM del job cuentan para su dueño en la cola del rate limit
+                with llm_user(site.project_source.user_id):
+                    files = generate_project_files(site, reuse_steps=job.reuse_steps, checkpoint=JobCheckpoint(job))
+    except GenerationCancelled:
+        _finish(job, "cancelled", CANCELLED_MESSAGE, site_error=CANCELLED_MESSAGE)
+        return
+    except Exception as exc:
+        logger.exception("[jobs] Job #%s falló", job.pk)
+        _fail(job, exc)
+        return
+
+    _publish(job, site, files, start_time)
+
+
+async def arun_job(job: GenerationJob) -> None:
+    """
+    Versión async de run_job para `generation_worker --async`: la generación
+    con LLM corre sobre el event loop (agenerate_project_files) y los cambios
+    de estado en la BD van con sync_to_async.
+    """
+    from .project_generator import agenerate_project_files, generate_fast_project_files
+
+    site = await sync_to_async(lambda: job.site)()
+    user_id = await sync_to_async(lambda: site.project_source.user_id)()
+    start_time = time.time()
+    _log_start(job, site)
+
+    try:
+        with generation_job(job.pk):
+            if job.mode == "fast":
+                files = await sync_to_async(generate_fast_project_files)(site)
+            else:
+                with llm_user(user_id):
+                    files = await agenerate_project_files(site, reuse_steps=job.reuse_steps, checkpoint=JobCheckpoint(job))
+    except GenerationCancelled:
+        await sync_to_async(_finish)(job, "cancelled", CANCELLED_MESSAGE, site_error=CANCELLED_MESSAGE)
+        return
+    except Exception as exc:
+        logger.exception("[jobs] Job #%s falló", job.pk)
+        await sync_to_async(_fail)(job, exc)
+        return
+
+    await sync_to_async(_publish)(job, site, files, start_time)
+
+
+def _log_start(job: GenerationJob, site: GeneratedSite) -> None:
+    logger.info(
+        "[jobs] Job #%s: generando sitio %s (%s, intento %s/%s)",
+        job.pk, site.pk, job.mode, job.attempts, job.max_attempts,
+    )
+
+
+def _fail(job: GenerationJob, exc: Exception) -> None:
+    """La generación lanzó un error: cancelado, reintento o fallo definitivo."""
+    job.refresh_from_db(fields=["cancel_requested"])
+    if job.cancel_requested:
+        _finish(job, "cancelled", CANCELLED_MESSAGE, site_error=CANCELLED_MESSAGE)
+    elif job.attempts < job.max_attempts:
+        _requeue(job, str(exc))
+    else:
+        _finish(job, "failed", str(exc), site_error=str(exc))
+
+
+def _publish(job: GenerationJob, site: GeneratedSite, files: dict[str, str], start_time: float) -> None:
+    """Guarda los archivos generados en el sitio y cierra el job."""
+    from .notifications import notify_generation_done, notify_generation_done_later
+
+    with transaction.atomic():
+        job.refresh_from_db(fields=["cancel_requested"])
+        if job.cancel_requested:
+            # Cancelado durante el último paso: no se publican los archivos
+            _finish(job, "cancelled", CANCELLED_MESSAGE, site_error=CANCELLED_MESSAGE)
+            return
+        site.project_files = files
+        site.generation_status = "ready"
+        site.generation_error = ""
+        site.save(update_fields=["project_files", "generation_status", "generation_error"])
+        _finish(job, "done", "")
+        # Terminado: ya no hay nada que reanudar (la cache de pasos sigue sirviendo)
+        GenerationJob.objects.filter(pk=job.pk).update(checkpoint={})
+
+    # Notificar a n8n (el modo rápido corre en la petición web: sin esperar al webhook)
+    notify = notify_generation_done_later if job.mode == "fast" else notify_generation_done
+    notify(site, duration_seconds=int(time.time() - start_time))
+
+
+def _requeue(job: GenerationJob, error: str) -> None:
+    delay = getattr(settings, "GENERATION_RETRY_DELAY", 60) * job.attempts
+    job.status = "queued"
+    job.error = error
+    job.worker = ""
+    job.run_after = timezone.now() + timedelta(seconds=delay)
+    job.save(update_fields=["status", "error", "worker", "run_after"])
+    GeneratedSite.objects.filter(pk=job.site_id).update(
+        generation_step=f"Reintentando (intento {job.attempts + 1}/{job.max_attempts})...",
+    )
+    logger.warning("[jobs] Job #%s reencolado en %ss: %s", job.pk, delay, error)
+
+
+def _finish(job: GenerationJob, status: str, error: str, *, site_error: str | None = None) -> None:
+    job.status = status
+    job.error = error
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "finished_at"])
+    if site_error is not None:
+        # Solo si este job sigue siendo el último del sitio (no pisa una regeneración nueva)
+        newer = GenerationJob.objects.filter(site_id=job.site_id, pk__gt=job.pk).exists()
+        if not newer:
+            GeneratedSite.objects.filter(pk=job.site_id).update(
+                generation_status="error", generation_error=site_error, generation_step="",
+            )
@@ -5,15 +5,21 @@ Centraliza:
   - _llm_call: llamada básica con manejo de errores
   - _llm_json_call: llamada esperando JSON
   - _llm_call_logged: llamada con guardado de log en BD
+  - code_prefix_validator: corta en streaming respuestas que empiezan mal
+  - allm_call, allm_json_call, allm_call_logged...: las mismas llamadas con
+    el cliente async (achat_completion), para generar sobre un event loop
   - strip_markdown_fences: limpieza de fences Markdown en la respuesta
 """
 from __future__ import annotations
 
 import re
-import time
 import logging
 
-from ..llm.client import chat_completion, LLMError
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from ..llm import response_cache
+from ..llm.client import achat_completion, chat_completion, LLMAborted, LLMError
 from ..llm.llm_utils import parse_llm_json
 
 logger = logging.getLogger(__name__)
@@ -33,29 +39,125 @@ logger = logging.getLogger(__name__)
 #        # propagar en vez de pasar
 #        raise   
 
-# INCREMENTAL EN TIEMPO POR CADA ERROR
-def llm_call(system: str, user_text: str, label: str, temperature: float = 0.3) -> str:
-    delays = [5, 15, 30]  # esperas entre reintentos si hay 429
-    for attempt, delay in enumerate(delays, 1):
+# REINTENTOS SI HAY 429 (la espera la pone el límite compartido, ver rate_limit.py)
+def llm_call(
+    system: str,
+    user_text: str,
+    label: str,
+    temperature: float = 0.3,
+    *,
+    on_progress=None,
+    validate=None,
+    cache: bool = False,
+) -> str:
+    """
+    Llamada al LLM con reintentos si hay 429: la espera la pone el límite
+    compartido (rate_limit), que respeta el Retry-After del proveedor para
+    todos los workers. Con LLM_STREAMING la respuesta
+    llega por trozos: `on_progress(texto, trozos)` recibe lo acumulado y
+    `validate(texto)` puede cortarla en cuanto el principio no es válido.
+    Si se corta, se repite una vez recordando el formato y sin validar.
+    Con cache=True (solo temperatura 0) las llamadas idénticas se sirven de
+    la cache de respuestas compartida (response_cache).
+    """
+    stream = getattr(settings, "LLM_STREAMING", True)
+    if not stream:
+        on_progress = validate = None
+    attempt = 0
+    while True:
         try:
             return chat_completion(
                 user_text=user_text,
                 system_text=system,
                 temperature=temperature,
+                stream=stream,
+                on_progress=on_progress,
+                validate=validate,
+                cache=cache,
             )
+        except LLMAborted as e:
+            if validate is None:
+                raise
+            logger.warning(f"[generator] '{label}' cortado en streaming ({e}), reintentando")
+            user_text += _FORMAT_REMINDER
+            validate = None
         except LLMError as e:
-            is_rate_limit = "429" in str(e) or "rate" in str(e).lower()
-            if is_rate_limit and attempt < len(delays):
-                logger.warning(f"[generator] Rate limit en '{label}', reintentando en {delay}s (intento {attempt})")
-                time.sleep(delay)
-            else:
+            attempt += 1
+            if not _retry_rate_limit(e, label, attempt):
                 raise
 
+
+RATE_LIMIT_ATTEMPTS = 3  # intentos si el proveedor responde 429
+
+
+def _retry_rate_limit(error: LLMError, label: str, attempt: int) -> bool:
+    """
+    ¿Reintentar tras `error`? Solo si es un 429 y quedan intentos. No hace
+    falta dormir aquí: el 429 ya dejó el bucket en pausa (Retry-After) y el
+    siguiente intento espera su turno en rate_limit.acquire.
+    """
+    is_rate_limit = error.status_code == 429 or "429" in str(error) or "rate" in str(error).lower()
+    if not is_rate_limit or attempt >= RATE_LIMIT_ATTEMPTS:
+        return False
+    logger.warning(f"[generator] Rate limit en '{label}', reintentando (intento {attempt})")
+    return True
+
+
+# Se añade al prompt cuando el primer intento se cortó por empezar mal
+_FORMAT_REMINDER = (
+    "\n\nRECUERDA: responde directamente con el contenido del archivo, "
+    "sin ``` ni ningún texto antes o después."
+)
+
+# Caracteres (sin espacios) que se esperan antes de juzgar el principio
+_PREFIX_MIN_CHARS = 12
+_PREFIX_STARTS = {
+    "python": ("from ", "import ", "#", '"""', "'''", "class ", "def ", "@"),
+    "html": ("{%", "{#", "{{", "<"),
+}
+
+
+def code_prefix_validator(kind: str):
+    """
+    Validador para llm_call(validate=...) de respuestas que deben ser código
+    puro (`kind`: "python" o "html"). Rechaza en cuanto llega un bloque ```
+    o un preámbulo de texto, para no esperar a una respuesta que no sirve.
+    """
+    starts = _PREFIX_STARTS[kind]
+    accepted = False
+
+    def validate(text: str) -> str | None:
+        nonlocal accepted
+        if accepted:
+            return None   # El principio ya se dio por bueno: el resto no se mira
+        head = text.lstrip()
+        if head.startswith("```"):
+            return "empieza con un bloque Markdown"
+        first_line = head.split("\n", 1)[0]
+        if "\n" not in head and len(head.replace(" ", "")) < _PREFIX_MIN_CHARS:
+            return None
+        if not first_line.startswith(starts):
+            return f"empieza con texto que no es {kind}: {first_line[:40]!r}"
+        accepted = True
+        return None
+
+    return validate
+
+
 # En vez de chuks que devuleva todo de golpe
 
 def llm_json_call(system: str, user_text: str, label: str) -> dict:
-    """Llama al LLM esperando JSON. Devuelve {} si falla o si el JSON es inválido."""
-    raw = llm_call(system, user_text, label, temperature=0.0)
+    """
+    Llama al LLM esperando JSON. Devuelve {} si falla o si el JSON es inválido.
+    La respuesta se cachea (temperatura 0); si no es JSON válido se descarta.
+    """
+    result = _parse_json_reply(llm_call(system, user_text, label, temperature=0.0, cache=True), label)
+    if not result:
+        response_cache.forget(response_cache.cache_key(user_text, system, temperature=0.0))
+    return result
+
+
+def _parse_json_reply(raw: str, label: str) -> dict:
     if not raw:
         return {}
     try:
@@ -71,34 +173,43 @@ def llm_call_logged(
     label: str,
     temperature: float,
     site=None,
+    *,
+    on_progress=None,
+    validate=None,
 ) -> str:
     """Llama al LLM y guarda el log en BD si se pasa un objeto site."""
     error_msg = ""
     result = ""
 
     try:
-        result = llm_call(system, user_text, label, temperature)
+        result = llm_call(
+            system, user_text, label, temperature,
+            on_progress=on_progress, validate=validate,
+        )
     except LLMError as e:
         error_msg = str(e)   # ← capturamos el error real aquí
         logger.error(f"[generator] Error capturado en '{label}': {error_msg}")
 
     if site is not None:
-        try:
-            from ...models import GenerationLog
-            from django.conf import settings
-            GenerationLog.objects.create(
-                site=site,
-                step=label,
-                llm_model=settings.LLM_MODEL,
-                system_prompt=system[:2000],
-                user_prompt=user_text[:2000],
-                raw_output=result[:5000] if result else f"[ERROR] {error_msg}",  # ← el error queda visible
-            )
-        except Exception:
-            pass
+        _save_log(site, system, user_text, label, result, error_msg)
 
     return result  # sigue devolviendo "" cuando falla, el flujo no se rompe
 
+
+def _save_log(site, system: str, user_text: str, label: str, result: str, error_msg: str) -> None:
+    try:
+        from ...models import GenerationLog
+        GenerationLog.objects.create(
+            site=site,
+            step=label,
+            llm_model=settings.LLM_MODEL,
+            system_prompt=system[:2000],
+            user_prompt=user_text[:2000],
+            raw_output=result[:5000] if result else f"[ERROR] {error_msg}",  # ← el error queda visible
+        )
+    except Exception:
+        pass
+
 def strip_markdown_fences(code: str) -> str:
     code = code.strip()
 
@@ -141,59 +252,79 @@ def extract_requirements(code: str) -> tuple[str, list[str]]:
     return "\n".join(clean_lines).strip(), requirements
 
 
+_TRANSLATE_SYSTEM = (
+    "You are a translator. Your only job is to translate the user's text to English. "
+    "Return ONLY the translated text, nothing else. "
+    "No explanations, no preamble, no quotes. "
+    "If the text is already in English, return it exactly as is."
+)
+
+
+def _needs_translation(user_prompt: str) -> bool:
+    if not user_prompt or not user_prompt.strip():
+        return False
+    # Heurística: si >95% de los caracteres son ASCII, ya está en inglés
+    ascii_ratio = sum(1 for c in user_prompt if ord(c) < 128) / len(user_prompt)
+    return ascii_ratio <= 0.95
+
+
 def translate_prompt_to_english(user_prompt: str) -> str:
     """
     Traduce el prompt del usuario a inglés usando el LLM.
     Si falla o el prompt ya está en inglés, devuelve el original.
     """
-    if not user_prompt or not user_prompt.strip():
+    if not _needs_translation(user_prompt):
         return user_prompt
 
-    # Heurística: si >95% de los caracteres son ASCII, ya está en inglés
-    ascii_ratio = sum(1 for c in user_prompt if ord(c) < 128) / len(user_prompt)
-    if ascii_ratio > 0.95:
-        return user_prompt
-    
-    system = (
-        "You are a translator. Your only job is to translate the user's text to English. "
-        "Return ONLY the translated text, nothing else. "
-        "No explanations, no preamble, no quotes. "
-        "If the text is already in English, return it exactly as is."
-    )
-
     try:
-        result = llm_call(system, user_prompt, "translate_prompt", temperature=0.0)
+        result = llm_call(_TRANSLATE_SYSTEM, user_prompt, "translate_prompt", temperature=0.0, cache=True)
         return result.strip() if result.strip() else user_prompt
     except LLMError:
         logger.warning("[generator] Traducción del prompt falló, usando original")
         return user_prompt
     
 
-def llm_design_system_call(*, user_prompt: str, site_type: str, preset_description: str = "") -> dict:
+_DESIGN_SYSTEM_FALLBACK = {
+    "container": "max-w-7xl mx-auto px-6 sm:px-8",
+    "card": "rounded-2xl border border-gray-200 bg-white p-4",
+    "h1": "text-4xl font-bold tracking-tight text-gray-900",
+    "h2": "text-2xl font-semibold text-gray-900",
+    "h3": "text-lg font-bold text-gray-900",
+    "text_muted": "text-sm text-gray-500",
+    "badge_positive": "inline-flex items-center rounded-full px-3 py-1 text-xs font-medium bg-green-100 text-green-700",
+    "badge_negative": "inline-flex items-center rounded-full px-3 py-1 text-xs font-medium bg-red-100 text-red-700",
+    "badge_neutral": "inline-flex items-center rounded-full px-3 py-1 text-xs font-medium bg-gray-100 text-gray-600",
+    "btn_primary": "inline-block px-4 py-2 rounded-xl bg-gray-900 text-white font-semibold hover:bg-gray-700 transition-colors",
+    "btn_secondary": "inline-block px-4 py-2 rounded-xl border border-gray-900 text-gray-900 font-semibold hover:bg-gray-100 transition-colors",
+    "input": "w-full rounded-xl border border-gray-300 bg-white px-4 py-2 text-sm text-gray-900 placeholder:text-gray-400 focus:outline-none focus:border-gray-900",
+    "link": "text-gray-900 underline underline-offset-4 hover:text-gray-600 transition-colors",
+    "divider": "border-t border-gray-200 my-8",
+}
+
+
+def _complete_design_system(result: dict) -> dict:
+    # Validar que tiene todos los keys esperados
+    expected_keys = set(_DESIGN_SYSTEM_FALLBACK.keys())
+    if not expected_keys.issubset(result.keys()):
+        missing = expected_keys - result.keys()
+        logger.warning("[generator] Design system incompleto, keys faltantes: %s", missing)
+        # Rellenar los que faltan con el fallback
+        for key in missing:
+            result[key] = _DESIGN_SYSTEM_FALLBACK[key]
+
+    logger.info("[generator] Design system generado correctamente")
+    return result
+
+
+def llm_design_system_call(*, user_prompt: str, site_type: str, preset_description: str = "") -> tuple[dict, bool]:
     """
     Genera el design system de clases Tailwind para el proyecto.
-    Devuelve un dict con los keys fijos del sistema de diseño.
-    Si falla, devuelve un fallback genérico neutro.
+    Devuelve (design_system, used_fallback): un dict con los keys fijos del
+    sistema de diseño y si se tuvo que usar el fallback genérico neutro
+    (error del LLM o respuesta vacía), que no debe cachearse.
     """
     from ..llm.generator_prompts import prompt_design_system
 
-    _DESIGN_SYSTEM_FALLBACK = {
-        "container": "max-w-7xl mx-auto px-6 sm:px-8",
-        "card": "rounded-2xl border border-gray-200 bg-white p-4",
-        "h1": "text-4xl font-bold tracking-tight text-gray-900",
-        "h2": "text-2xl font-semibold text-gray-900",
-        "h3": "text-lg font-bold text-gray-900",
-        "text_muted": "text-sm text-gray-500",
-        "badge_positive": "inline-flex items-center rounded-full px-3 py-1 text-xs font-medium bg-green-100 text-green-700",
-        "badge_negative": "inline-flex items-center rounded-full px-3 py-1 text-xs font-medium bg-red-100 text-red-700",
-        "badge_neutral": "inline-flex items-center rounded-full px-3 py-1 text-xs font-medium bg-gray-100 text-gray-600",
-        "btn_primary": "inline-block px-4 py-2 rounded-xl bg-gray-900 text-white font-semibold hover:bg-gray-700 transition-colors",
-        "btn_secondary": "inline-block px-4 py-2 rounded-xl border border-gray-900 text-gray-900 font-semibold hover:bg-gray-100 transition-colors",
-        "input": "w-full rounded-xl border border-gray-300 bg-white px-4 py-2 text-sm text-gray-900 placeholder:text-gray-400 focus:outline-none focus:border-gray-900",
-        "link": "text-gray-900 underline underline-offset-4 hover:text-gray-600 transition-colors",
-        "divider": "border-t border-gray-200 my-8",
-    }
-
     try:
         system, user_text = prompt_design_system(
             site_type=site_type,
@@ -201,19 +332,122 @@ def llm_design_system_call(*, user_prompt: str, site_type: str, preset_descripti
             preset_description=preset_description,
         )
         result = llm_json_call(system, user_text, "design_system")
+        used_fallback = not result   # JSON vacío o roto: todo sale del fallback
+        return _complete_design_system(result), used_fallback
 
-        # Validar que tiene todos los keys esperados
-        expected_keys = set(_DESIGN_SYSTEM_FALLBACK.keys())
-        if not expected_keys.issubset(result.keys()):
-            missing = expected_keys - result.keys()
-            logger.warning("[generator] Design system incompleto, keys faltantes: %s", missing)
-            # Rellenar los que faltan con el fallback
-            for key in missing:
-                result[key] = _DESIGN_SYSTEM_FALLBACK[key]
+    except Exception as e:
+        logger.warning("[generator] Design system falló (%s), usando fallback neutro", e)
+        return dict(_DESIGN_SYSTEM_FALLBACK), True
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# VERSIONES ASYNC
+# Misma lógica que las de arriba sobre achat_completion. El log en BD se
+# escribe con sync_to_async (el ORM no se puede usar desde el event loop).
+# ──────────────────────────────────────────────────────────────────────────────
+
+async def allm_call(
+    system: str,
+    user_text: str,
+    label: str,
+    temperature: float = 0.3,
+    *,
+    on_progress=None,
+    validate=None,
+    cache: bool = False,
+) -> str:
+    """Versión async de llm_call (`on_progress` puede ser una corrutina)."""
+    stream = getattr(settings, "LLM_STREAMING", True)
+    if not stream:
+        on_progress = validate = None
+    attempt = 0
+    while True:
+        try:
+            return await achat_completion(
+                user_text=user_text,
+                system_text=system,
+                temperature=temperature,
+                stream=stream,
+                on_progress=on_progress,
+                validate=validate,
+                cache=cache,
+            )
+        except LLMAborted as e:
+            if validate is None:
+                raise
+            logger.warning(f"[generator] '{label}' cortado en streaming ({e}), reintentando")
+            user_text += _FORMAT_REMINDER
+            validate = None
+        except LLMError as e:
+            attempt += 1
+            if not _retry_rate_limit(e, label, attempt):
+                raise
+
+
+async def allm_json_call(system: str, user_text: str, label: str) -> dict:
+    """Versión async de llm_json_call."""
+    result = _parse_json_reply(await allm_call(system, user_text, label, temperature=0.0, cache=True), label)
+    if not result:
+        await sync_to_async(response_cache.forget)(response_cache.cache_key(user_text, system, temperature=0.0))
+    return result
+
+
+async def allm_call_logged(
+    system: str,
+    user_text: str,
+    label: str,
+    temperature: float,
+    site=None,
+    *,
+    on_progress=None,
+    validate=None,
+) -> str:
+    """Versión async de llm_call_logged."""
+    error_msg = ""
+    result = ""
+
+    try:
+        result = await allm_call(
+            system, user_text, label, temperature,
+            on_progress=on_progress, validate=validate,
+        )
+    except LLMError as e:
+        error_msg = str(e)
+        logger.error(f"[generator] Error capturado en '{label}': {error_msg}")
+
+    if site is not None:
+        await sync_to_async(_save_log)(site, system, user_text, label, result, error_msg)
+
+    return result
 
-        logger.info("[generator] Design system generado correctamente")
-        return result
+
+async def atranslate_prompt_to_english(user_prompt: str) -> str:
+    """Versión async de translate_prompt_to_english."""
+    if not _needs_translation(user_prompt):
+        return user_prompt
+
+    try:
+        result = await allm_call(_TRANSLATE_SYSTEM, user_prompt, "translate_prompt", temperature=0.0, cache=True)
+        return result.strip() if result.strip() else user_prompt
+    except LLMError:
+        logger.warning("[generator] Traducción del prompt falló, usando original")
+        return user_prompt
+
+
+async def allm_design_system_call(*, user_prompt: str, site_type: str, preset_description: str = "") -> tuple[dict, bool]:
+    """Versión async de llm_design_system_call."""
+    from ..llm.generator_prompts import prompt_design_system
+
+    try:
+        system, user_text = prompt_design_system(
+            site_type=site_type,
+            user_prompt=user_prompt,
+            preset_description=preset_description,
+        )
+        result = await allm_json_call(system, user_text, "design_system")
+        used_fallback = not result   # JSON vacío o roto: todo sale del fallback
+        return _complete_design_system(result), used_fallback
 
     except Exception as e:
         logger.warning("[generator] Design system falló (%s), usando fallback neutro", e)
-        return _DESIGN_SYSTEM_FALLBACK
\ No newline at end of file
+        return dict(_DESIGN_SYSTEM_FALLBACK), True
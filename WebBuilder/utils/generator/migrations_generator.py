@@ -77,8 +77,8 @@ def _extract_fields(models_code: str) -> list[tuple[str, str, str]]:
             if (
                 stripped
                 and not stripped.startswith("#")
-                and not stripped.startswith("def")
-                and not stripped.startswith("class")
+                and not stripped.startswith("def ")
+                and not stripped.startswith("class ")
                 and "=" in stripped
             ):
                 field_match = re.match(r"(\w+)\s*=\s*models\.(\w+)\((.*)\)", stripped)
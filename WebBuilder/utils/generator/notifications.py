@@ -4,6 +4,8 @@ notifications.py — Notificaciones a n8n tras eventos del generador.
 from __future__ import annotations
 
 import logging
+import threading
+
 import requests
 
 from django.conf import settings
@@ -20,12 +22,32 @@ def notify_generation_done(site, duration_seconds: int = 0) -> None:
     if not webhook_url:
         logger.info("[notify] N8N_WEBHOOK_GENERATION_DONE no configurado, omitiendo.")
         return
+    _post_generation_done(webhook_url, _generation_done_payload(site, duration_seconds))
+
 
+def notify_generation_done_later(site, duration_seconds: int = 0) -> None:
+    """
+    Igual que notify_generation_done, pero el webhook se envía en un hilo
+    aparte: para generaciones que corren dentro de la petición web (modo
+    rápido), que no deben esperar a n8n. El payload se arma aquí, así el
+    hilo no toca la base de datos.
+    """
+    webhook_url = getattr(settings, "N8N_WEBHOOK_GENERATION_DONE", "")
+    if not webhook_url:
+        logger.info("[notify] N8N_WEBHOOK_GENERATION_DONE no configurado, omitiendo.")
+        return
+    payload = _generation_done_payload(site, duration_seconds)
+    threading.Thread(
+        target=_post_generation_done, args=(webhook_url, payload), name="notify-generation-done", daemon=True,
+    ).start()
+
+
+def _generation_done_payload(site, duration_seconds: int) -> dict:
     plan = site.accepted_plan or {}
     fields = plan.get("fields") or []
     source = site.project_source
 
-    payload = {
+    return {
         "email":            source.user.email,
         "username":         source.user.username,
         "site_title":       plan.get("site_title", "Tu sitio"),
@@ -39,10 +61,12 @@ def notify_generation_done(site, duration_seconds: int = 0) -> None:
         "llm_model":        getattr(settings, "LLM_MODEL", ""),
     }
 
+
+def _post_generation_done(webhook_url: str, payload: dict) -> None:
     try:
         logger.info("[notify] Llamando webhook: %s", webhook_url)
         logger.info("[notify] Payload: %s", payload)
         resp = requests.post(webhook_url, json=payload, timeout=30)
         logger.info("[notify] generation-done enviado → %s", resp.status_code)
     except Exception as e:
-        logger.warning("[notify] Fallo al notificar generation-done: %s", e)
\ No newline at end of file
+        logger.warning("[notify] Fallo al notificar generation-done: %s", e)
@@ -0,0 +1,288 @@
+"""
+pipeline.py — Ejecutor de pasos con dependencias (DAG).
+
+Cada paso declara qué valores necesita (`needs`) y cuáles produce
+(`provides`). El ejecutor lanza a la vez todos los pasos cuyas entradas ya
+existen, así que la duración total es la del camino crítico y no la suma de
+todas las llamadas al LLM.
+
+  - step: declara un paso.
+  - run_steps: ejecuta los pasos sobre un contexto {nombre: valor} y devuelve
+    los tiempos de cada uno.
+  - arun_steps: lo mismo sobre un event loop (pasos async, sin hilos).
+  - raise_if_stopped: punto de parada para los pasos en marcha cuando
+    run_steps aborta (otro paso falló o el job se canceló).
+  - format_timings: resumen de tiempos para el log.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Evento de parada del run_steps en curso (los hilos de los pasos lo heredan con copy_context)
+_stop_event: contextvars.ContextVar[threading.Event | None] = contextvars.ContextVar("steps_stop", default=None)
+
+
+class StepsStopped(Exception):
+    """Un paso en marcha se corta porque run_steps está abortando."""
+
+
+def raise_if_stopped() -> None:
+    """
+    Punto de parada para los pasos: si run_steps está abortando, lanza
+    StepsStopped. Lo llama _update_step, así que un paso se para en su
+    siguiente aviso de progreso (también a mitad de una llamada en streaming).
+    """
+    event = _stop_event.get()
+    if event is not None and event.is_set():
+        raise StepsStopped("Generación abortada")
+
+
+def step(
+    name: str,
+    run: Callable[..., dict],
+    *,
+    needs: tuple[str, ...] = (),
+    provides: tuple[str, ...] = (),
+    label: str = "",
+    cache: bool = False,
+) -> dict:
+    """
+    Declara un paso. `run` recibe como kwargs los valores de `needs` y
+    devuelve un dict con (al menos) las claves de `provides`.
+    `label` es el texto de progreso que se muestra al arrancarlo.
+    `cache` indica que su resultado solo depende de `needs` (se puede reutilizar).
+    """
+    return {
+        "name": name, "run": run, "needs": tuple(needs), "provides": tuple(provides),
+        "label": label, "cache": cache,
+    }
+
+
+def _check_graph(steps: list[dict], context: dict) -> None:
+    """Valida nombres únicos, productores únicos y que toda entrada tenga origen."""
+    names = [s["name"] for s in steps]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Pasos con nombre repetido: {names}")
+
+    producers: dict[str, str] = {}
+    for s in steps:
+        for key in s["provides"]:
+            if key in producers or key in context:
+                raise ValueError(f"'{key}' lo produce más de un paso ({s['name']})")
+            producers[key] = s["name"]
+
+    for s in steps:
+        missing = [k for k in s["needs"] if k not in producers and k not in context]
+        if missing:
+            raise ValueError(f"El paso '{s['name']}' necesita {missing} y nadie lo produce")
+
+
+def _run_step(s: dict, kwargs: dict) -> tuple[dict, float]:
+    """Ejecuta un paso en un hilo del pool y mide su duración."""
+    start = time.perf_counter()
+    try:
+        result = s["run"](**kwargs) or {}
+    finally:
+        # Conexiones a la BD abiertas por este hilo (GenerationLog, perfiles...)
+        connections.close_all()
+    missing = [k for k in s["provides"] if k not in result]
+    if missing:
+        raise ValueError(f"El paso '{s['name']}' no devolvió {missing}")
+    return result, time.perf_counter() - start
+
+
+def _lookup(stores: list | None, s: dict, kwargs: dict) -> dict | None:
+    """Primer almacén que tenga el paso; el resultado se copia a los anteriores."""
+    for index, store in enumerate(stores or ()):
+        result = store.lookup(s, kwargs)
+        if result is not None:
+            for other in stores[:index]:
+                other.store(s, kwargs, result)
+            return result
+    return None
+
+
+def run_steps(
+    steps: list[dict],
+    context: dict,
+    *,
+    on_start: Callable[[dict], None] | None = None,
+    max_workers: int | None = None,
+    stores: list | None = None,
+) -> dict[str, dict]:
+    """
+    Ejecuta los pasos en cuanto sus entradas están disponibles y guarda sus
+    salidas en `context` (in place).
+
+    `on_start(step)` se llama desde el hilo que invoca run_steps antes de
+    lanzar cada paso (progreso / cancelación: si lanza, se aborta todo).
+    Si un paso falla, no se lanzan más y se propaga la excepción cuando los
+    que estaban en marcha han parado (en su siguiente raise_if_stopped): así
+    no siguen llamando al LLM ni escribiendo logs de un job ya terminado o
+    reencolado.
+
+    `stores`: almacenes de resultados con lookup(step, kwargs) / store(step,
+    kwargs, result) — checkpoint del job, cache de pasos... Antes de lanzar un
+    paso se consultan en orden; si alguno lo tiene, el paso no se ejecuta y
+    el resultado se copia a los demás. Al terminar un paso se guarda en todos.
+
+    Devuelve {paso: {"start": s desde el inicio, "seconds": duración, "cached": bool}}.
+    """
+    _check_graph(steps, context)
+    pending = list(steps)
+    running: dict = {}
+    timings: dict[str, dict] = {}
+    t0 = time.perf_counter()
+
+    stop = threading.Event()
+    stop_token = _stop_event.set(stop)
+    pool = ThreadPoolExecutor(max_workers=max_workers or max(1, len(steps)), thread_name_prefix="gen-step")
+    try:
+        while pending or running:
+            ready = [s for s in pending if all(k in context for k in s["needs"])]
+            for s in ready:
+                pending.remove(s)
+                kwargs = {k: context[k] for k in s["needs"]}
+                cached = _lookup(stores, s, kwargs)
+                if cached is not None:
+                    context.update({k: cached[k] for k in s["provides"]})
+                    timings[s["name"]] = {"start": time.perf_counter() - t0, "seconds": 0.0, "cached": True}
+                    continue
+                if on_start is not None:
+                    on_start(s)
+                # copy_context: el hilo del paso hereda el job (cancelación) y el usuario de las llamadas al LLM
+                future = pool.submit(contextvars.copy_context().run, _run_step, s, kwargs)
+                running[future] = (s, kwargs, time.perf_counter() - t0)
+
+            if not running:
+                if ready:
+                    continue   # Todo salió de la cache: pueden haber quedado pasos listos
+                # Quedan pasos pero ninguno puede arrancar: dependencia circular
+                raise ValueError(f"Dependencias circulares entre {[s['name'] for s in pending]}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                s, kwargs, started = running.pop(future)
+                result, seconds = future.result()
+                context.update({k: result[k] for k in s["provides"]})
+                timings[s["name"]] = {"start": started, "seconds": seconds, "cached": False}
+                logger.info("[generator] Paso '%s' terminado en %.1fs", s["name"], seconds)
+                for store in stores or ():
+                    store.store(s, kwargs, result)
+    finally:
+        stop.set()
+        if running:
+            logger.info("[generator] Esperando a que paren %s paso(s) en marcha", len(running))
+        pool.shutdown(wait=True, cancel_futures=True)
+        _stop_event.reset(stop_token)
+
+    return timings
+
+
+async def _arun_step(s: dict, kwargs: dict) -> tuple[dict, float]:
+    """
+    Versión async de _run_step. Los pasos síncronos (sin LLM: roles, prompt...)
+    se ejecutan con sync_to_async por si tocan la BD.
+    """
+    start = time.perf_counter()
+    if inspect.iscoroutinefunction(s["run"]):
+        result = await s["run"](**kwargs) or {}
+    else:
+        result = await sync_to_async(s["run"])(**kwargs) or {}
+    missing = [k for k in s["provides"] if k not in result]
+    if missing:
+        raise ValueError(f"El paso '{s['name']}' no devolvió {missing}")
+    return result, time.perf_counter() - start
+
+
+async def _alookup(stores: list | None, s: dict, kwargs: dict) -> dict | None:
+    # Los almacenes (checkpoint en BD, cache en disco) son síncronos
+    return await sync_to_async(_lookup)(stores, s, kwargs)
+
+
+async def arun_steps(
+    steps: list[dict],
+    context: dict,
+    *,
+    on_start: Callable[[dict], object] | None = None,
+    stores: list | None = None,
+) -> dict[str, dict]:
+    """
+    Versión async de run_steps: los pasos en marcha son tareas del loop
+    actual en vez de hilos. `on_start` puede ser una corrutina. Si un paso
+    falla, las tareas que seguían en marcha se cancelan y se espera a que
+    terminen antes de propagar el error.
+    """
+    _check_graph(steps, context)
+    pending = list(steps)
+    running: dict = {}
+    timings: dict[str, dict] = {}
+    t0 = time.perf_counter()
+
+    try:
+        while pending or running:
+            ready = [s for s in pending if all(k in context for k in s["needs"])]
+            for s in ready:
+                pending.remove(s)
+                kwargs = {k: context[k] for k in s["needs"]}
+                cached = await _alookup(stores, s, kwargs)
+                if cached is not None:
+                    context.update({k: cached[k] for k in s["provides"]})
+                    timings[s["name"]] = {"start": time.perf_counter() - t0, "seconds": 0.0, "cached": True}
+                    continue
+                if on_start is not None:
+                    started = on_start(s)
+                    if inspect.isawaitable(started):
+                        await started
+                task = asyncio.ensure_future(_arun_step(s, kwargs))
+                running[task] = (s, kwargs, time.perf_counter() - t0)
+
+            if not running:
+                if ready:
+                    continue   # Todo salió de la cache: pueden haber quedado pasos listos
+                raise ValueError(f"Dependencias circulares entre {[s['name'] for s in pending]}")
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                s, kwargs, started = running.pop(task)
+                result, seconds = task.result()
+                context.update({k: result[k] for k in s["provides"]})
+                timings[s["name"]] = {"start": started, "seconds": seconds, "cached": False}
+                logger.info("[generator] Paso '%s' terminado en %.1fs", s["name"], seconds)
+                for store in stores or ():
+                    await sync_to_async(store.store)(s, kwargs, result)
+    finally:
+        # Un paso síncrono (sync_to_async) no se puede interrumpir: cancelar su
+        # tarea dejaría el hilo corriendo, así que se le deja acabar (son cortos, sin LLM)
+        for task, (s, _, _) in running.items():
+            if inspect.iscoroutinefunction(s["run"]):
+                task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    return timings
+
+
+def format_timings(timings: dict[str, dict]) -> str:
+    """'pages 8.2s (+1.0s), models 6.1s (+0.0s)... | total 20.4s, suma 41.0s'"""
+    if not timings:
+        return "sin pasos"
+    ordered = sorted(timings.items(), key=lambda kv: kv[1]["start"])
+    parts = [
+        f"{name} cache" if t.get("cached") else f"{name} {t['seconds']:.1f}s (+{t['start']:.1f}s)"
+        for name, t in ordered
+    ]
+    total = max(t["start"] + t["seconds"] for t in timings.values())
+    busy = sum(t["seconds"] for t in timings.values())
+    return f"{', '.join(parts)} | total {total:.1f}s, suma {busy:.1f}s"
@@ -6,15 +6,29 @@ Flujo:
   2. LLM genera models.py
   3. LLM genera views.py
   4. LLM genera base.html
-  5. LLM genera un template HTML por cada página
+  5. LLM genera un template HTML por cada página (en paralelo, tras base.html)
   6. LLM genera load_data.py (management command)
+  (1-6 se ejecutan como un grafo de dependencias: models.py no espera al
+   design system, load_data solo necesita los campos reales, etc.)
   7. Se ensamblan los archivos estáticos (settings, manage, urls, Dockerfile...)
   8. Se devuelve dict {ruta: contenido} listo para guardar en GeneratedSite.project_files
+
+agenerate_project_files es la misma generación sobre asyncio (un event loop
+en vez de un hilo por llamada al LLM).
+generate_fast_project_files hace lo mismo sin LLM (pasos 1-6 deterministas,
+ver fast_mode.py) y reutiliza el ensamblado y la validación.
 """
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
 from django.utils.text import slugify
 
 from ..llm.generator_prompts import (
@@ -25,17 +39,28 @@ from ..llm.generator_prompts import (
     prompt_template,
     prompt_load_data,
 )
+from ..llm import response_cache
+from ..llm.client import format_connection_stats
 from ..llm.field_extractor import extract_model_fields
 from ..analysis.field_roles import (
     infer_roles,
     pick_primary_numeric,
     pick_signed_field,
 )
+from ..analysis.helpers import get_by_path
+from ..analysis.profiler import profile_items
 from ..llm.consistency_checker import fix_template, run_all_checks
 from ..llm.enrich_prompt import enrich_user_prompt
-from .notifications import notify_generation_done
+from .jobs import raise_if_cancelled
+from .pipeline import arun_steps, format_timings, raise_if_stopped, run_steps, step
+from .step_cache import NO_CACHE, StepCache
 
 from .llm_wrappers import (
+    allm_call_logged,
+    allm_design_system_call,
+    allm_json_call,
+    atranslate_prompt_to_english,
+    code_prefix_validator,
     llm_call_logged,
     llm_json_call,
     strip_markdown_fences,
@@ -52,6 +77,16 @@ from .fallbacks import (
     fallback_template,
     fallback_load_data,
 )
+from .fast_mode import (
+    fast_base_html,
+    fast_design_system,
+    fast_load_data,
+    fast_models,
+    fast_placeholders,
+    fast_style,
+    fast_template,
+    fast_views,
+)
 from .static_files import build_static_files, build_app_urls
 from .migrations_generator import generate_initial_migration
 
@@ -65,7 +100,14 @@ logger = logging.getLogger(__name__)
 # ──────────────────────────────────────────────────────────────────────────────
 
 def _update_step(site, step: str) -> None:
-    """Actualiza el paso actual de generación en la base de datos."""
+    """
+    Actualiza el paso actual de generación en la base de datos.
+    Es también el punto de cancelación: si el job se ha cancelado, lanza
+    GenerationCancelled antes de empezar el paso (y StepsStopped si otro
+    paso ha fallado y run_steps está abortando).
+    """
+    raise_if_stopped()
+    raise_if_cancelled(site)
     try:
         site.generation_step = step
         site.save(update_fields=["generation_step"])
@@ -73,34 +115,128 @@ def _update_step(site, step: str) -> None:
         pass
 
 
+# Segundos mínimos entre dos escrituras de progreso de una misma llamada en streaming
+STREAM_PROGRESS_INTERVAL = 1.0
+
+
+def _stream_progress(site, what: str):
+    """
+    Callback on_progress para llamadas en streaming: muestra los tokens
+    recibidos como paso actual (como mucho una escritura por segundo).
+    Al pasar por _update_step, cancelar el job corta también la llamada.
+    """
+    last = 0.0
+
+    def on_progress(text: str, pieces: int) -> None:
+        nonlocal last
+        now = time.monotonic()
+        if now - last < STREAM_PROGRESS_INTERVAL:
+            return
+        last = now
+        _update_step(site, f"Generando {what} ({pieces} tokens recibidos)...")
+
+    return on_progress
+
+
+def _field_profiles(source, main_path) -> dict:
+    """
+    Perfiles de campo de la colección completa. Se reutilizan los del análisis
+    persistido; en filas antiguas sin perfil se calculan sobre parsed_data.
+    """
+    profiles = (source.analysis or {}).get("field_profile")
+    if profiles:
+        return profiles
+    if main_path is None or not source.has_parsed_data:
+        return {}
+    items = get_by_path(source.get_parsed_data(), main_path)
+    return profile_items(items) if isinstance(items, list) else {}
+
+
 # ──────────────────────────────────────────────────────────────────────────────
-# FUNCIÓN PRINCIPAL
+# TEMPLATES DE PÁGINA EN PARALELO
 # ──────────────────────────────────────────────────────────────────────────────
 
-def generate_project_files(site) -> dict[str, str]:
+def _page_template_result(html: str, page: dict) -> tuple[str, bool]:
+    used_fallback = not html.strip()
+    if used_fallback:
+        html = fallback_template(page)
+    return fix_template(html), used_fallback
+
+
+def _generate_page_template(page: dict, site, prompt_kwargs: dict) -> tuple[str, bool]:
     """
-    Genera todos los archivos del proyecto Django.
+    Genera el template de una página. Se ejecuta en un hilo del pool.
+    Devuelve (html, usó_fallback).
+    """
+    try:
+        system, user_text = prompt_template(page=page, **prompt_kwargs)
+        html = llm_call_logged(
+            system,
+            user_text,
+            f"template_{page['name']}",
+            temperature=0.4,
+            site=site,
+            on_progress=_stream_progress(site, f"página {page['name']}"),
+            validate=code_prefix_validator("html"),
+        )
+        return _page_template_result(html, page)
+    finally:
+        # El GenerationLog abre una conexión propia en este hilo
+        connections.close_all()
 
-    Recibe un objeto GeneratedSite con:
-      - site.accepted_plan  → dict con site_type, site_title, fields, _meta.sample_items
-      - site.project_name   → slug del nombre del proyecto
-      - site.project_source.api_url → URL de la API original
 
-    Devuelve dict {ruta_relativa: contenido} listo para guardar en project_files.
+def _generate_page_templates(site, pages: list[dict], prompt_kwargs: dict) -> tuple[list[str], bool]:
     """
-    plan = site.accepted_plan or {}
-    fields = plan.get("fields") or []
-    sample_items = (plan.get("_meta") or {}).get("sample_items") or []
-    main_path = (plan.get("_meta") or {}).get("main_collection_path")
-    site_type = plan.get("site_type") or "other"
-    site_title = plan.get("site_title") or "Mi Sitio"
-    user_prompt = plan.get("user_prompt") or ""
-    user_prompt_normalized = translate_prompt_to_english(user_prompt)
-    api_url = site.project_source.api_url
+    Genera los templates de todas las páginas a la vez, con como mucho
+    GENERATION_PAGE_CONCURRENCY llamadas al LLM simultáneas.
+    Devuelve (HTML de cada página en el mismo orden que `pages`, alguna usó fallback).
+    """
+    if not pages:
+        return [], False
+    max_workers = max(1, min(getattr(settings, "GENERATION_PAGE_CONCURRENCY", 4), len(pages)))
+    results: list[str] = [""] * len(pages)
+    any_fallback = False
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="page-template")
+    try:
+        futures = {
+            pool.submit(contextvars.copy_context().run, _generate_page_template, page, site, prompt_kwargs): index
+            for index, page in enumerate(pages)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            results[index], used_fallback = future.result()
+            any_fallback = any_fallback or used_fallback
+            logger.info("[generator] Template '%s' listo (%s/%s)", pages[index]["name"], done, len(pages))
+            # También es punto de cancelación: las páginas pendientes se descartan
+            _update_step(site, f"Generando paginas ({done}/{len(pages)})...")
+    finally:
+        # Las páginas en marcha paran en su siguiente _update_step (cancelación o parada)
+        pool.shutdown(wait=True, cancel_futures=True)
+    return results, any_fallback
 
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PASOS DE GENERACIÓN
+# Cada paso recibe solo lo que necesita y devuelve un dict con lo que produce.
+# El orden real lo decide el DAG de GENERATION_STEPS (ver pipeline.py).
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _step_translate(*, user_prompt) -> dict:
+    """Traduce el prompt del usuario a inglés (solo depende del texto del prompt)."""
+    return _translate_result(user_prompt, translate_prompt_to_english(user_prompt))
+
+
+def _translate_result(user_prompt: str, user_prompt_normalized: str) -> dict:
+    # Si sigue igual y no era ASCII, la traducción falló: no se cachea
+    failed = user_prompt_normalized == user_prompt and not user_prompt.isascii()
+    return {"user_prompt_normalized": user_prompt_normalized, NO_CACHE: failed}
+
+
+def _step_prompt(*, user_prompt_normalized, site_type, fields, sample_items) -> dict:
+    """Elige el preset visual y enriquece el prompt con el contexto del dataset."""
     # Seleccionar preset visual
     preset = get_preset(user_prompt_normalized, site_type=site_type)
-    preset_description = describe_preset(preset)
     logger.info("[generator] Preset seleccionado: %s", preset.get("name"))
 
     # Enriquecer el prompt del usuario con contexto del dataset
@@ -112,23 +248,37 @@ def generate_project_files(site) -> dict[str, str]:
     )
     logger.info("[generator] Prompt enriquecido: %s...", enriched_prompt[:100])
 
-    # Inferir roles semánticos de los campos (numeric, percent, image, category…)
-    field_roles = infer_roles(fields, sample_items)
+    return {
+        "preset": preset,
+        "preset_description": describe_preset(preset),
+        "enriched_prompt": enriched_prompt,
+    }
+
+
+def _step_roles(*, source, fields, sample_items, main_path) -> dict:
+    """
+    Roles semánticos de los campos (numeric, percent, image, category…) a
+    partir del perfil de la colección completa. Si la ingesta ya los calculó
+    (CSV), se reutilizan.
+    """
+    ingest_meta = source.ingest_meta or {}
+    field_roles = infer_roles(
+        fields,
+        sample_items,
+        known_roles=ingest_meta.get("field_roles"),
+        profiles=_field_profiles(source, main_path),
+    )
     primary_numeric = pick_primary_numeric(field_roles, fields)
     signed_field = pick_signed_field(field_roles, fields)
     logger.info(
         "[generator] Roles de campos: %s | numérico principal: %s | con signo: %s",
         field_roles, primary_numeric, signed_field,
     )
+    return {"field_roles": field_roles, "primary_numeric": primary_numeric, "signed_field": signed_field}
 
-    project = slugify(site.project_name or site_title).replace("-", "_") or "generated_site"
-    app = "siteapp"
 
-    files: dict[str, str] = {}
-
-    # ── PASO 1: Estructura de páginas ────────────────────────────────────────
-    _update_step(site, "Analizando estructura del sitio...")
-    logger.info("[generator] Paso 1: estructura de páginas")
+def _step_pages(*, site_type, site_title, enriched_prompt, fields, sample_items) -> dict:
+    """PASO 1: estructura de páginas (con fallback si el LLM devuelve algo inválido)."""
     system, user_text = prompt_pages_structure(
         site_type=site_type,
         site_title=site_title,
@@ -136,8 +286,12 @@ def generate_project_files(site) -> dict[str, str]:
         fields=fields,
         sample_items=sample_items,
     )
-    pages_data = llm_json_call(system, user_text, "pages_structure")
+    return _pages_result(llm_json_call(system, user_text, "pages_structure"), site_type)
+
+
+def _pages_result(pages_data: dict, site_type: str) -> dict:
     pages = pages_data.get("pages") or []
+    used_fallback = False
 
     has_list = any(p.get("is_list") for p in pages)
     has_detail = any(p.get("is_detail") for p in pages)
@@ -147,6 +301,7 @@ def generate_project_files(site) -> dict[str, str]:
         if not pages or not has_detail:
             logger.warning("[generator] Páginas de portfolio inválidas, usando fallback")
             pages = fallback_pages(site_type)
+            used_fallback = True
         elif has_list:
             # El LLM generó un listado aunque no debía — eliminarlo
             logger.warning("[generator] Portfolio con is_list detectado, eliminando página de listado")
@@ -155,42 +310,56 @@ def generate_project_files(site) -> dict[str, str]:
         if not pages or not has_list or not has_detail:
             logger.warning("[generator] Páginas inválidas, usando fallback")
             pages = fallback_pages(site_type)
-            
-    # ── PASO 1b: Design system ───────────────────────────────────────────────
-    _update_step(site, "Generando sistema de diseño...")
-    logger.info("[generator] Paso 1b: design system")
-    design_system = llm_design_system_call(
+            used_fallback = True
+
+    real_url_names = {page["name"]: page["view_name"] for page in pages}
+    logger.info("[generator] URLs reales: %s", real_url_names)
+    return {"pages": pages, "real_url_names": real_url_names, NO_CACHE: used_fallback}
+
+
+def _step_design_system(*, enriched_prompt, site_type, preset_description) -> dict:
+    """PASO 1b: design system (clases Tailwind compartidas por todas las páginas)."""
+    design_system, used_fallback = llm_design_system_call(
         user_prompt=enriched_prompt,
         site_type=site_type,
         preset_description=preset_description,
     )
     logger.info("[generator] Design system: %s", design_system)
+    return {"design_system": design_system, NO_CACHE: used_fallback}
 
-    # ── PASO 2: models.py ────────────────────────────────────────────────────
-    _update_step(site, "Generando modelos de datos...")
-    logger.info("[generator] Paso 2: models.py")
+
+def _step_models(*, site, fields, sample_items, site_title, field_roles) -> dict:
+    """PASO 2: models.py y los campos reales que define."""
     system, user_text = prompt_models(
         fields=fields,
         sample_items=sample_items,
         site_title=site_title,
         field_roles=field_roles,
     )
-    models_code = llm_call_logged(system, user_text, "models", temperature=0.05, site=site)
-    if not models_code.strip():
+    models_code = llm_call_logged(
+        system, user_text, "models", temperature=0.05, site=site,
+        on_progress=_stream_progress(site, "modelos de datos"),
+        validate=code_prefix_validator("python"),
+    )
+    return _models_result(models_code, fields)
+
+
+def _models_result(models_code: str, fields: list) -> dict:
+    used_fallback = not models_code.strip()
+    if used_fallback:
         models_code = fallback_models(fields)
 
     models_code = strip_markdown_fences(models_code)
-    files[f"{project}/{app}/models.py"] = models_code
-
     real_fields = extract_model_fields(models_code)
     logger.info("[generator] Campos reales extraídos: %s", real_fields)
+    return {"models_code": models_code, "real_fields": real_fields, NO_CACHE: used_fallback}
 
-    files[f"{project}/{app}/migrations/__init__.py"] = ""
-    files[f"{project}/{app}/migrations/0001_initial.py"] = generate_initial_migration(models_code, app)
 
-    # ── PASO 3: views.py ─────────────────────────────────────────────────────
-    _update_step(site, "Generando vistas y controladores...")
-    logger.info("[generator] Paso 3: views.py")
+def _step_views(
+    *, site, fields, site_type, site_title, enriched_prompt, pages, real_fields,
+    field_roles, primary_numeric, signed_field,
+) -> dict:
+    """PASO 3: views.py."""
     system, user_text = prompt_views(
         fields=fields,
         site_type=site_type,
@@ -202,18 +371,23 @@ def generate_project_files(site) -> dict[str, str]:
         primary_numeric=primary_numeric,
         signed_field=signed_field,
     )
-    views_code = llm_call_logged(system, user_text, "views", temperature=0.05, site=site)
-    if not views_code.strip():
+    views_code = llm_call_logged(
+        system, user_text, "views", temperature=0.05, site=site,
+        on_progress=_stream_progress(site, "vistas"),
+        validate=code_prefix_validator("python"),
+    )
+    return _views_result(views_code, pages)
+
+
+def _views_result(views_code: str, pages: list[dict]) -> dict:
+    used_fallback = not views_code.strip()
+    if used_fallback:
         views_code = fallback_views(pages)
+    return {"views_code": strip_markdown_fences(views_code), NO_CACHE: used_fallback}
 
-    files[f"{project}/{app}/views.py"] = strip_markdown_fences(views_code)
-    files[f"{project}/{app}/urls.py"] = build_app_urls(pages, app, site_type=site_type)
-    real_url_names = {page["name"]: page["view_name"] for page in pages}
-    logger.info("[generator] URLs reales: %s", real_url_names)
 
-    # ── PASO 4: base.html ────────────────────────────────────────────────────
-    _update_step(site, "Generando plantilla base...")
-    logger.info("[generator] Paso 4: base.html")
+def _step_base_html(*, site, site_title, site_type, enriched_prompt, pages, design_system) -> dict:
+    """PASO 4: base.html."""
     system, user_text = prompt_base_template(
         site_title=site_title,
         site_type=site_type,
@@ -221,21 +395,34 @@ def generate_project_files(site) -> dict[str, str]:
         all_pages=pages,
         design_system=design_system,
     )
-    base_html = llm_call_logged(system, user_text, "base.html", temperature=0.1, site=site)
-    if not base_html.strip():
+    base_html = llm_call_logged(
+        system, user_text, "base.html", temperature=0.1, site=site,
+        on_progress=_stream_progress(site, "plantilla base"),
+        validate=code_prefix_validator("html"),
+    )
+    return _base_html_result(base_html, site_title, pages)
+
+
+def _base_html_result(base_html: str, site_title: str, pages: list[dict]) -> dict:
+    used_fallback = not base_html.strip()
+    if used_fallback:
         base_html = fallback_base_html(site_title, pages)
+    return {"base_html": fix_template(base_html), NO_CACHE: used_fallback}
 
-    files[f"{project}/{app}/templates/base.html"] = fix_template(base_html)
 
-    # ── PASO 5: template por página ──────────────────────────────────────────
-    generated_html_context = {
-        "base.html": files[f"{project}/{app}/templates/base.html"]
-    }  
-    for page in pages:
-        _update_step(site, f"Generando pagina '{page['name']}'...")
-        logger.info("[generator] Paso 5: template '%s'", page["name"])
-        system, user_text = prompt_template(
-            page=page,
+def _step_page_templates(
+    *, site, pages, base_html, fields, sample_items, site_type, site_title, enriched_prompt,
+    real_fields, real_url_names, design_system, preset, preset_description,
+    field_roles, primary_numeric, signed_field,
+) -> dict:
+    """
+    PASO 5: un template por página, todos a la vez. Las páginas no dependen
+    unas de otras: la coherencia visual sale de base.html y del design system.
+    """
+    page_templates, used_fallback = _generate_page_templates(
+        site,
+        pages,
+        dict(
             fields=fields,
             sample_items=sample_items,
             site_type=site_type,
@@ -247,28 +434,301 @@ def generate_project_files(site) -> dict[str, str]:
             design_system=design_system,
             preset_description=preset_description,
             preset_id=preset.get("id", ""),
-            generated_context=generated_html_context,
+            generated_context={"base.html": base_html},
             field_roles=field_roles,
             primary_numeric=primary_numeric,
             signed_field=signed_field,
-        )
-        html = llm_call_logged(
+        ),
+    )
+    return {"page_templates": page_templates, NO_CACHE: used_fallback}
+
+
+def _step_load_data(*, site, fields, sample_items, api_url, main_path, real_fields, field_roles) -> dict:
+    """PASO 6: load_data.py (management command) y librerías extra que pida."""
+    system, user_text = prompt_load_data(
+        fields=fields,
+        sample_items=sample_items,
+        api_url=api_url,
+        main_collection_path=main_path,
+        real_fields=real_fields,
+        field_roles=field_roles,
+    )
+    load_data_code = llm_call_logged(
+        system, user_text, "load_data", temperature=0.05, site=site,
+        on_progress=_stream_progress(site, "cargador de datos"),
+        validate=code_prefix_validator("python"),
+    )
+    return _load_data_result(load_data_code, fields, api_url)
+
+
+def _load_data_result(load_data_code: str, fields: list, api_url: str) -> dict:
+    used_fallback = not load_data_code.strip()
+    if used_fallback:
+        load_data_code = fallback_load_data(fields, api_url)
+
+    load_data_code, extra_reqs = extract_requirements(strip_markdown_fences(load_data_code))
+    return {"load_data_code": load_data_code, "extra_reqs": extra_reqs, NO_CACHE: used_fallback}
+
+
+# Grafo de pasos: cada uno arranca en cuanto existen sus entradas.
+# Camino crítico: translate → prompt → pages/design_system → base_html → page_templates.
+# Los pasos con cache=True se reutilizan al regenerar si sus entradas no cambian.
+GENERATION_STEPS = [
+    step(
+        "translate", _step_translate,
+        needs=("user_prompt",),
+        provides=("user_prompt_normalized",),
+        label="Preparando el prompt...",
+        cache=True,
+    ),
+    step(
+        "prompt", _step_prompt,
+        needs=("user_prompt_normalized", "site_type", "fields", "sample_items"),
+        provides=("preset", "preset_description", "enriched_prompt"),
+    ),
+    step(
+        "roles", _step_roles,
+        needs=("source", "fields", "sample_items", "main_path"),
+        provides=("field_roles", "primary_numeric", "signed_field"),
+    ),
+    step(
+        "pages", _step_pages,
+        needs=("site_type", "site_title", "enriched_prompt", "fields", "sample_items"),
+        provides=("pages", "real_url_names"),
+        label="Analizando estructura del sitio...",
+        cache=True,
+    ),
+    step(
+        "design_system", _step_design_system,
+        needs=("enriched_prompt", "site_type", "preset_description"),
+        provides=("design_system",),
+        label="Generando sistema de diseño...",
+        cache=True,
+    ),
+    step(
+        "models", _step_models,
+        needs=("site", "fields", "sample_items", "site_title", "field_roles"),
+        provides=("models_code", "real_fields"),
+        label="Generando modelos de datos...",
+        cache=True,
+    ),
+    step(
+        "views", _step_views,
+        needs=(
+            "site", "fields", "site_type", "site_title", "enriched_prompt", "pages", "real_fields",
+            "field_roles", "primary_numeric", "signed_field",
+        ),
+        provides=("views_code",),
+        label="Generando vistas y controladores...",
+        cache=True,
+    ),
+    step(
+        "base_html", _step_base_html,
+        needs=("site", "site_title", "site_type", "enriched_prompt", "pages", "design_system"),
+        provides=("base_html",),
+        label="Generando plantilla base...",
+        cache=True,
+    ),
+    step(
+        "page_templates", _step_page_templates,
+        needs=(
+            "site", "pages", "base_html", "fields", "sample_items", "site_type", "site_title",
+            "enriched_prompt", "real_fields", "real_url_names", "design_system", "preset",
+            "preset_description", "field_roles", "primary_numeric", "signed_field",
+        ),
+        provides=("page_templates",),
+        label="Generando paginas...",
+        cache=True,
+    ),
+    step(
+        "load_data", _step_load_data,
+        needs=("site", "fields", "sample_items", "api_url", "main_path", "real_fields", "field_roles"),
+        provides=("load_data_code", "extra_reqs"),
+        label="Generando cargador de datos...",
+        cache=True,
+    ),
+]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PASOS ASYNC (agenerate_project_files)
+# Mismos pasos con allm_*: mismo grafo, mismos prompts y mismo post-proceso.
+# Los pasos sin LLM (prompt, roles) se reutilizan tal cual.
+# ──────────────────────────────────────────────────────────────────────────────
+
+_aupdate_step = sync_to_async(_update_step)
+
+
+def _astream_progress(site, what: str):
+    """Versión async de _stream_progress (la escritura en BD va con sync_to_async)."""
+    last = 0.0
+
+    async def on_progress(text: str, pieces: int) -> None:
+        nonlocal last
+        now = time.monotonic()
+        if now - last < STREAM_PROGRESS_INTERVAL:
+            return
+        last = now
+        await _aupdate_step(site, f"Generando {what} ({pieces} tokens recibidos)...")
+
+    return on_progress
+
+
+async def _astep_translate(*, user_prompt) -> dict:
+    return _translate_result(user_prompt, await atranslate_prompt_to_english(user_prompt))
+
+
+async def _astep_pages(*, site_type, site_title, enriched_prompt, fields, sample_items) -> dict:
+    system, user_text = prompt_pages_structure(
+        site_type=site_type,
+        site_title=site_title,
+        user_prompt=enriched_prompt,
+        fields=fields,
+        sample_items=sample_items,
+    )
+    return _pages_result(await allm_json_call(system, user_text, "pages_structure"), site_type)
+
+
+async def _astep_design_system(*, enriched_prompt, site_type, preset_description) -> dict:
+    design_system, used_fallback = await allm_design_system_call(
+        user_prompt=enriched_prompt,
+        site_type=site_type,
+        preset_description=preset_description,
+    )
+    logger.info("[generator] Design system: %s", design_system)
+    return {"design_system": design_system, NO_CACHE: used_fallback}
+
+
+async def _astep_models(*, site, fields, sample_items, site_title, field_roles) -> dict:
+    system, user_text = prompt_models(
+        fields=fields,
+        sample_items=sample_items,
+        site_title=site_title,
+        field_roles=field_roles,
+    )
+    models_code = await allm_call_logged(
+        system, user_text, "models", temperature=0.05, site=site,
+        on_progress=_astream_progress(site, "modelos de datos"),
+        validate=code_prefix_validator("python"),
+    )
+    return _models_result(models_code, fields)
+
+
+async def _astep_views(
+    *, site, fields, site_type, site_title, enriched_prompt, pages, real_fields,
+    field_roles, primary_numeric, signed_field,
+) -> dict:
+    system, user_text = prompt_views(
+        fields=fields,
+        site_type=site_type,
+        site_title=site_title,
+        user_prompt=enriched_prompt,
+        pages=pages,
+        real_fields=real_fields,
+        field_roles=field_roles,
+        primary_numeric=primary_numeric,
+        signed_field=signed_field,
+    )
+    views_code = await allm_call_logged(
+        system, user_text, "views", temperature=0.05, site=site,
+        on_progress=_astream_progress(site, "vistas"),
+        validate=code_prefix_validator("python"),
+    )
+    return _views_result(views_code, pages)
+
+
+async def _astep_base_html(*, site, site_title, site_type, enriched_prompt, pages, design_system) -> dict:
+    system, user_text = prompt_base_template(
+        site_title=site_title,
+        site_type=site_type,
+        user_prompt=enriched_prompt,
+        all_pages=pages,
+        design_system=design_system,
+    )
+    base_html = await allm_call_logged(
+        system, user_text, "base.html", temperature=0.1, site=site,
+        on_progress=_astream_progress(site, "plantilla base"),
+        validate=code_prefix_validator("html"),
+    )
+    return _base_html_result(base_html, site_title, pages)
+
+
+async def _agenerate_page_template(page: dict, site, prompt_kwargs: dict, limit: asyncio.Semaphore) -> tuple[str, bool]:
+    async with limit:
+        system, user_text = prompt_template(page=page, **prompt_kwargs)
+        html = await allm_call_logged(
             system,
             user_text,
             f"template_{page['name']}",
             temperature=0.4,
             site=site,
+            on_progress=_astream_progress(site, f"página {page['name']}"),
+            validate=code_prefix_validator("html"),
         )
-        if not html.strip():
-            html = fallback_template(page)
+    return _page_template_result(html, page)
+
+
+async def _agenerate_page_templates(site, pages: list[dict], prompt_kwargs: dict) -> tuple[list[str], bool]:
+    """Versión async de _generate_page_templates (tareas en vez de hilos)."""
+    if not pages:
+        return [], False
+    limit = asyncio.Semaphore(max(1, getattr(settings, "GENERATION_PAGE_CONCURRENCY", 4)))
+    results: list[str] = [""] * len(pages)
+    any_fallback = False
+
+    tasks = {
+        asyncio.ensure_future(_agenerate_page_template(page, site, prompt_kwargs, limit)): index
+        for index, page in enumerate(pages)
+    }
+    try:
+        pending = set(tasks)
+        done_count = 0
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = tasks[task]
+                results[index], used_fallback = task.result()
+                any_fallback = any_fallback or used_fallback
+                done_count += 1
+                logger.info("[generator] Template '%s' listo (%s/%s)", pages[index]["name"], done_count, len(pages))
+                await _aupdate_step(site, f"Generando paginas ({done_count}/{len(pages)})...")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return results, any_fallback
+
 
-        fixed_html = fix_template(html)
-        files[f"{project}/{app}/templates/{page['template']}"] = fixed_html
-        generated_html_context[page["template"]] = fixed_html
+async def _astep_page_templates(
+    *, site, pages, base_html, fields, sample_items, site_type, site_title, enriched_prompt,
+    real_fields, real_url_names, design_system, preset, preset_description,
+    field_roles, primary_numeric, signed_field,
+) -> dict:
+    page_templates, used_fallback = await _agenerate_page_templates(
+        site,
+        pages,
+        dict(
+            fields=fields,
+            sample_items=sample_items,
+            site_type=site_type,
+            site_title=site_title,
+            user_prompt=enriched_prompt,
+            all_pages=pages,
+            real_fields=real_fields,
+            real_url_names=real_url_names,
+            design_system=design_system,
+            preset_description=preset_description,
+            preset_id=preset.get("id", ""),
+            generated_context={"base.html": base_html},
+            field_roles=field_roles,
+            primary_numeric=primary_numeric,
+            signed_field=signed_field,
+        ),
+    )
+    return {"page_templates": page_templates, NO_CACHE: used_fallback}
 
-    # ── PASO 6: load_data.py ─────────────────────────────────────────────────
-    _update_step(site, "Generando cargador de datos...")
-    logger.info("[generator] Paso 6: load_data.py")
+
+async def _astep_load_data(*, site, fields, sample_items, api_url, main_path, real_fields, field_roles) -> dict:
     system, user_text = prompt_load_data(
         fields=fields,
         sample_items=sample_items,
@@ -277,13 +737,63 @@ def generate_project_files(site) -> dict[str, str]:
         real_fields=real_fields,
         field_roles=field_roles,
     )
-    load_data_code = llm_call_logged(system, user_text, "load_data", temperature=0.05, site=site)
-    if not load_data_code.strip():
-        load_data_code = fallback_load_data(fields, api_url)
+    load_data_code = await allm_call_logged(
+        system, user_text, "load_data", temperature=0.05, site=site,
+        on_progress=_astream_progress(site, "cargador de datos"),
+        validate=code_prefix_validator("python"),
+    )
+    return _load_data_result(load_data_code, fields, api_url)
 
-    load_data_code, extra_reqs = extract_requirements(strip_markdown_fences(load_data_code))
-    files[f"{project}/{app}/management/commands/load_data.py"] = load_data_code
 
+_ASYNC_RUNS = {
+    "translate": _astep_translate,
+    "pages": _astep_pages,
+    "design_system": _astep_design_system,
+    "models": _astep_models,
+    "views": _astep_views,
+    "base_html": _astep_base_html,
+    "page_templates": _astep_page_templates,
+    "load_data": _astep_load_data,
+}
+# Mismo grafo (y mismos nombres: comparten cache de pasos y checkpoints con la versión síncrona)
+ASYNC_GENERATION_STEPS = [dict(s, run=_ASYNC_RUNS.get(s["name"], s["run"])) for s in GENERATION_STEPS]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ENSAMBLADO Y VALIDACIÓN (comunes a la generación con LLM y a la rápida)
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _plan_context(site) -> dict:
+    """Entradas de la generación sacadas del plan aceptado y de la fuente."""
+    plan = site.accepted_plan or {}
+    source = site.project_source
+    return {
+        "site": site,
+        "source": source,
+        "fields": plan.get("fields") or [],
+        "sample_items": (plan.get("_meta") or {}).get("sample_items") or [],
+        "main_path": (plan.get("_meta") or {}).get("main_collection_path"),
+        "site_type": plan.get("site_type") or "other",
+        "site_title": plan.get("site_title") or "Mi Sitio",
+        "user_prompt": plan.get("user_prompt") or "",
+        "api_url": source.api_url,
+    }
+
+
+def _assemble_files(site, ctx: dict, *, project: str, app: str) -> dict[str, str]:
+    """Junta los artefactos de los pasos, seed_users y los archivos estáticos."""
+    files: dict[str, str] = {}
+    files[f"{project}/{app}/models.py"] = ctx["models_code"]
+    files[f"{project}/{app}/migrations/__init__.py"] = ""
+    files[f"{project}/{app}/migrations/0001_initial.py"] = generate_initial_migration(ctx["models_code"], app)
+    files[f"{project}/{app}/views.py"] = ctx["views_code"]
+    files[f"{project}/{app}/urls.py"] = build_app_urls(ctx["pages"], app, site_type=ctx["site_type"])
+    files[f"{project}/{app}/templates/base.html"] = ctx["base_html"]
+    for page, html in zip(ctx["pages"], ctx["page_templates"]):
+        files[f"{project}/{app}/templates/{page['template']}"] = html
+    files[f"{project}/{app}/management/commands/load_data.py"] = ctx["load_data_code"]
+
+    extra_reqs = ctx["extra_reqs"]
     if extra_reqs:
         logger.info("[generator] Librerías extra detectadas: %s", extra_reqs)
         current_reqs = files.get(f"{project}/requirements.txt", "")
@@ -332,13 +842,36 @@ def generate_project_files(site) -> dict[str, str]:
     # ── PASO 7: archivos estáticos ───────────────────────────────────────────
     _update_step(site, "Ensamblando archivos del proyecto...")
     logger.info("[generator] Paso 7: archivos estáticos")
-    files.update(build_static_files(project, app, design_system=design_system, site_type=site_type))
+    files.update(build_static_files(project, app, design_system=ctx["design_system"], site_type=ctx["site_type"]))
 
-    # ── PASO 8: Validación de consistencia y autocorrección ─────────────────
+    return files
+
+
+def _repair_kwargs(ctx: dict, project: str, app: str) -> dict:
+    """Argumentos de _repair_requests sacados del contexto de la generación."""
+    return {
+        "pages": ctx["pages"],
+        "fields": ctx["fields"],
+        "sample_items": ctx["sample_items"],
+        "site_type": ctx["site_type"],
+        "site_title": ctx["site_title"],
+        "user_prompt": ctx["enriched_prompt"],
+        "real_fields": ctx["real_fields"],
+        "real_url_names": ctx["real_url_names"],
+        "project": project,
+        "app": app,
+        "design_system": ctx["design_system"],
+        "preset_description": ctx["preset_description"],
+        "preset": ctx["preset"],
+    }
+
+
+def _check_files(site, files: dict[str, str], ctx: dict) -> list[str]:
+    """Valida la consistencia entre archivos. Loggea los avisos y devuelve los bloqueantes."""
     _update_step(site, "Validando consistencia entre archivos...")
     logger.info("[generator] Paso 8: validando consistencia entre archivos")
-    valid_url_names = set(real_url_names.keys()) | {"login", "logout", "register"}
-    issues = run_all_checks(files, user_prompt=user_prompt_normalized, valid_url_names=valid_url_names, api_url=api_url)
+    valid_url_names = set(ctx["real_url_names"].keys()) | {"login", "logout", "register"}
+    issues = run_all_checks(files, user_prompt=ctx["user_prompt_normalized"], valid_url_names=valid_url_names, api_url=ctx["api_url"])
 
     blocking_issues = issues["blocking"]
     warning_issues = issues["warning"]
@@ -349,6 +882,57 @@ def generate_project_files(site) -> dict[str, str]:
         for warn in warning_issues:
             logger.info("  - %s", warn)
 
+    return blocking_issues
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# FUNCIÓN PRINCIPAL
+# ──────────────────────────────────────────────────────────────────────────────
+
+def generate_project_files(site, *, reuse_steps: bool = True, checkpoint=None) -> dict[str, str]:
+    """
+    Genera todos los archivos del proyecto Django.
+
+    Recibe un objeto GeneratedSite con:
+      - site.accepted_plan  → dict con site_type, site_title, fields, _meta.sample_items
+      - site.project_name   → slug del nombre del proyecto
+      - site.project_source.api_url → URL de la API original
+
+    Los pasos con LLM se ejecutan como un DAG (GENERATION_STEPS): los que no
+    dependen entre sí van en paralelo. Después se ensamblan los archivos y se
+    valida la consistencia.
+
+    Con reuse_steps=True los pasos cuyas entradas no han cambiado desde una
+    generación anterior se toman de la cache de pasos (sin llamar al LLM).
+    `checkpoint` (JobCheckpoint) guarda cada paso al terminar y permite
+    reanudar un job reintentado desde el último paso completado.
+
+    Devuelve dict {ruta_relativa: contenido} listo para guardar en project_files.
+    """
+    ctx = _plan_context(site)
+    site_title = ctx["site_title"]
+
+    # ── PASOS 1-6: LLM (DAG) ─────────────────────────────────────────────────
+    step_cache = StepCache() if reuse_steps else None
+    timings = run_steps(
+        GENERATION_STEPS,
+        ctx,
+        on_start=lambda s: _update_step(site, s["label"]) if s["label"] else raise_if_cancelled(site),
+        stores=[store for store in (checkpoint, step_cache) if store is not None],
+    )
+    logger.info("[generator] Tiempos por paso: %s", format_timings(timings))
+    if step_cache is not None:
+        logger.info("[generator] Cache de pasos: %s aciertos, %s fallos", step_cache.hits, step_cache.misses)
+    logger.info("[generator] Conexiones LLM: %s", format_connection_stats())
+    logger.info("[generator] Cache de respuestas LLM: %s", response_cache.format_stats())
+
+    project = slugify(site.project_name or site_title).replace("-", "_") or "generated_site"
+    app = "siteapp"
+    files = _assemble_files(site, ctx, project=project, app=app)
+
+    # ── PASO 8: Validación de consistencia y autocorrección ─────────────────
+    blocking_issues = _check_files(site, files, ctx)
+
     if blocking_issues:
         logger.warning("[generator] %s inconsistencias bloqueantes detectadas:", len(blocking_issues))
         for issue in blocking_issues:
@@ -356,41 +940,125 @@ def generate_project_files(site) -> dict[str, str]:
 
         _update_step(site, "Corrigiendo inconsistencias detectadas...")
         logger.info("[generator] Intentando autocorrección...")
-        files = _regenerate_with_errors(
-            files=files,
-            issues=blocking_issues,
-            pages=pages,
-            fields=fields,
-            sample_items=sample_items,
-            site_type=site_type,
-            site_title=site_title,
-            user_prompt=enriched_prompt,
-            real_fields=real_fields,
-            real_url_names=real_url_names,
-            project=project,
-            app=app,
-            site=site,
-            design_system=design_system,
-            preset_description=preset_description,
-            preset=preset,
-        )
+        files = _regenerate_with_errors(files, blocking_issues, site=site, **_repair_kwargs(ctx, project, app))
     else:
         logger.info("[generator] Sin inconsistencias bloqueantes")
 
     _update_step(site, "Generacion completada.")
     logger.info("[generator] Completado: %s archivos generados", len(files))
 
-    # Notificamos a n8n
-    notify_generation_done(site, duration_seconds=0)
+    return files
+
+
+async def agenerate_project_files(site, *, reuse_steps: bool = True, checkpoint=None) -> dict[str, str]:
+    """
+    Versión async de generate_project_files: mismos pasos, cache y
+    checkpoints, pero las llamadas al LLM son tareas de un único event loop
+    (achat_completion) en vez de hilos. Un worker puede así llevar muchas
+    generaciones a la vez con un solo hilo. El ORM se usa con sync_to_async.
+    """
+    ctx = await sync_to_async(_plan_context)(site)
+    site_title = ctx["site_title"]
+
+    # ── PASOS 1-6: LLM (DAG sobre el event loop) ─────────────────────────────
+    step_cache = StepCache() if reuse_steps else None
+    timings = await arun_steps(
+        ASYNC_GENERATION_STEPS,
+        ctx,
+        on_start=lambda s: _aupdate_step(site, s["label"]) if s["label"] else sync_to_async(raise_if_cancelled)(site),
+        stores=[store for store in (checkpoint, step_cache) if store is not None],
+    )
+    logger.info("[generator] Tiempos por paso: %s", format_timings(timings))
+    if step_cache is not None:
+        logger.info("[generator] Cache de pasos: %s aciertos, %s fallos", step_cache.hits, step_cache.misses)
+    logger.info("[generator] Cache de respuestas LLM: %s", response_cache.format_stats())
+
+    project = slugify(site.project_name or site_title).replace("-", "_") or "generated_site"
+    app = "siteapp"
+    files = await sync_to_async(_assemble_files)(site, ctx, project=project, app=app)
+
+    # ── PASO 8: Validación de consistencia y autocorrección ─────────────────
+    blocking_issues = await sync_to_async(_check_files)(site, files, ctx)
+
+    if blocking_issues:
+        logger.warning("[generator] %s inconsistencias bloqueantes detectadas:", len(blocking_issues))
+        for issue in blocking_issues:
+            logger.warning("  - %s", issue)
+
+        await _aupdate_step(site, "Corrigiendo inconsistencias detectadas...")
+        logger.info("[generator] Intentando autocorrección...")
+        files = await _aregenerate_with_errors(files, blocking_issues, site=site, **_repair_kwargs(ctx, project, app))
+    else:
+        logger.info("[generator] Sin inconsistencias bloqueantes")
+
+    await _aupdate_step(site, "Generacion completada.")
+    logger.info("[generator] Completado: %s archivos generados", len(files))
 
     return files
 
+
+def generate_fast_project_files(site) -> dict[str, str]:
+    """
+    Generación rápida: el mismo proyecto que generate_project_files pero sin
+    llamar al LLM (ver fast_mode.py). Tarda milisegundos y no depende del
+    proveedor; regenerar con LLM después es el refinamiento opcional.
+
+    No hay autocorrección: las inconsistencias solo se loggean.
+    """
+    start = time.perf_counter()
+    ctx = _plan_context(site)
+    fields, site_type, site_title = ctx["fields"], ctx["site_type"], ctx["site_title"]
+
+    _update_step(site, "Generando versión rápida...")
+    # Sin traducción ni enriquecimiento: get_preset entiende palabras clave en español
+    preset = get_preset(ctx["user_prompt"], site_type=site_type)
+    style = fast_style(preset)
+    ctx.update(_step_roles(
+        source=ctx["source"], fields=fields, sample_items=ctx["sample_items"], main_path=ctx["main_path"],
+    ))
+    field_roles = ctx["field_roles"]
+    placeholders = fast_placeholders(fields, field_roles, ctx["primary_numeric"])
+    pages = fallback_pages(site_type)
+    logger.info("[generator] Generación rápida: preset %s, estilo %s, campos %s", preset.get("id"), style, placeholders)
+
+    ctx.update({
+        "user_prompt_normalized": ctx["user_prompt"],
+        "pages": pages,
+        "real_url_names": {page["name"]: page["view_name"] for page in pages},
+        "design_system": fast_design_system(style),
+        "models_code": fast_models(fields, field_roles, title_key=placeholders.get("TITULO")),
+        "views_code": fast_views(pages, site_title),
+        "base_html": fast_base_html(site_title, pages, style, site_type),
+        "page_templates": [
+            fix_template(fast_template(
+                page, pages, site_type=site_type, style=style, placeholders=placeholders,
+                fields=fields, field_roles=field_roles,
+            ))
+            for page in pages
+        ],
+        "load_data_code": fast_load_data(fields, field_roles, ctx["api_url"], ctx["main_path"]),
+        "extra_reqs": [],
+    })
+
+    project = slugify(site.project_name or site_title).replace("-", "_") or "generated_site"
+    files = _assemble_files(site, ctx, project=project, app="siteapp")
+
+    blocking_issues = _check_files(site, files, ctx)
+    for issue in blocking_issues:
+        logger.warning("[generator] Generación rápida con inconsistencia: %s", issue)
+
+    _update_step(site, "Generacion completada.")
+    logger.info(
+        "[generator] Generación rápida completada: %s archivos en %.0f ms",
+        len(files), (time.perf_counter() - start) * 1000,
+    )
+    return files
+
 # ──────────────────────────────────────────────────────────────────────────────
 # AUTOCORRECCIÓN DE ERRORES LLM
 # ──────────────────────────────────────────────────────────────────────────────
 
-def _regenerate_with_errors(
-    files,
+def _repair_requests(
     issues,
     pages,
     fields,
@@ -402,18 +1070,21 @@ def _regenerate_with_errors(
     real_url_names,
     project,
     app,
-    site=None,
     design_system=None,
     preset=None,
     preset_description="",
-):
-    """Regenera los archivos con errores pasando el contexto de corrección al LLM."""
+) -> list[dict]:
+    """
+    Llamadas de corrección para los archivos con errores: una por views.py
+    y por cada template afectado. Cada una indica la ruta, el prompt y cómo
+    limpiar la respuesta.
+    """
     error_context = "\n".join(f" - {e}" for e in issues)
+    requests = []
 
     # ── Regenerar views.py si tiene errores ─────────────────────────
     views_errors = [e for e in issues if "views.py" in e]
     if views_errors:
-        logger.info("[generator] Regenerando views.py con correcciones...")
         system, user_text = prompt_views(
             fields=fields,
             site_type=site_type,
@@ -428,25 +1099,17 @@ def _regenerate_with_errors(
             f"Los campos reales del modelo son: {real_fields}\n"
             f"Corrige views.py usando SOLO esos campos."
         )
-        new_views = llm_call_logged(
-            system,
-            user_text,
-            "views_retry",
-            temperature=0.05,
-            site=site,
-        )
-        if new_views.strip():
-            files[f"{project}/{app}/views.py"] = strip_markdown_fences(new_views)
-            logger.info("[generator] views.py regenerado")
+        requests.append({
+            "path": f"{project}/{app}/views.py", "name": "views.py", "label": "views_retry",
+            "system": system, "user_text": user_text, "temperature": 0.05, "clean": strip_markdown_fences,
+        })
 
     # ── Regenerar templates con errores ─────────────────────────────
     for page in pages:
-        template_path = f"{project}/{app}/templates/{page['template']}"
         template_errors = [e for e in issues if page["template"] in e]
         if not template_errors:
             continue
 
-        logger.info("[generator] Regenerando template '%s' con correcciones...", page["name"])
         template_error_context = "\n".join(f" - {e}" for e in template_errors)
 
         system, user_text = prompt_template(
@@ -469,15 +1132,43 @@ def _regenerate_with_errors(
             f"Los campos reales del modelo son: {real_fields}\n"
             f"Corrige el template usando SOLO esos campos y URLs."
         )
-        new_html = llm_call_logged(
-            system,
-            user_text,
-            f"template_{page['name']}_retry",
-            temperature=0.4,
+        requests.append({
+            "path": f"{project}/{app}/templates/{page['template']}", "name": f"template '{page['name']}'",
+            "label": f"template_{page['name']}_retry",
+            "system": system, "user_text": user_text, "temperature": 0.4, "clean": fix_template,
+        })
+
+    return requests
+
+
+def _regenerate_with_errors(files, issues, *, site=None, **kwargs):
+    """Regenera los archivos con errores pasando el contexto de corrección al LLM."""
+    for fix in _repair_requests(issues, **kwargs):
+        logger.info("[generator] Regenerando %s con correcciones...", fix["name"])
+        new_code = llm_call_logged(
+            fix["system"],
+            fix["user_text"],
+            fix["label"],
+            temperature=fix["temperature"],
             site=site,
         )
-        if new_html.strip():
-            files[template_path] = fix_template(new_html)
-            logger.info("[generator] Template '%s' regenerado", page["name"])
+        if new_code.strip():
+            files[fix["path"]] = fix["clean"](new_code)
+            logger.info("[generator] %s regenerado", fix["name"])
 
-    return files
\ No newline at end of file
+    return files
+
+
+async def _aregenerate_with_errors(files, issues, *, site=None, **kwargs):
+    """Versión async de _regenerate_with_errors: las correcciones van todas a la vez."""
+    fixes = _repair_requests(issues, **kwargs)
+    results = await asyncio.gather(*(
+        allm_call_logged(fix["system"], fix["user_text"], fix["label"], temperature=fix["temperature"], site=site)
+        for fix in fixes
+    ))
+    for fix, new_code in zip(fixes, results):
+        if new_code.strip():
+            files[fix["path"]] = fix["clean"](new_code)
+            logger.info("[generator] %s regenerado", fix["name"])
+
+    return files
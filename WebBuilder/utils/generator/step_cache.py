@@ -0,0 +1,113 @@
+"""
+step_cache.py — Cache de resultados de los pasos de generación.
+
+Cada paso cacheable se guarda bajo el hash de sus entradas exactas (plan,
+prompt enriquecido, artefactos de pasos anteriores...), del modelo/endpoint
+del LLM y de una huella del código de los prompts. Al regenerar, los pasos
+cuyas entradas no han cambiado reutilizan su resultado sin llamar al LLM.
+
+Se guarda en la cache por defecto de Django (SizeBoundedFileCache: compartida
+entre workers, con límite de tamaño y expulsión LRU).
+"""
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import logging
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+
+logger = logging.getLogger(__name__)
+
+# Súbelo si cambia el formato de lo que devuelven los pasos
+STEP_CACHE_VERSION = 1
+# Un paso puede devolver esta clave para que su resultado no se guarde
+# (p. ej. si el LLM falló y se usó un fallback)
+NO_CACHE = "_no_cache"
+
+
+def _default(value: object) -> object:
+    # Los objetos de modelo (site) solo se usan para logs y progreso: fuera de la clave
+    if isinstance(value, models.Model):
+        return None
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return str(value)
+
+
+@lru_cache(maxsize=1)
+def code_fingerprint() -> str:
+    """Huella del código que construye prompts y post-procesa respuestas."""
+    from ..llm import consistency_checker, enrich_prompt, generator_prompts
+    from ..llm.design import presets
+    from . import fallbacks, llm_wrappers, project_generator
+
+    digest = hashlib.sha256()
+    for module in (generator_prompts, enrich_prompt, consistency_checker, presets,
+                   fallbacks, llm_wrappers, project_generator):
+        try:
+            digest.update(inspect.getsource(module).encode("utf-8"))
+        except (OSError, TypeError):
+            digest.update(module.__name__.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+@lru_cache(maxsize=1)
+def _salt() -> str:
+    return "|".join((
+        str(STEP_CACHE_VERSION),
+        settings.LLM_MODEL,
+        settings.LLM_BASE_URL,
+        code_fingerprint(),
+    ))
+
+
+def step_key(step: dict, kwargs: dict) -> str:
+    """Hash de las entradas exactas de un paso (+ modelo, endpoint y código)."""
+    payload = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=_default)
+    return hashlib.sha256(f"{_salt()}|{step['name']}|{payload}".encode("utf-8")).hexdigest()
+
+
+class StepCache:
+    """
+    Cache de pasos para run_steps: lookup() antes de lanzar, store() al
+    terminar. Solo actúa sobre los pasos declarados con cache=True.
+    """
+
+    def __init__(self, *, timeout: int | None = None):
+        self.timeout = timeout or getattr(settings, "GENERATION_STEP_CACHE_TTL", 7 * 24 * 3600)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, step: dict, kwargs: dict) -> str:
+        return f"genstep:{step['name']}:{step_key(step, kwargs)}"
+
+    def lookup(self, step: dict, kwargs: dict) -> dict | None:
+        if not step["cache"]:
+            return None
+        try:
+            result = cache.get(self.key(step, kwargs))
+        except Exception:
+            logger.warning("[generator] Cache de pasos no disponible (lectura de '%s')", step["name"])
+            result = None
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info("[generator] Paso '%s' reutilizado de la cache", step["name"])
+        return result
+
+    def store(self, step: dict, kwargs: dict, result: dict) -> None:
+        if not step["cache"]:
+            return
+        if result.get(NO_CACHE):
+            logger.info("[generator] Paso '%s' no se cachea (usó fallback)", step["name"])
+            return
+        try:
+            cache.set(self.key(step, kwargs), {k: result[k] for k in step["provides"]}, self.timeout)
+        except Exception:
+            logger.warning("[generator] Cache de pasos no disponible (escritura de '%s')", step["name"])
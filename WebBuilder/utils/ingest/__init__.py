@@ -1,4 +1,5 @@
-from .url_reader import fetch_url
-from .parsers import parse_raw, detect_format
+from .url_reader import fetch_url, stream_url
+from .parsers import parse_raw, parse_streamed, detect_format
+from .streaming import stream_json
 
-__all__ = ["fetch_url", "parse_raw", "detect_format"]
+__all__ = ["fetch_url", "stream_url", "parse_raw", "parse_streamed", "detect_format", "stream_json"]
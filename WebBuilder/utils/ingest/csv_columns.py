@@ -0,0 +1,271 @@
+from __future__ import annotations  # Usar todo como strings
+import codecs                       # Decodificación incremental de los chunks
+import csv                          # Lectura de filas y sniffing del dialecto
+import re                           # Validación de números
+import sys                          # sys.intern para las categorías
+from array import array             # Buffers tipados por columna
+from itertools import chain         # Reinyectar las líneas usadas para el sniffing
+from typing import Iterable, Iterator
+
+from .streaming import ByteCounter  # Conteo de bytes + tope + preview (compartido)
+
+
+# ========================== CONSTANTES ==========================
+
+# Filas completas que se guardan como muestra en parsed_data
+CSV_SAMPLE_ROWS = 500
+# Líneas / caracteres que se usan para detectar el dialecto (líneas completas)
+SNIFF_LINES = 20
+SNIFF_MAX_CHARS = 64 * 1024
+# Caracteres del inicio del payload que se guardan como texto crudo de referencia
+PREVIEW_CHARS = 20_000
+# Valores distintos máximos por columna de texto. Por encima (ids, nombres, URLs)
+# la columna deja de guardar códigos y solo conserva esos valores como muestra.
+MAX_CATEGORIES = 20_000
+
+# Solo enteros "canónicos" que caben en 64 bits (sin ceros a la izquierda: "007" es texto)
+_INT_RE = re.compile(r"^(?:0|-?[1-9]\d{0,17})$")
+_FLOAT_RE = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+# Decimales con los que float(text) vuelve a dar exactamente `text`, o None si
+# no se puede ("00.5", "1.10000000000000000001", enteros de más de 64 bits...)
+def _float_decimals(text: str) -> int | None:
+    dot = text.find(".")
+    decimals = 0 if dot < 0 else len(text) - dot - 1
+    if decimals > 255 or f"{float(text):.{decimals}f}" != text:
+        return None
+    return decimals
+
+
+# ========================== COLUMNA TIPADA ==========================
+
+# Columna con buffer compacto. Empieza como int y se promociona a float y
+# después a texto (códigos sobre un diccionario de categorías internadas).
+# Los float guardan sus decimales para que, al promocionar a texto, los números
+# previos se reescriban igual que en el fichero ("1" sigue siendo "1", no "1.0");
+# un número que no se puede reproducir exacto pasa la columna a texto.
+# Si el texto supera MAX_CATEGORIES valores distintos pasa a "text": se liberan
+# los códigos y solo se cuentan nulos (memoria acotada).
+class _Column:
+    __slots__ = ("name", "kind", "values", "decimals", "nulls", "null_count", "categories", "lookup")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.kind = "int"
+        self.values = array("q")
+        self.decimals: bytearray | None = None   # Solo en float: decimales de cada valor
+        self.nulls = bytearray()
+        self.null_count = 0
+        self.categories: list[str] = []
+        self.lookup: dict[str, int] = {}
+
+    def _code(self, text: str) -> int:
+        code = self.lookup.get(text)
+        if code is None:
+            code = len(self.categories)
+            text = sys.intern(text)
+            self.categories.append(text)
+            self.lookup[text] = code
+        return code
+
+    def _to_float(self) -> None:
+        self.values = array("d", self.values)
+        self.decimals = bytearray(len(self.values))
+        self.kind = "float"
+
+    def _to_text(self) -> None:
+        codes = array("I")
+        if self.kind == "float":
+            for value, decimals, is_null in zip(self.values, self.decimals, self.nulls):
+                codes.append(0 if is_null else self._code(f"{value:.{decimals}f}"))
+        else:
+            for value, is_null in zip(self.values, self.nulls):
+                codes.append(0 if is_null else self._code(str(value)))
+        self.values = codes
+        self.decimals = None
+        self.kind = "str"
+        if len(self.categories) > MAX_CATEGORIES:
+            self._to_free_text()
+
+    def _to_free_text(self) -> None:
+        self.kind = "text"
+        self.values = array("I")
+        self.lookup = {}
+
+    def append(self, raw: str | None) -> None:
+        text = (raw or "").strip()
+        if not text:
+            self.nulls.append(1)
+            self.null_count += 1
+            if self.kind != "text":
+                self.values.append(0)
+            if self.kind == "float":
+                self.decimals.append(0)
+            return
+        self.nulls.append(0)
+
+        if self.kind == "text":
+            return
+
+        if self.kind == "int":
+            if _INT_RE.match(text):
+                self.values.append(int(text))
+                return
+            if _FLOAT_RE.match(text) and _float_decimals(text) is not None:
+                self._to_float()
+            else:
+                self._to_text()
+
+        if self.kind == "float":
+            decimals = _float_decimals(text) if _FLOAT_RE.match(text) else None
+            if decimals is not None:
+                self.values.append(float(text))
+                self.decimals.append(decimals)
+                return
+            self._to_text()
+
+        if self.kind == "str":
+            self.values.append(self._code(text))
+            if len(self.categories) > MAX_CATEGORIES:
+                self._to_free_text()
+
+    # Valores no nulos como objetos Python (ints, floats o strings).
+    # En columnas "text" solo quedan los primeros valores distintos como muestra.
+    def iter_values(self) -> Iterator[object]:
+        if self.kind == "text":
+            return iter(self.categories)
+        if self.kind == "str":
+            categories = self.categories
+            return (categories[v] for v, n in zip(self.values, self.nulls) if not n)
+        return (v for v, n in zip(self.values, self.nulls) if not n)
+
+    # Resumen compacto de la columna para ingest_meta
+    def summary(self, row_count: int) -> dict:
+        info: dict = {
+            "type": self.kind if row_count > self.null_count else "empty",
+            "nulls": self.null_count,
+        }
+        if self.kind == "str":
+            info["distinct"] = len(self.categories)
+        elif self.kind == "text":
+            info["distinct_over"] = MAX_CATEGORIES
+        elif row_count > self.null_count:
+            present = [v for v, n in zip(self.values, self.nulls) if not n]
+            info["min"] = min(present)
+            info["max"] = max(present)
+        return info
+
+
+# ========================== LECTURA ==========================
+
+# Convierte chunks de bytes en líneas de texto (con su salto de línea)
+def iter_lines(chunks: Iterable[bytes], encoding: str = "utf-8") -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parts = (pending + decoder.decode(chunk)).split("\n")
+        pending = parts.pop()
+        for part in parts:
+            yield part + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+# Detecta el dialecto sobre líneas completas del inicio (no un corte a mitad de fila)
+def _sniff_dialect(lines: list[str]):
+    sample = "".join(lines)[:SNIFF_MAX_CHARS]
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;")
+    except csv.Error:
+        return csv.excel  # fallback al dialecto estándar con comas
+
+
+# Resultado de leer un CSV completo en columnas tipadas
+class CsvColumns:
+
+    def __init__(self, header: list[str], columns: list[_Column], row_count: int, sample_rows: list[dict]):
+        self.header = header
+        self.columns = columns
+        self.row_count = row_count
+        self.sample_rows = sample_rows
+
+    def column_values(self, name: str) -> list[object]:
+        for column in self.columns:
+            if column.name == name:
+                return list(column.iter_values())
+        return []
+
+    def summary(self) -> dict:
+        return {c.name: c.summary(self.row_count) for c in self.columns}
+
+    def key_counts(self) -> dict[str, int]:
+        return {c.name: self.row_count - c.null_count for c in self.columns}
+
+
+# Lee TODAS las filas del CSV en buffers tipados por columna.
+# Solo las primeras sample_rows se guardan además como dicts (muestra para la UI);
+# con sample_rows=None se guardan todas (solo para textos pequeños ya en memoria).
+def read_csv_columns(lines: Iterable[str], *, sample_rows: int | None = CSV_SAMPLE_ROWS) -> CsvColumns:
+    line_iter = iter(lines)
+    head_lines: list[str] = []
+    head_chars = 0
+    for line in line_iter:
+        head_lines.append(line)
+        head_chars += len(line)
+        if len(head_lines) >= SNIFF_LINES or head_chars >= SNIFF_MAX_CHARS:
+            break
+
+    reader = csv.reader(chain(head_lines, line_iter), dialect=_sniff_dialect(head_lines))
+    header = next(reader, None) or []
+    if header:
+        header[0] = header[0].lstrip("\ufeff")
+    columns = [_Column(name) for name in header]
+    width = len(columns)
+
+    rows: list[dict] = []
+    row_count = 0
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < width:
+            row = row + [None] * (width - len(row))
+        for column, value in zip(columns, row):
+            column.append(value)
+        if sample_rows is None or row_count < sample_rows:
+            rows.append(dict(zip(header, row)))
+        row_count += 1
+
+    return CsvColumns(header, columns, row_count, rows)
+
+
+# ========================== API PUBLICA ==========================
+
+# Procesa un CSV que llega por chunks de bytes. Devuelve el mismo contrato que
+# streaming.stream_json: parsed (muestra de filas), collections (conteos reales)
+# y además "table" con las columnas completas (no serializable, uso inmediato).
+def stream_csv(
+    chunks: Iterable[bytes],
+    *,
+    max_bytes: int,
+    sample_rows: int = CSV_SAMPLE_ROWS,
+    preview_chars: int = PREVIEW_CHARS,
+) -> dict:
+    counter = ByteCounter(max_bytes, preview_chars)
+
+    try:
+        table = read_csv_columns(iter_lines(counter.wrap(chunks)), sample_rows=sample_rows)
+    except csv.Error as exc:
+        raise ValueError(f"CSV inválido: {exc}") from exc
+
+    return {
+        "format": "csv",
+        "parsed": table.sample_rows,
+        "collections": [{"path": [], "count": table.row_count, "key_counts": table.key_counts()}],
+        "table": table,
+        "bytes": counter.bytes,
+        "preview": counter.preview,
+    }
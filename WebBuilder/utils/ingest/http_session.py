@@ -0,0 +1,163 @@
+from __future__ import annotations          # Usar todo como strings
+import hashlib                              # Clave de cache por URL y hash del payload
+import logging                              # Logs de la limpieza de blobs
+import threading                            # Crear la sesión una sola vez por proceso
+import zlib                                 # Payload comprimido mientras se descarga
+from datetime import timedelta              # Caducidad de los blobs retenidos por la cache
+from typing import Iterable, Iterator
+
+import requests                             # Session con pool de conexiones keep-alive
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING  # gzip/deflate (+ br si brotli está instalado)
+from django.core.cache import cache         # Almacén de validadores (ETag/Last-Modified)
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# ========================== CONSTANTES ==========================
+
+# Conexiones por host que se mantienen abiertas y hosts distintos en el pool
+POOL_MAXSIZE = 10
+POOL_CONNECTIONS = 20
+# Payload máximo (comprimido) que se guarda para reutilizarlo en un 304. Los
+# datasets grandes son justo los que más ganan con un GET condicional
+MAX_CACHED_BYTES = 32_000_000
+# Tiempo que se conservan los validadores y su blob (7 días)
+VALIDATORS_TIMEOUT = 7 * 24 * 3600
+VALIDATORS_PREFIX = "ingest:http:v2:"   # v2: el payload va en un PayloadBlob, no en la cache
+# Trozos al descomprimir un payload guardado
+BLOB_CHUNK_SIZE = 64 * 1024
+
+
+# ========================== SESION ==========================
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+# Sesión compartida por todo el proceso: reutiliza conexiones TCP/TLS entre peticiones
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["Accept-Encoding"] = DEFAULT_ACCEPT_ENCODING
+                _session = session
+    return _session
+
+
+# ========================== VALIDADORES ==========================
+# Los validadores (ETag / Last-Modified) van en la cache de Django, pequeños;
+# el payload va aparte en un PayloadBlob (comprimido, direccionado por
+# contenido y compartido con los análisis que guardan ese mismo payload).
+# El blob lleva cached_until = caducidad de los validadores: pasada esa fecha,
+# si ningún análisis lo usa, lo borra la limpieza que se hace al guardar otro.
+
+def _validators_key(url: str) -> str:
+    return VALIDATORS_PREFIX + hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+# Comprime y hashea el cuerpo de una respuesta mientras se consume: en memoria
+# solo queda la versión comprimida (hasta MAX_CACHED_BYTES)
+class BodyRecorder:
+
+    def __init__(self, limit: int = MAX_CACHED_BYTES):
+        self.limit = limit
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self._compressor = zlib.compressobj(6)
+        self._compressed: list[bytes] | None = []
+        self._stored = 0
+
+    def wrap(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            if self._compressed is not None:
+                self.size += len(chunk)
+                self.digest.update(chunk)
+                piece = self._compressor.compress(chunk)
+                self._stored += len(piece)
+                if self._stored <= self.limit:
+                    self._compressed.append(piece)
+                else:
+                    self._compressed = None   # Demasiado grande: no se podrá reutilizar
+            yield chunk
+
+    # Cuerpo comprimido completo (None si superó el límite)
+    def compressed(self) -> bytes | None:
+        if self._compressed is None:
+            return None
+        return b"".join(self._compressed) + self._compressor.copy().flush()
+
+
+def _blob_chunks(blob) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj()
+    data = memoryview(bytes(blob.data))
+    for start in range(0, len(data), BLOB_CHUNK_SIZE):
+        piece = decompressor.decompress(data[start:start + BLOB_CHUNK_SIZE])
+        if piece:
+            yield piece
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+# GET condicional con la sesión compartida. Si hay validadores guardados para la
+# URL (y su payload sigue en la BD) se envían (If-None-Match / If-Modified-Since).
+# Devuelve (response, cached): cached es la entrada guardada cuando el servidor
+# contesta 304, con "chunks" (el payload descomprimido por trozos); si no, None.
+def conditional_get(url: str, *, timeout: int, headers: dict) -> tuple[requests.Response, dict | None]:
+    from ...models import PayloadBlob
+
+    entry = cache.get(_validators_key(url))
+    blob = PayloadBlob.objects.filter(sha256=entry["blob"]).first() if entry else None
+    request_headers = dict(headers)
+    if blob is not None:
+        if entry.get("etag"):
+            request_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            request_headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = get_session().get(url, timeout=timeout, headers=request_headers, stream=True)
+    if response.status_code == 304 and blob is not None:
+        response.close()
+        return response, {**entry, "chunks": _blob_chunks(blob)}
+    return response, None
+
+
+# Guarda validadores + payload de una respuesta 200 ya consumida entera
+def remember_response(url: str, response: requests.Response, recorder: BodyRecorder) -> None:
+    from ...models import PayloadBlob
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    compressed = recorder.compressed()
+    if response.status_code != 200 or not (etag or last_modified) or compressed is None:
+        return
+    digest = recorder.digest.hexdigest()
+    cached_until = timezone.now() + timedelta(seconds=VALIDATORS_TIMEOUT)
+    PayloadBlob.store_compressed(digest, compressed, recorder.size, cached_until=cached_until)
+
+    key = _validators_key(url)
+    previous = cache.get(key)
+    cache.set(
+        key,
+        {
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": response.encoding,
+            "links": response.links,
+            "blob": digest,
+        },
+        VALIDATORS_TIMEOUT,
+    )
+    # La versión anterior de esta URL ya no se reutilizará (si ningún análisis la usa, fuera)
+    if previous and previous.get("blob") != digest:
+        PayloadBlob.uncache(previous.get("blob"))
+    purged = PayloadBlob.purge_expired()
+    if purged:
+        logger.info("[ingest] %d blobs de la cache HTTP caducados borrados", purged)
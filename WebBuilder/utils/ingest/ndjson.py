@@ -0,0 +1,65 @@
+from __future__ import annotations  # Usar todo como strings
+import json                         # Cada línea es un documento JSON independiente
+from typing import Iterable, Iterator
+
+from .csv_columns import iter_lines  # chunks de bytes -> líneas de texto
+from .streaming import MAX_TRACKED_KEYS, PREVIEW_CHARS, STREAM_SAMPLE_ITEMS, ByteCounter
+
+
+# ========================== PARSEO POR LINEAS ==========================
+
+# Generador: devuelve un valor por cada línea no vacía (NDJSON / JSON Lines).
+# Nunca construye la lista completa; los errores indican la línea.
+def iter_ndjson(lines: Iterable[str]) -> Iterator[object]:
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if number == 1:
+            line = line.lstrip("\ufeff")
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"NDJSON inválido en la línea {number}: {exc.msg}") from exc
+
+
+# Recorre los registros guardando solo los primeros sample_items y contando
+# registros y keys del total. Devuelve (muestra, estadísticas de la colección raíz).
+def sample_ndjson(records: Iterable[object], *, sample_items: int = STREAM_SAMPLE_ITEMS) -> tuple[list, dict]:
+    sample: list = []
+    count = 0
+    key_counts: dict[str, int] = {}
+    for record in records:
+        if count < sample_items:
+            sample.append(record)
+        count += 1
+        if isinstance(record, dict):
+            for key in record:
+                if key in key_counts:
+                    key_counts[key] += 1
+                elif len(key_counts) < MAX_TRACKED_KEYS:
+                    key_counts[key] = 1
+    return sample, {"path": [], "count": count, "key_counts": key_counts}
+
+
+# ========================== API PUBLICA ==========================
+
+# Procesa un NDJSON que llega por chunks en memoria constante. Devuelve el mismo
+# contrato que streaming.stream_json: la muestra como lista raíz y las estadísticas
+# reales de esa colección (path []).
+def stream_ndjson(
+    chunks: Iterable[bytes],
+    *,
+    max_bytes: int,
+    sample_items: int = STREAM_SAMPLE_ITEMS,
+    preview_chars: int = PREVIEW_CHARS,
+) -> dict:
+    counter = ByteCounter(max_bytes, preview_chars)
+    sample, stats = sample_ndjson(iter_ndjson(iter_lines(counter.wrap(chunks))), sample_items=sample_items)
+    return {
+        "format": "ndjson",
+        "parsed": sample,
+        "collections": [stats],
+        "bytes": counter.bytes,
+        "preview": counter.preview,
+    }
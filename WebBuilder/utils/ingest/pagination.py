@@ -0,0 +1,250 @@
+from __future__ import annotations                          # Usar todo como strings
+import hashlib                                              # Huella de los items de cada página
+import json                                                 # Serialización estable para la huella
+import logging                                              # Logs de páginas fallidas
+import threading                                            # Semáforos por host
+from concurrent.futures import ThreadPoolExecutor           # Descarga concurrente de páginas
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import requests                                             # Errores de red durante la descarga
+from django.conf import settings                            # INGEST_MAX_PAGES / INGEST_PAGE_CONCURRENCY
+from django.db import connections                           # Cerrar las conexiones de los hilos del pool
+
+from ..analysis.helpers import get_by_path                  # Navegar hasta la colección principal
+from .parsers import parse_raw                              # Parseo de cada página
+from .url_reader import DEFAULT_TIMEOUT, MAX_BYTES, _download  # Descarga (sesión con pool + GET condicional)
+
+logger = logging.getLogger(__name__)
+
+
+# ========================== CONSTANTES ==========================
+
+# Páginas totales (incluida la primera) y descargas simultáneas por host
+MAX_PAGES = 5
+PER_HOST_CONCURRENCY = 4
+
+# Parámetros de query típicos de paginación
+_PAGE_PARAMS = ("page", "page_number", "pageNumber", "pagina", "p")
+_OFFSET_PARAMS = ("offset", "skip", "start")
+_LIMIT_PARAMS = ("limit", "per_page", "page_size", "pageSize", "size", "rows")
+
+# Rutas dentro del payload donde las APIs suelen dejar la URL de la página siguiente
+_NEXT_PATHS = (
+    ("next",),
+    ("next_page",),
+    ("nextPage",),
+    ("next_page_url",),
+    ("@odata.nextLink",),
+    ("links", "next"),
+    ("_links", "next", "href"),
+    ("meta", "next"),
+    ("paging", "next"),
+    ("pagination", "next"),
+    ("info", "next"),
+)
+
+
+# ========================== LIMITE POR HOST ==========================
+
+_host_slots: dict[str, threading.Semaphore] = {}
+_host_slots_lock = threading.Lock()
+
+
+# Semáforo compartido por todo el proceso: varias ingestas a la vez no superan el cap del host
+def _host_semaphore(host: str, limit: int) -> threading.Semaphore:
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = threading.Semaphore(limit)
+            _host_slots[host] = slot
+        return slot
+
+
+# ========================== DETECCION ==========================
+
+# URL de la página siguiente indicada en el payload (o None)
+def _next_from_body(parsed: object, base_url: str) -> str | None:
+    if not isinstance(parsed, dict):
+        return None
+    for path in _NEXT_PATHS:
+        node = parsed
+        for step in path:
+            node = node.get(step) if isinstance(node, dict) else None
+        if isinstance(node, dict):
+            node = node.get("href")
+        # Solo URLs (absolutas o relativas): un token de cursor suelto no se puede seguir
+        if isinstance(node, str) and node.strip().startswith(("http://", "https://", "/", "?")):
+            return urljoin(base_url, node.strip())
+    return None
+
+
+def _int_param(params: dict, names: tuple) -> tuple[str, int] | None:
+    for name in names:
+        value = params.get(name)
+        if value is not None and value.lstrip("-").isdigit():
+            return name, int(value)
+    return None
+
+
+# Si dos URLs solo se diferencian en un parámetro entero devuelve (param, valor_actual, paso)
+def _numeric_step(current_url: str, next_url: str) -> tuple[str, int, int] | None:
+    cur, nxt = urlsplit(current_url), urlsplit(next_url)
+    if (cur.scheme, cur.netloc, cur.path) != (nxt.scheme, nxt.netloc, nxt.path):
+        return None
+    cur_params, nxt_params = dict(parse_qsl(cur.query)), dict(parse_qsl(nxt.query))
+    changed = [k for k in set(cur_params) | set(nxt_params) if cur_params.get(k) != nxt_params.get(k)]
+    if len(changed) != 1:
+        return None
+    name = changed[0]
+    next_value = nxt_params.get(name, "")
+    if not next_value.isdigit():
+        return None
+    # Página 1 / offset 0 implícitos cuando la URL inicial no lleva el parámetro
+    current_value = cur_params.get(name, "1" if name in _PAGE_PARAMS else "0")
+    if not current_value.isdigit() or int(next_value) <= int(current_value):
+        return None
+    return name, int(current_value), int(next_value) - int(current_value)
+
+
+def _with_param(url: str, name: str, value: int) -> str:
+    parts = urlsplit(url)
+    params = dict(parse_qsl(parts.query))
+    params[name] = str(value)
+    return urlunsplit(parts._replace(query=urlencode(params)))
+
+
+# Decide cómo paginar a partir de la primera página:
+#   {"mode": "numeric", "param", "start", "step"} → URLs calculables, descarga concurrente
+#   {"mode": "cursor", "next"}                    → hay que seguir el enlace de cada página
+#   None                                          → no se detecta paginación
+def detect_pagination(api_url: str, parsed: object, links: dict | None, item_count: int) -> dict | None:
+    next_url = ((links or {}).get("next") or {}).get("url") or _next_from_body(parsed, api_url)
+    if next_url:
+        next_url = urljoin(api_url, next_url)
+        step = _numeric_step(api_url, next_url)
+        if step:
+            name, start, delta = step
+            return {"mode": "numeric", "param": name, "start": start, "step": delta}
+        return {"mode": "cursor", "next": next_url}
+
+    # Sin enlace explícito: parámetros page/offset en la URL que escribió el usuario
+    params = dict(parse_qsl(urlsplit(api_url).query))
+    page = _int_param(params, _PAGE_PARAMS)
+    if page:
+        return {"mode": "numeric", "param": page[0], "start": page[1], "step": 1}
+    offset = _int_param(params, _OFFSET_PARAMS)
+    if offset:
+        limit = _int_param(params, _LIMIT_PARAMS)
+        delta = limit[1] if limit else item_count
+        if delta > 0:
+            return {"mode": "numeric", "param": offset[0], "start": offset[1], "step": delta}
+    return None
+
+
+# ========================== DESCARGA ==========================
+
+# Descarga y parsea una página; devuelve (payload, links) o (None, {}) si falla.
+# Las páginas no se guardan para GET condicionales (serían blobs que no usa ningún
+# análisis) y el hilo cierra al terminar cualquier conexión a la BD que haya abierto.
+def _fetch_page(url: str, slot: threading.Semaphore) -> tuple[object | None, dict]:
+    try:
+        with slot:
+            raw_text, _, _, links = _download(
+                url, timeout=DEFAULT_TIMEOUT, max_bytes=MAX_BYTES, stream_large=False, conditional=False,
+            )
+        _, parsed = parse_raw(raw_text)
+        return parsed, links
+    except (ValueError, requests.RequestException) as exc:
+        # Un corte a mitad de descarga (ChunkedEncodingError, timeout...) solo pierde esa página
+        logger.warning("[ingest] Página %s descartada: %s", url, exc)
+        return None, {}
+    finally:
+        connections.close_all()
+
+
+# Items de la colección principal (mismo path que en la primera página)
+def _page_items(parsed: object, main_path: list) -> list:
+    node = get_by_path(parsed, main_path)
+    return node if isinstance(node, list) else []
+
+
+# Huella de los items de una página: una API que ignora el parámetro de
+# paginación devuelve la misma página una y otra vez
+def _items_digest(page_items: list) -> str:
+    text = json.dumps(page_items, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Registra la página en seen_pages; False si sus items ya se habían visto
+def _is_new_page(page_items: list, seen_pages: set) -> bool:
+    digest = _items_digest(page_items)
+    if digest in seen_pages:
+        logger.info("[ingest] Página repetida: la API ignora la paginación, se para")
+        return False
+    seen_pages.add(digest)
+    return True
+
+
+# ========================== API PUBLICA ==========================
+
+# Descarga las páginas siguientes a api_url y añade sus items a la colección
+# principal de parsed (in place). Las páginas numéricas se piden a la vez
+# (limitadas por host); las de cursor se siguen una a una.
+# Devuelve {"mode", "pages", "items_added"} o None si no hay paginación.
+def crawl_pages(
+    api_url: str,
+    parsed: object,
+    main_path: list,
+    *,
+    links: dict | None = None,
+    max_pages: int | None = None,
+    per_host: int | None = None,
+) -> dict | None:
+    max_pages = max_pages or getattr(settings, "INGEST_MAX_PAGES", MAX_PAGES)
+    per_host = per_host or getattr(settings, "INGEST_PAGE_CONCURRENCY", PER_HOST_CONCURRENCY)
+
+    items = _page_items(parsed, main_path)
+    if max_pages <= 1 or not items:
+        return None
+    plan = detect_pagination(api_url, parsed, links, len(items))
+    if plan is None:
+        return None
+
+    slot = _host_semaphore(urlsplit(api_url).netloc, per_host)
+    pages = 1
+    added = 0
+    seen_pages = {_items_digest(items)}
+
+    if plan["mode"] == "numeric":
+        urls = [
+            _with_param(api_url, plan["param"], plan["start"] + k * plan["step"])
+            for k in range(1, max_pages)
+        ]
+        with ThreadPoolExecutor(max_workers=min(per_host, len(urls))) as pool:
+            results = list(pool.map(lambda url: _fetch_page(url, slot), urls))
+        # Se respeta el orden y se para en la primera página vacía, fallida o repetida
+        for page, _ in results:
+            page_items = _page_items(page, main_path)
+            if not page_items or not _is_new_page(page_items, seen_pages):
+                break
+            items.extend(page_items)
+            added += len(page_items)
+            pages += 1
+    else:
+        seen = {api_url}
+        next_url = plan["next"]
+        while next_url and next_url not in seen and pages < max_pages:
+            seen.add(next_url)
+            page, page_links = _fetch_page(next_url, slot)
+            page_items = _page_items(page, main_path)
+            if not page_items or not _is_new_page(page_items, seen_pages):
+                break
+            items.extend(page_items)
+            added += len(page_items)
+            pages += 1
+            link_next = (page_links.get("next") or {}).get("url")
+            next_url = urljoin(next_url, link_next) if link_next else _next_from_body(page, next_url)
+
+    if added == 0:
+        return None
+    return {"mode": plan["mode"], "pages": pages, "items_added": added}
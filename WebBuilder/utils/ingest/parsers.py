@@ -1,51 +1,31 @@
 from __future__ import annotations                  # Usar todo como strings
+import io                                           # CSV ya en memoria -> líneas
 import json                                         # Payloads para parsear JSON
-import xmltodict                                    # Para poder parsear los XML
-from defusedxml import ElementTree as DefusedET     # Validacion de seguridad para XML
+from .csv_columns import read_csv_columns           # CSV completo en columnas tipadas
+from .ndjson import iter_ndjson                     # NDJSON / JSON Lines línea a línea
+from .sniffer import sniff_format                   # Deteccion de formato sin parsear
+from .xml_parser import parse_xml                   # XML seguro -> dict en una sola pasada
 
 
 # ========================== DETECCION Y PARSEO ==========================
 
-# Detecta el formato del texto (json/xml/unknown)
+# Detecta el formato del texto (json/geojson/ndjson/xml/csv/unknown) mirando solo el inicio
 def detect_format(raw_text: str) -> str:
-    trimmed = raw_text.lstrip()
-    if trimmed.startswith("{") or trimmed.startswith("["):
-        # Puede ser GeoJSON — lo comprobamos antes de declararlo JSON genérico
-        try:
-            maybe = json.loads(trimmed[:500])  # solo el inicio para ser rápidos
-            if isinstance(maybe, dict) and maybe.get("type") == "FeatureCollection":
-                return "geojson"
-        except Exception:
-            pass
-        return "json"
-    if trimmed.startswith("<"):
-        return "xml"
-    # CSV: si la primera línea tiene comas o puntos y coma, lo tratamos como CSV
-    first_line = trimmed.split("\n")[0]
-    if "," in first_line or ";" in first_line:
-        return "csv"
-    return "unknown"
+    return sniff_format(raw_text)
 
 
+# CSV ya en memoria (payload pequeño): se leen y devuelven todas las filas
 def _parse_csv(raw_text: str) -> list[dict]:
-    import csv, io
-    sample = raw_text[:2000]
-    try:
-        dialect = csv.Sniffer().sniff(sample, delimiters=",;")
-    except csv.Error:
-        dialect = csv.excel  # fallback al dialecto estándar con comas
-    reader = csv.DictReader(io.StringIO(raw_text), dialect=dialect)
-    rows = []
-    for i, row in enumerate(reader):
-        if i >= 2000:
-            break
-        rows.append(dict(row))
-    return rows
-
-# No hay parse json ni xml pq es facil con las librerias que tenemos
+    table = read_csv_columns(io.StringIO(raw_text, newline=""), sample_rows=None)
+    return table.sample_rows
+
+# No hay parse json pq es facil con la libreria estandar (xml va en xml_parser.py)
 # Convertirmos csv y geojson a list[dict], asi tiene el mismo formato que un json
 def _parse_geojson(raw_text: str) -> list[dict]:
-    data = json.loads(raw_text)
+    return _geojson_rows(json.loads(raw_text))
+
+# Aplana las features de una FeatureCollection a list[dict] con sus properties
+def _geojson_rows(data: dict) -> list[dict]:
     features = data.get("features", [])
     result = []
     for feature in features:
@@ -62,27 +42,99 @@ def _parse_geojson(raw_text: str) -> list[dict]:
 def parse_raw(raw_text: str) -> tuple[str, object]:
     detected_format = detect_format(raw_text)
     if detected_format == "json":
-        return "json", json.loads(raw_text)
+        try:
+            data = json.loads(raw_text)
+        except json.JSONDecodeError as exc:
+            # Varios documentos seguidos: NDJSON con una primera línea muy larga
+            if exc.msg != "Extra data":
+                raise
+            return "ndjson", list(iter_ndjson(io.StringIO(raw_text)))
+        # El sniffer solo mira las primeras keys: un "type" detrás de un
+        # "features" enorme no lo ve, así que se comprueba ya parseado
+        if isinstance(data, dict) and data.get("type") == "FeatureCollection":
+            return "geojson", _geojson_rows(data)
+        return "json", data
+    if detected_format == "ndjson":
+        return "ndjson", list(iter_ndjson(io.StringIO(raw_text)))
     if detected_format == "xml":
-        DefusedET.fromstring(raw_text.encode("utf-8"))
-        return "xml", xmltodict.parse(raw_text)
+        return "xml", parse_xml(raw_text)
     if detected_format == "csv":
         return "csv", _parse_csv(raw_text)
     if detected_format == "geojson":
         return "geojson", _parse_geojson(raw_text)
-    raise ValueError("Formato no reconocido. Soportados: JSON, XML, CSV, GeoJSON.")
+    raise ValueError("Formato no reconocido. Soportados: JSON, NDJSON, XML, CSV, GeoJSON.")
+
+
+# Equivalente a parse_raw para un payload procesado en streaming (ver streaming.py).
+# Devuelve (formato, estructura_parseada_reducida, ingest_meta) donde ingest_meta
+# guarda las estadísticas reales de las colecciones (conteos sobre el total).
+def parse_streamed(streamed: dict) -> tuple[str, object, dict]:
+    parsed = streamed.get("parsed")
+    collections = streamed.get("collections") or []
+    fmt = streamed.get("format") or "json"
+
+    if fmt == "json" and isinstance(parsed, dict) and parsed.get("type") == "FeatureCollection":
+        # GeoJSON: la colección pasa a ser la raíz (igual que _parse_geojson)
+        fmt = "geojson"
+        parsed = _geojson_rows(parsed)
+        features = next((c for c in collections if c.get("path") == ["features"]), None)
+        # Las properties no se cuentan durante el streaming: conteo sobre la muestra
+        key_counts: dict[str, int] = {}
+        for row in parsed:
+            for key in row:
+                key_counts[key] = key_counts.get(key, 0) + 1
+        collections = [{
+            "path": [],
+            "count": features["count"] if features else len(parsed),
+            "key_counts": key_counts,
+        }]
+
+    ingest_meta = {
+        "mode": "stream",
+        "bytes": streamed.get("bytes", 0),
+        "collections": collections,
+    }
+
+    # CSV: las columnas completas solo existen aquí, así que los tipos y los roles
+    # de cada campo se calculan ahora sobre TODAS las filas, no sobre la muestra.
+    table = streamed.get("table")
+    if table is not None:
+        # Import local: analysis importa ingest (evita el import circular)
+        from ..analysis.field_roles import infer_field_role
+        from ..analysis.profiler import profile_values
+        ingest_meta["columns"] = table.summary()
+        profiles = {}
+        for name in table.header:
+            profile = profile_values(table.column_values(name), total=table.row_count)
+            # Las columnas "text" solo conservan una muestra: los nulos reales salen de la columna
+            if table.row_count:
+                profile["null_ratio"] = round(ingest_meta["columns"][name]["nulls"] / table.row_count, 4)
+            profiles[name] = profile
+        ingest_meta["field_profile"] = profiles
+        ingest_meta["field_roles"] = {
+            name: infer_field_role(name, profile=profile) for name, profile in ingest_meta["field_profile"].items()
+        }
+    return fmt, parsed, ingest_meta
 
 
 # ========================== RESUMEN PARA RESPONSE_SUMMARY ==========================
 
 # Crea resumen de lo parseado para response_summary (models)
-def summarize_data(fmt: str, parsed: object) -> str:
+def summarize_data(fmt: str, parsed: object, ingest_meta: dict | None = None) -> str:
     if fmt == "csv":
         if isinstance(parsed, list):
             cols = list(parsed[0].keys()) if parsed else []
-            return f"CSV con {len(parsed)} filas y {len(cols)} columnas: {', '.join(cols[:8])}{'...' if len(cols) > 8 else ''}."
+            # En streaming parsed es solo una muestra: el total real está en ingest_meta
+            stats = next(iter((ingest_meta or {}).get("collections") or []), None)
+            rows = stats["count"] if stats else len(parsed)
+            return f"CSV con {rows} filas y {len(cols)} columnas: {', '.join(cols[:8])}{'...' if len(cols) > 8 else ''}."
         return "CSV parseado."
 
+    if fmt == "ndjson":
+        stats = next(iter((ingest_meta or {}).get("collections") or []), None)
+        rows = stats["count"] if stats else (len(parsed) if isinstance(parsed, list) else 0)
+        return f"NDJSON con {rows} registros."
+
     if fmt == "geojson":
         if isinstance(parsed, list):
             sample_keys = [k for k in (parsed[0].keys() if parsed else []) if not k.startswith("_")]
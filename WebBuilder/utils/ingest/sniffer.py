@@ -0,0 +1,203 @@
+from __future__ import annotations  # Usar todo como strings
+import json                         # Validar la primera línea de un posible NDJSON
+
+
+# ========================== CONSTANTES ==========================
+
+# Caracteres del inicio del payload que se miran como máximo
+SNIFF_CHARS = 4096
+# Si el primer objeto no cierra en SNIFF_CHARS, se busca el fin de su línea
+# hasta aquí (un NDJSON con registros largos sigue siendo NDJSON)
+NDJSON_SNIFF_LIMIT = 1_000_000
+# Keys de primer nivel que se leen buscando "type" antes de rendirse
+SNIFF_MAX_KEYS = 8
+# Caracteres que se ignoran al principio (BOM + espacios)
+_LEADING = "\ufeff \t\r\n"
+
+
+# ========================== ESCANEO ==========================
+
+# Devuelve (índice tras la comilla de cierre, contenido) o (-1, "") si el string
+# está truncado. No decodifica escapes: solo se usa para comparar keys simples.
+def _scan_string(text: str, start: int) -> tuple[int, str]:
+    i = start + 1
+    while True:
+        end = text.find('"', i)
+        if end < 0:
+            return -1, ""
+        backslashes = 0
+        k = end - 1
+        while k > start and text[k] == "\\":
+            backslashes += 1
+            k -= 1
+        if backslashes % 2 == 0:
+            return end + 1, text[start + 1: end]
+        i = end + 1
+
+
+def _skip_ws(text: str, i: int) -> int:
+    n = len(text)
+    while i < n and text[i] in " \t\r\n":
+        i += 1
+    return i
+
+
+# Recorre las primeras keys de primer nivel de un objeto JSON (sin parsearlo)
+# y devuelve True si "type" vale "FeatureCollection". Nunca lanza excepciones:
+# si el inicio está truncado o es raro, simplemente devuelve False.
+def _is_feature_collection(text: str, start: int, max_keys: int) -> bool:
+    n = len(text)
+    i = start + 1
+    depth = 1
+    keys_seen = 0
+    expecting_key = True
+
+    while i < n:
+        c = text[i]
+        if c == '"':
+            end, value = _scan_string(text, i)
+            if end < 0:
+                return False
+            if depth == 1 and expecting_key:
+                keys_seen += 1
+                j = _skip_ws(text, end)
+                if j >= n or text[j] != ":":
+                    return False
+                j = _skip_ws(text, j + 1)
+                if value == "type":
+                    if j < n and text[j] == '"':
+                        end2, type_value = _scan_string(text, j)
+                        return end2 >= 0 and type_value == "FeatureCollection"
+                    return False
+                if keys_seen >= max_keys:
+                    return False
+                expecting_key = False
+                i = j
+                continue
+            i = end
+            continue
+        if c == "{" or c == "[":
+            depth += 1
+        elif c == "}" or c == "]":
+            depth -= 1
+            if depth == 0:
+                return False
+        elif c == "," and depth == 1:
+            expecting_key = True
+        i += 1
+    return False
+
+
+# Índice tras la llave que cierra el objeto que empieza en start (o -1 si no
+# cierra dentro del texto). Respeta strings y escapes.
+def _object_end(text: str, start: int) -> int:
+    n = len(text)
+    depth = 0
+    i = start
+    while i < n:
+        c = text[i]
+        if c == '"':
+            i, _ = _scan_string(text, i)
+            if i < 0:
+                return -1
+            continue
+        if c == "{" or c == "[":
+            depth += 1
+        elif c == "}" or c == "]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return -1
+
+
+# NDJSON / JSON Lines: el primer objeto cierra en su propia línea y la línea
+# siguiente empieza otro objeto. Un JSON "pretty" nunca cierra en la primera línea.
+def _is_ndjson(text: str, start: int) -> bool:
+    end = _object_end(text, start)
+    if end < 0:
+        return False
+    line_end = text.find("\n", end)
+    if line_end < 0 or text[end:line_end].strip():
+        return False
+    j = _skip_ws(text, line_end)
+    return j < len(text) and text[j] == "{"
+
+
+def _as_text(data: str | bytes) -> str:
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data).decode("utf-8", errors="replace")
+    return data
+
+
+# Primer registro más largo que SNIFF_CHARS: la primera línea entera (hasta
+# NDJSON_SNIFF_LIMIT) debe ser un objeto JSON y la siguiente empezar otro.
+# Un JSON "pretty" tiene su primer salto de línea nada más abrir la llave.
+def _is_long_ndjson(data: str | bytes, start: int) -> bool:
+    window = _as_text(data[:NDJSON_SNIFF_LIMIT])
+    line_end = window.find("\n", start)
+    if line_end < 0:
+        return False
+    line = window[start:line_end].strip()
+    if not line.endswith("}"):
+        return False
+    j = _skip_ws(window, line_end)
+    if j >= len(window) or window[j] != "{":
+        return False
+    try:
+        return isinstance(json.loads(line), dict)
+    except ValueError:
+        return False
+
+
+# ¿Falta ver más datos para decidir? El primer objeto no ha cerrado su línea
+# en lo leído hasta ahora y aún no se ha llegado a NDJSON_SNIFF_LIMIT. Lo usa
+# la lectura por chunks para no decidir "json" con un NDJSON de registros largos.
+def needs_more_data(data: str | bytes) -> bool:
+    if len(data) >= NDJSON_SNIFF_LIMIT:
+        return False
+    head = _as_text(data[:SNIFF_CHARS])
+    i = 0
+    while i < len(head) and head[i] in _LEADING:
+        i += 1
+    if i >= len(head) or head[i] != "{" or _object_end(head, i) >= 0:
+        return False
+    # Sin salto de línea tras el inicio: todavía no se sabe dónde acaba el primer registro
+    newline = data.find(b"\n" if isinstance(data, (bytes, bytearray)) else "\n", i)
+    return newline < 0 or newline == len(data) - 1
+
+
+# ========================== API PUBLICA ==========================
+
+# Detecta el formato mirando solo el inicio del payload (json/geojson/ndjson/xml/csv/unknown).
+# Acepta str o bytes y no recorre ni copia el texto completo.
+def sniff_format(data: str | bytes, *, max_chars: int = SNIFF_CHARS, max_keys: int = SNIFF_MAX_KEYS) -> str:
+    head = data[:max_chars]
+    if isinstance(head, (bytes, bytearray)):
+        head = bytes(head).decode("utf-8", errors="replace")
+
+    i = 0
+    n = len(head)
+    while i < n and head[i] in _LEADING:
+        i += 1
+    if i >= n:
+        return "unknown"
+
+    first = head[i]
+    if first == "{":
+        if _is_ndjson(head, i):
+            return "ndjson"
+        if _object_end(head, i) < 0 and len(data) > len(head) and _is_long_ndjson(data, i):
+            return "ndjson"
+        return "geojson" if _is_feature_collection(head, i, max_keys) else "json"
+    if first == "[":
+        return "json"
+    if first == "<":
+        return "xml"
+
+    # CSV: si la primera línea tiene comas o puntos y coma, lo tratamos como CSV
+    line_end = head.find("\n", i)
+    first_line = head[i:] if line_end < 0 else head[i:line_end]
+    if "," in first_line or ";" in first_line:
+        return "csv"
+    return "unknown"
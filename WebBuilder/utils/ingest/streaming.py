@@ -0,0 +1,218 @@
+from __future__ import annotations  # Usar todo como strings
+from typing import Iterable, Iterator  # Tipado de los chunks de entrada
+import ijson                        # Parser JSON incremental (eventos)
+
+
+# ========================== CONSTANTES ==========================
+
+# Items que se conservan de cada colección "principal" (coincide con MAX_SIZE_SCORE del análisis)
+STREAM_SAMPLE_ITEMS = 500
+# Items que se conservan de listas anidadas dentro de otros items
+NESTED_SAMPLE_ITEMS = 50
+# Máximo de keys que se conservan por objeto (evita dicts gigantes indexados por id)
+MAX_MAP_KEYS = 2000
+# Máximo de keys distintas que se cuentan por colección
+MAX_TRACKED_KEYS = 500
+# Máximo de colecciones candidatas de las que se guardan estadísticas
+MAX_TRACKED_COLLECTIONS = 200
+# Caracteres del inicio del payload que se guardan como texto crudo de referencia
+PREVIEW_CHARS = 20_000
+
+
+# ========================== CONTEO DE BYTES ==========================
+
+# Cuenta los bytes que pasan, corta al superar max_bytes y guarda el inicio del
+# payload como preview. Lo comparten todos los lectores en streaming.
+class ByteCounter:
+
+    def __init__(self, max_bytes: int, preview_chars: int = PREVIEW_CHARS):
+        self.max_bytes = max_bytes
+        self.preview_chars = preview_chars
+        self.bytes = 0
+        self._preview = bytearray()
+
+    def wrap(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            self.bytes += len(chunk)
+            if self.bytes > self.max_bytes:
+                raise ValueError(f"Respuesta demasiado grande. Límite {self.max_bytes} bytes.")
+            if len(self._preview) < self.preview_chars:
+                self._preview.extend(chunk[: self.preview_chars - len(self._preview)])
+            yield chunk
+
+    @property
+    def preview(self) -> str:
+        return self._preview.decode("utf-8", errors="replace")
+
+
+# ========================== ESTADO DEL RECORRIDO ==========================
+
+# Contenedor abierto (map o array) durante el recorrido de eventos
+class _Frame:
+    __slots__ = ("is_array", "path", "index", "limit", "key", "kept_keys", "stats", "item_stats")
+
+    def __init__(self, is_array: bool, path: list | None, limit: int = 0, item_stats: dict | None = None):
+        self.is_array = is_array
+        self.path = path            # None si está dentro de un item de otra lista
+        self.index = 0              # Siguiente índice (solo arrays)
+        self.limit = limit          # Items que se conservan (solo arrays)
+        self.key = None             # Última key leída (solo maps)
+        self.kept_keys = 0          # Keys conservadas (solo maps)
+        self.stats = None           # Estadísticas si el array es una colección candidata
+        self.item_stats = item_stats  # Estadísticas de la colección a la que pertenece este item
+
+
+# Consume eventos de ijson y construye una versión reducida del documento
+class _StreamSampler:
+
+    def __init__(self, sample_items: int, nested_items: int):
+        self.sample_items = sample_items
+        self.nested_items = nested_items
+        self.builder = ijson.ObjectBuilder()
+        self.stack: list[_Frame] = []
+        self.collections: list[dict] = []
+        self.skip_depth: int | None = None   # Profundidad a la que empezó el tramo descartado
+        self.skip_value = False              # Descartar el valor de la key actual
+
+    # Abre un valor nuevo (map, array o escalar) y decide si se conserva
+    def _open_value(self, event: str, value: object) -> None:
+        parent = self.stack[-1] if self.stack else None
+        keep = self.skip_depth is None
+        path: list | None = []
+        item_stats = None
+
+        if parent is None:
+            pass
+        elif parent.is_array:
+            index = parent.index
+            parent.index += 1
+            path = None
+            if parent.stats is not None:
+                parent.stats["count"] += 1
+                if event == "start_map":
+                    parent.stats["dict_count"] += 1
+                    item_stats = parent.stats
+            if keep and index >= parent.limit:
+                keep = False
+        else:
+            path = parent.path + [parent.key] if parent.path is not None else None
+            if self.skip_value:
+                keep = False
+                self.skip_value = False
+
+        if event == "start_map":
+            self.stack.append(_Frame(False, path, item_stats=item_stats))
+        elif event == "start_array":
+            limit = self.sample_items if path is not None else self.nested_items
+            frame = _Frame(True, path, limit=limit)
+            if path is not None and len(self.collections) < MAX_TRACKED_COLLECTIONS:
+                frame.stats = {"path": path, "count": 0, "dict_count": 0, "key_counts": {}}
+                self.collections.append(frame.stats)
+            self.stack.append(frame)
+        elif not keep:
+            # Escalar descartado: no abre contenedor
+            return
+
+        if not keep:
+            if self.skip_depth is None:
+                self.skip_depth = len(self.stack) - 1
+            return
+        self.builder.event(event, value)
+
+    # Procesa un lote de eventos. Dentro de un tramo descartado los escalares
+    # solo actualizan contadores (camino rápido: es la gran mayoría de eventos).
+    def feed(self, events: list) -> None:
+        stack = self.stack
+        for event, value in events:
+            if event == "map_key":
+                frame = stack[-1]
+                frame.key = value
+                if frame.item_stats is not None:
+                    counts = frame.item_stats["key_counts"]
+                    if value in counts:
+                        counts[value] += 1
+                    elif len(counts) < MAX_TRACKED_KEYS:
+                        counts[value] = 1
+                if self.skip_depth is not None:
+                    continue
+                if frame.kept_keys >= MAX_MAP_KEYS:
+                    self.skip_value = True
+                    continue
+                frame.kept_keys += 1
+                self.builder.event(event, value)
+
+            elif event == "end_map" or event == "end_array":
+                stack.pop()
+                if self.skip_depth is not None:
+                    if len(stack) == self.skip_depth:
+                        self.skip_depth = None
+                    continue
+                self.builder.event(event, value)
+
+            elif self.skip_depth is not None and event != "start_map" and event != "start_array":
+                parent = stack[-1]
+                if parent.is_array and parent.stats is not None:
+                    parent.stats["count"] += 1
+
+            else:
+                self._open_value(event, value)
+
+    def result(self) -> tuple[object, list[dict]]:
+        collections = [
+            {"path": c["path"], "count": c["count"], "key_counts": c["key_counts"]}
+            for c in self.collections
+            if c["dict_count"] > 0
+        ]
+        return getattr(self.builder, "value", None), collections
+
+
+# ========================== API PUBLICA ==========================
+
+# Parsea un JSON que llega por chunks sin cargarlo entero en memoria.
+# Devuelve el documento reducido (cada lista recortada a una muestra acotada),
+# las estadísticas de las colecciones candidatas y un preview del texto crudo.
+def stream_json(
+    chunks: Iterable[bytes],
+    *,
+    max_bytes: int,
+    sample_items: int = STREAM_SAMPLE_ITEMS,
+    nested_items: int = NESTED_SAMPLE_ITEMS,
+    preview_chars: int = PREVIEW_CHARS,
+) -> dict:
+    sampler = _StreamSampler(sample_items, nested_items)
+    events = ijson.sendable_list()
+    coro = ijson.basic_parse_coro(events, use_float=True)
+
+    counter = ByteCounter(max_bytes, preview_chars)
+
+    try:
+        for chunk in counter.wrap(chunks):
+            coro.send(chunk)
+            sampler.feed(events)
+            del events[:]
+
+        coro.close()
+        sampler.feed(events)
+    except ijson.JSONError as exc:
+        raise ValueError(f"JSON inválido: {exc}") from exc
+
+    parsed, collections = sampler.result()
+    return {
+        "format": "json",
+        "parsed": parsed,
+        "collections": collections,
+        "bytes": counter.bytes,
+        "preview": counter.preview,
+    }
+
+
+# Devuelve las estadísticas de streaming de la colección con ese path (o None)
+def collection_stats(ingest_meta: dict | None, path: list | None) -> dict | None:
+    if not ingest_meta or path is None:
+        return None
+    for col in ingest_meta.get("collections") or []:
+        if col.get("path") == path:
+            return col
+    return None
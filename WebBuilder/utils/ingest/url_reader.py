@@ -1,12 +1,25 @@
 from __future__ import annotations  # Usar todo como strings
+from itertools import chain         # Reinyectar lo ya leído al pasar a streaming
 from urllib.parse import urlparse   # Descomponer url en partes y sirve para validad
 import requests                     # resquest para hacer peticiones http
 
+from .csv_columns import stream_csv  # CSV completo en columnas tipadas
+from .ndjson import stream_ndjson   # NDJSON línea a línea
+from .http_session import BodyRecorder, conditional_get, get_session, remember_response  # Pool keep-alive + GET condicional
+from .sniffer import SNIFF_CHARS, needs_more_data, sniff_format  # Formato mirando solo el inicio
+from .streaming import stream_json  # Parseo incremental de JSON grandes
+
 
 # ========================== CONSTANTES ==========================
 
 # Límite máximo de bytes permitidos (1MB), para evitar caidas del server
 MAX_BYTES = 1_000_000
+# Formatos por líneas que (con streaming permitido) se procesan siempre en streaming
+_LINE_STREAMERS = {"csv": stream_csv, "ndjson": stream_ndjson}
+# Límite duro en modo streaming (JSON grandes): se procesa por chunks sin guardarlo entero
+MAX_STREAM_BYTES = 500_000_000
+# Tamaño de chunk para descargas y ficheros subidos
+CHUNK_SIZE = 64 * 1024
 # Timeout por defecto en segundos
 DEFAULT_TIMEOUT = 8
 # Cabeceras por defecto para la petición.
@@ -34,38 +47,166 @@ def validate_url(api_url: str) -> None:
     if len(api_url) > 2048:
         raise ValueError("La URL es demasiado larga para ser válida.")
     
+# ========================== LECTURA POR CHUNKS ==========================
+
+# Acumula los chunks hasta max_bytes. Si se supera y se permite streaming con un
+# JSON, sigue en modo incremental con lo ya leído + el resto de chunks.
+# Los CSV y NDJSON (con streaming permitido) se leen siempre enteros por líneas
+# (CSV en columnas tipadas), sin límite de filas ni max_bytes: solo se guarda una muestra.
+# Devuelve (raw_bytes, streamed): solo uno de los dos viene relleno.
+def _read_chunks(
+    chunks,
+    *,
+    max_bytes: int,
+    stream_large: bool,
+    max_stream_bytes: int,
+    too_big_msg: str,
+) -> tuple[bytearray | None, dict | None]:
+    chunk_iter = iter(chunks)
+    raw_bytes = bytearray()
+    sniffed = False
+    for chunk in chunk_iter:
+        if not chunk:
+            continue
+        raw_bytes.extend(chunk)
+        # Un NDJSON con el primer registro muy largo necesita ver el final de esa línea
+        if stream_large and not sniffed and len(raw_bytes) >= SNIFF_CHARS and not needs_more_data(raw_bytes):
+            sniffed = True
+            streamer = _LINE_STREAMERS.get(sniff_format(raw_bytes))
+            if streamer is not None:
+                return None, streamer(chain([bytes(raw_bytes)], chunk_iter), max_bytes=max_stream_bytes)
+        if len(raw_bytes) > max_bytes:
+            if not stream_large:
+                raise ValueError(too_big_msg)
+            # Primer registro más largo que max_bytes: seguir leyendo hasta su fin de línea
+            if needs_more_data(raw_bytes):
+                continue
+            fmt = sniff_format(raw_bytes)
+            head = bytes(raw_bytes)
+            if fmt in _LINE_STREAMERS:
+                return None, _LINE_STREAMERS[fmt](chain([head], chunk_iter), max_bytes=max_stream_bytes)
+            if fmt in ("json", "geojson"):
+                raw_bytes = None
+                return None, stream_json(chain([head], chunk_iter), max_bytes=max_stream_bytes)
+            raise ValueError(too_big_msg)
+
+    # Payload pequeño: CSV y NDJSON también pasan por su lector por líneas
+    if stream_large and not sniffed:
+        streamer = _LINE_STREAMERS.get(sniff_format(raw_bytes))
+        if streamer is not None:
+            return None, streamer([bytes(raw_bytes)], max_bytes=max_stream_bytes)
+    return raw_bytes, None
+
+
 # ========================== LECTURA DE FICHERO ==========================
 
 def read_file(file_obj, *, max_bytes: int = MAX_BYTES) -> tuple[str, str]:
-    raw_bytes = file_obj.read(max_bytes + 1)
-    if len(raw_bytes) > max_bytes:
-        raise ValueError(f"Fichero demasiado grande. Límite {max_bytes} bytes.")
-    
+    raw_text, summary, _ = _read_upload(file_obj, max_bytes=max_bytes, stream_large=False)
+    return raw_text, summary
+
+
+# Como read_file, pero los JSON que superan max_bytes, los CSV y los NDJSON se procesan en streaming.
+# Devuelve (raw_text, summary, streamed); si hubo streaming raw_text es solo el preview.
+def stream_file(
+    file_obj,
+    *,
+    max_bytes: int = MAX_BYTES,
+    max_stream_bytes: int = MAX_STREAM_BYTES,
+) -> tuple[str, str, dict | None]:
+    return _read_upload(file_obj, max_bytes=max_bytes, stream_large=True, max_stream_bytes=max_stream_bytes)
+
+
+def _read_upload(
+    file_obj,
+    *,
+    max_bytes: int,
+    stream_large: bool,
+    max_stream_bytes: int = MAX_STREAM_BYTES,
+) -> tuple[str, str, dict | None]:
+    if hasattr(file_obj, "chunks"):
+        chunks = file_obj.chunks(CHUNK_SIZE)
+    else:
+        chunks = iter(lambda: file_obj.read(CHUNK_SIZE), b"")
+
+    raw_bytes, streamed = _read_chunks(
+        chunks,
+        max_bytes=max_bytes,
+        stream_large=stream_large,
+        max_stream_bytes=max_stream_bytes,
+        too_big_msg=f"Fichero demasiado grande. Límite {max_bytes} bytes.",
+    )
+    if streamed is not None:
+        summary = f"Fichero subido. Streaming: {streamed['bytes']} bytes procesados."
+        return streamed["preview"], summary, streamed
+
     raw_text = raw_bytes.decode("utf-8", errors="replace")
     summary = f"Fichero subido. {len(raw_text)} caracteres. ({len(raw_bytes)} bytes)"
-    return raw_text, summary
+    return raw_text, summary, None
 
 # ========================== DESCARGA + TEXTO CRUDO -> CONTROLADO ==========================
 
 # Validamos la url, decargamos contenido en raw
 def fetch_url(api_url: str, *, timeout: int = DEFAULT_TIMEOUT, max_bytes: int = MAX_BYTES) -> tuple[str, str]:
+    raw_text, summary, _, _ = _download(api_url, timeout=timeout, max_bytes=max_bytes, stream_large=False)
+    return raw_text, summary
+
+
+# Como fetch_url, pero los JSON que superan max_bytes, los CSV y los NDJSON se procesan en streaming
+# (memoria constante). Devuelve (raw_text, summary, streamed, links); si hubo streaming
+# raw_text es solo el preview del inicio del payload. links es la cabecera Link
+# ya parseada por requests ({"next": {"url": ...}, ...}), útil para paginar.
+def stream_url(
+    api_url: str,
+    *,
+    timeout: int = DEFAULT_TIMEOUT,
+    max_bytes: int = MAX_BYTES,
+    max_stream_bytes: int = MAX_STREAM_BYTES,
+) -> tuple[str, str, dict | None, dict]:
+    return _download(
+        api_url,
+        timeout=timeout,
+        max_bytes=max_bytes,
+        stream_large=True,
+        max_stream_bytes=max_stream_bytes,
+    )
+
+
+def _download(
+    api_url: str,
+    *,
+    timeout: int,
+    max_bytes: int,
+    stream_large: bool,
+    max_stream_bytes: int = MAX_STREAM_BYTES,
+    conditional: bool = True,
+) -> tuple[str, str, dict | None, dict]:
     validate_url(api_url)
 
+    # En streaming el tope real es max_stream_bytes
+    hard_limit = max_stream_bytes if stream_large else max_bytes
+
     try:
-        # Ejecuta la petición GET con timeout y max_bytes, vemos tbm el status (2xx,3xx,4xx,5xx).
-        http_response = requests.get(api_url, timeout=timeout, headers=DEFAULT_HEADERS, stream=True)
+        # GET (condicional si ya tenemos ETag/Last-Modified) por la sesión con pool keep-alive.
+        # Vemos tbm el status (2xx,3xx,4xx,5xx).
+        # Sin `conditional` (páginas de un crawl) no se toca la BD: ni validadores ni blob
+        if conditional:
+            http_response, cached = conditional_get(api_url, timeout=timeout, headers=DEFAULT_HEADERS)
+        else:
+            http_response = get_session().get(api_url, timeout=timeout, headers=DEFAULT_HEADERS, stream=True)
+            cached = None
         http_response.raise_for_status()
 
         # Comprobamos que tenemos contenido y contamos cuando para ver si pasa del max
-        content_length = http_response.headers.get("Content-Length")
+        content_length = http_response.headers.get("Content-Length") if cached is None else None
         if content_length is not None:
             try:
                 content_length_int = int(content_length)
             except (TypeError, ValueError):
                 content_length_int = None
 
-            if content_length_int is not None and content_length_int > max_bytes:
-                raise ValueError(f"Respuesta demasiado grande. Límite {max_bytes} bytes.")
+            if content_length_int is not None and content_length_int > hard_limit:
+                http_response.close()
+                raise ValueError(f"Respuesta demasiado grande. Límite {hard_limit} bytes.")
 
     # Capturamos errores tipicos
     except requests.exceptions.Timeout:
@@ -75,24 +216,45 @@ def fetch_url(api_url: str, *, timeout: int = DEFAULT_TIMEOUT, max_bytes: int =
     except requests.exceptions.HTTPError as exc:
         raise ValueError(f"Error HTTP al acceder a la URL: {exc}")
 
+    # 304: el contenido no ha cambiado, se reutiliza el payload guardado
+    if cached is not None:
+        recorder = None
+        chunks = cached["chunks"]
+        encoding = cached.get("encoding") or "utf-8"
+        links = cached.get("links") or {}
+        status = "HTTP 304 (sin cambios)."
+    else:
+        recorder = BodyRecorder() if conditional else None
+        chunks = http_response.iter_content(chunk_size=CHUNK_SIZE)
+        if recorder is not None:
+            chunks = recorder.wrap(chunks)
+        encoding = http_response.encoding or "utf-8"
+        links = http_response.links
+        status = f"HTTP {http_response.status_code}."
+
     try:
-        # Descarga el body en chunks de tamaño (8192)
-        raw_bytes = bytearray()
-        for chunk in http_response.iter_content(chunk_size=8192):
-            if not chunk:
-                continue
-            raw_bytes.extend(chunk)
-            if len(raw_bytes) > max_bytes:
-                raise ValueError(f"Respuesta demasiado grande. Límite {max_bytes} bytes.")
+        # Descarga el body en chunks; si es un JSON grande, un CSV o un NDJSON pasa a streaming
+        raw_bytes, streamed = _read_chunks(
+            chunks,
+            max_bytes=max_bytes,
+            stream_large=stream_large,
+            max_stream_bytes=max_stream_bytes,
+            too_big_msg=f"Respuesta demasiado grande. Límite {max_bytes} bytes.",
+        )
+        if recorder is not None:
+            remember_response(api_url, http_response, recorder)
+
+        if streamed is not None:
+            summary = f"{status} Streaming: {streamed['bytes']} bytes procesados."
+            return streamed["preview"], summary, streamed, links
 
         # Decodifica usando la codificación que requests haya detectado si es posible.
-        encoding = http_response.encoding or "utf-8"
         raw_text = raw_bytes.decode(encoding, errors="replace")
 
-        summary = f"HTTP {http_response.status_code}. {len(raw_text)} caracteres. ({len(raw_bytes)} bytes)"
-        return raw_text, summary
+        summary = f"{status} {len(raw_text)} caracteres. ({len(raw_bytes)} bytes)"
+        return raw_text, summary, None, links
     finally:
-        # Cerramos la conexion
+        # Devolvemos la conexión al pool
         http_response.close()
 
 
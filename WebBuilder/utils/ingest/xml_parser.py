@@ -0,0 +1,109 @@
+from __future__ import annotations                              # Usar todo como strings
+from typing import Iterable                                     # Tipado de los chunks de entrada
+from defusedxml.ElementTree import DefusedXMLParser, ParseError  # Parser expat con protecciones de seguridad
+
+
+# ========================== CONSTANTES ==========================
+
+# Caracteres que se pasan al parser en cada feed (no se copia el texto entero)
+FEED_CHARS = 64 * 1024
+# Prefijos/keys con el mismo formato que xmltodict (compatibilidad con lo ya guardado)
+ATTR_PREFIX = "@"
+CDATA_KEY = "#text"
+
+
+# ========================== CONSTRUCTOR DEL DICT ==========================
+
+# Target del parser: recibe start/end/data y construye el dict en la misma pasada
+# (sin árbol ElementTree intermedio). Produce la misma estructura que xmltodict.parse:
+#   - atributos como "@attr", texto mixto como "#text"
+#   - hijos repetidos → lista, elementos vacíos → None
+#   - nombres con el prefijo original ("media:content"), no "{uri}content"
+class _DictBuilder:
+
+    def __init__(self):
+        self.stack: list[tuple[dict | None, list[str]]] = []
+        self.item: dict | None = None
+        self.text_parts: list[str] = []
+        self.prefixes: dict[str, str] = {}     # uri → prefijo
+        self.pending_ns: list[tuple[str, str]] = []
+
+    def _qname(self, name: str) -> str:
+        if name[:1] != "{":
+            return name
+        uri, local = name[1:].split("}", 1)
+        prefix = self.prefixes.get(uri, "")
+        return f"{prefix}:{local}" if prefix else local
+
+    @staticmethod
+    def _push(item: dict | None, key: str, value: object) -> dict:
+        if item is None:
+            item = {}
+        if key in item:
+            current = item[key]
+            if isinstance(current, list):
+                current.append(value)
+            else:
+                item[key] = [current, value]
+        else:
+            item[key] = value
+        return item
+
+    def start_ns(self, prefix: str, uri: str) -> None:
+        self.prefixes[uri] = prefix
+        self.pending_ns.append((prefix, uri))
+
+    def start(self, tag: str, attrib: dict) -> None:
+        attrs: dict = {}
+        # Las declaraciones xmlns aparecen como atributos (igual que xmltodict)
+        for prefix, uri in self.pending_ns:
+            attrs[f"{ATTR_PREFIX}xmlns:{prefix}" if prefix else f"{ATTR_PREFIX}xmlns"] = uri
+        self.pending_ns = []
+        for name, value in attrib.items():
+            attrs[ATTR_PREFIX + self._qname(name)] = value
+
+        self.stack.append((self.item, self.text_parts))
+        self.item = attrs or None
+        self.text_parts = []
+
+    def data(self, text: str) -> None:
+        self.text_parts.append(text)
+
+    def end(self, tag: str) -> None:
+        name = self._qname(tag)
+        text = "".join(self.text_parts).strip() or None
+        item = self.item
+        self.item, self.text_parts = self.stack.pop()
+
+        if item is not None:
+            if text:
+                self._push(item, CDATA_KEY, text)
+            self.item = self._push(self.item, name, item)
+        else:
+            self.item = self._push(self.item, name, text)
+
+    def close(self) -> dict | None:
+        return self.item
+
+
+# ========================== API PUBLICA ==========================
+
+# Parsea XML por chunks en una sola pasada segura (DTD permitido, entidades y
+# referencias externas prohibidas, igual que DefusedET.fromstring por defecto).
+def parse_xml_chunks(chunks: Iterable[str | bytes], *, encoding: str | None = "utf-8") -> dict:
+    parser = DefusedXMLParser(target=_DictBuilder(), encoding=encoding)
+    try:
+        for chunk in chunks:
+            if chunk:
+                parser.feed(chunk)
+        result = parser.close()
+    except ParseError as exc:
+        raise ValueError(f"XML inválido: {exc}") from exc
+    return result or {}
+
+
+# Parsea un texto XML completo sin copiarlo: lo va pasando al parser por tramos
+def parse_xml(raw_text: str) -> dict:
+    return parse_xml_chunks(
+        raw_text[i: i + FEED_CHARS] for i in range(0, len(raw_text), FEED_CHARS)
+    )
@@ -1,40 +1,125 @@
+import asyncio
+import inspect
 import json
+import threading
+import weakref
+from typing import AsyncIterator, Awaitable, Callable, Iterator
+
 import requests
+from requests.adapters import HTTPAdapter
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
+from . import rate_limit, response_cache
+
 
 class LLMError(Exception):
-    pass
+    def __init__(self, message: str = "", *, status_code: int | None = None, retry_after: float | None = None):
+        super().__init__(message)
+        self.status_code = status_code      # HTTP del proveedor, si lo hubo
+        self.retry_after = retry_after      # Segundos de Retry-After en un 429
 
 
-def chat_completion(
-    user_text: str,
-    system_text: str | None = None,
-    *,
-    temperature: float = 0.2,
-    model: str | None = None,
-    base_url: str | None = None,
-    api_key: str | None = None,
-) -> str:
+class LLMAborted(LLMError):
+    """La llamada se cortó a mitad porque el validador rechazó lo recibido."""
+
+
+# Conexiones keep-alive por proveedor: cubre los hilos de generación de un
+# worker (GENERATION_WORKER_THREADS × GENERATION_PAGE_CONCURRENCY) sin descartar
+POOL_MAXSIZE = 16
+# Hosts distintos por sesión (normalmente solo el del proveedor)
+POOL_CONNECTIONS = 2
+REQUEST_TIMEOUT = 90
+# Conexiones simultáneas por proveedor en el cliente async (un loop, muchas generaciones)
+ASYNC_MAX_CONNECTIONS = 64
+
+_sessions: dict[str, requests.Session] = {}
+_calls: dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _get_session(base_url: str) -> requests.Session:
     """
-    Minimal OpenAI-compatible client for OpenRouter.
-    Returns assistant text.
+    Sesión del proceso para un proveedor (clave: base_url). Se comparte entre
+    hilos y mantiene abiertas las conexiones TLS entre llamadas.
+    """
+    session = _sessions.get(base_url)
+    if session is None:
+        with _lock:
+            session = _sessions.get(base_url)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({
+                    "HTTP-Referer": "http://localhost:8000",
+                    "X-Title": "WebBuilder",
+                })
+                _sessions[base_url] = session
+                _calls[base_url] = 0
+    with _lock:
+        _calls[base_url] += 1
+    return session
+
+
+def connection_stats() -> dict[str, dict]:
     """
+    Reutilización de conexiones por proveedor en este proceso:
+    {base_url: {"requests", "connections", "reused"}}. `connections` son las
+    conexiones TCP/TLS abiertas (con handshake); el resto reutilizó una viva.
+    """
+    stats = {}
+    with _lock:
+        sessions = list(_sessions.items())
+        calls = dict(_calls)
+    for base_url, session in sessions:
+        opened = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                opened += getattr(pool, "num_connections", 0) if pool is not None else 0
+        requests_made = calls.get(base_url, 0)
+        stats[base_url] = {
+            "requests": requests_made,
+            "connections": opened,
+            "reused": max(0, requests_made - opened),
+        }
+    return stats
+
+
+def format_connection_stats() -> str:
+    """'https://openrouter.ai/api/v1: 12 peticiones, 2 conexiones (10 reutilizadas)'"""
+    parts = [
+        f"{base_url}: {s['requests']} peticiones, {s['connections']} conexiones ({s['reused']} reutilizadas)"
+        for base_url, s in connection_stats().items()
+    ]
+    return "; ".join(parts) or "sin peticiones"
+
+
+def _prepare(
+    user_text: str,
+    system_text: str | None,
+    *,
+    temperature: float,
+    model: str | None,
+    base_url: str | None,
+    api_key: str | None,
+    stream: bool,
+) -> tuple[str, str, dict, dict]:
+    """(base_url, url, headers, payload) de la petición. Lanza LLMError si falta la API key."""
     _effective_api_key = api_key or settings.LLM_API_KEY
     if not _effective_api_key:
         raise LLMError("LLM_API_KEY está vacío. Revisa .env y load_dotenv().")
 
-    _base_url = base_url or settings.LLM_BASE_URL
+    _base_url = (base_url or settings.LLM_BASE_URL).rstrip("/")
     _model = model or settings.LLM_MODEL
 
-    url = f"{_base_url.rstrip('/')}/chat/completions"
+    url = f"{_base_url}/chat/completions"
 
-    headers = {
-        "Authorization": f"Bearer {_effective_api_key}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "http://localhost:8000",
-        "X-Title": "WebBuilder",
-    }
+    # La API key puede ser la del usuario: va por petición, no en la sesión compartida
+    headers = {"Authorization": f"Bearer {_effective_api_key}"}
 
     messages = []
     if system_text:
@@ -46,21 +131,372 @@ def chat_completion(
         "messages": messages,
         "temperature": temperature,
     }
+    if stream:
+        payload["stream"] = True
+    return _base_url, url, headers, payload
+
+
+def _http_error(status_code: int, body: str, retry_after: str | None = None) -> LLMError:
+    try:
+        err = json.loads(body)
+    except ValueError:
+        err = body
+    return LLMError(
+        f"LLM HTTP {status_code}: {err}",
+        status_code=status_code,
+        retry_after=rate_limit.parse_retry_after(retry_after) if status_code == 429 else None,
+    )
+
 
+def _message_content(data: dict) -> str:
     try:
-        resp = requests.post(url, headers=headers, data=json.dumps(payload), timeout=90)
+        return data["choices"][0]["message"]["content"]
+    except Exception as e:
+        raise LLMError(f"Respuesta inesperada del LLM: {data}") from e
+
+
+# Marca de fin del streaming ("data: [DONE]")
+_DONE = object()
+
+
+def _sse_piece(line: str):
+    """
+    Texto de una línea SSE, None si no trae texto o _DONE al final.
+    Las líneas vacías separan eventos; las que empiezan por ":" son keep-alive.
+    """
+    if not line or not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return _DONE
+    try:
+        event = json.loads(data)
+    except ValueError as e:
+        raise LLMError(f"Evento SSE inválido del LLM: {data[:200]}") from e
+    if event.get("error"):
+        raise LLMError(f"LLM error en streaming: {event['error']}")
+    try:
+        return (event["choices"][0].get("delta") or {}).get("content") or None
+    except (KeyError, IndexError, AttributeError):
+        return None
+
+
+def _request(user_text: str, system_text: str | None, *, stream: bool, **options) -> tuple[requests.Response, str]:
+    """
+    POST a /chat/completions con la sesión del proveedor, tras esperar turno
+    en el límite compartido (rate_limit). Devuelve (respuesta, clave del
+    bucket). Lanza LLMError si falla; un 429 pausa el bucket (Retry-After).
+    """
+    _base_url, url, headers, payload = _prepare(user_text, system_text, stream=stream, **options)
+    key = rate_limit.bucket_key(_base_url, payload["model"])
+    rate_limit.acquire(key, rate_limit.estimate_tokens(system_text, user_text))
+    try:
+        resp = _get_session(_base_url).post(
+            url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT, stream=stream,
+        )
     except requests.RequestException as e:
         raise LLMError(f"Error de red llamando al LLM: {e}") from e
 
     if resp.status_code >= 400:
+        body = resp.text
+        resp.close()
+        error = _http_error(resp.status_code, body, resp.headers.get("Retry-After"))
+        if resp.status_code == 429:
+            rate_limit.penalize(key, error.retry_after)
+        raise error
+    return resp, key
+
+
+def stream_chat_completion(
+    user_text: str,
+    system_text: str | None = None,
+    *,
+    temperature: float = 0.2,
+    model: str | None = None,
+    base_url: str | None = None,
+    api_key: str | None = None,
+) -> Iterator[str]:
+    """
+    Igual que chat_completion pero con `stream: true`: va devolviendo los
+    trozos de texto según llegan (server-sent events). Si se deja de iterar
+    (o se cierra el generador) la conexión se corta y el proveedor deja de generar.
+    """
+    resp, key = _request(
+        user_text, system_text, temperature=temperature, model=model,
+        base_url=base_url, api_key=api_key, stream=True,
+    )
+    received = 0
+    try:
+        resp.encoding = "utf-8"
+        for line in resp.iter_lines(decode_unicode=True):
+            piece = _sse_piece(line)
+            if piece is _DONE:
+                return
+            if piece:
+                received += len(piece)
+                yield piece
+    except requests.RequestException as e:
+        raise LLMError(f"Error de red leyendo el streaming del LLM: {e}") from e
+    finally:
+        resp.close()
+        rate_limit.charge(key, received // rate_limit.CHARS_PER_TOKEN)
+
+
+def chat_completion(
+    user_text: str,
+    system_text: str | None = None,
+    *,
+    temperature: float = 0.2,
+    model: str | None = None,
+    base_url: str | None = None,
+    api_key: str | None = None,
+    stream: bool = False,
+    on_progress: Callable[[str, int], None] | None = None,
+    validate: Callable[[str], str | None] | None = None,
+    cache: bool = False,
+) -> str:
+    """
+    Minimal OpenAI-compatible client for OpenRouter.
+    Returns assistant text.
+
+    Con stream=True la respuesta se recibe por trozos: `on_progress(texto, trozos)`
+    se llama con lo acumulado tras cada trozo y `validate(texto)` puede devolver
+    un motivo para cortar la llamada (LLMAborted) sin esperar al final.
+
+    Con cache=True y temperatura 0 la respuesta se guarda en la cache de
+    respuestas (response_cache) y las llamadas idénticas no salen a la red.
+    """
+    response_key = None
+    if cache and response_cache.enabled(temperature):
+        response_key = response_cache.cache_key(
+            user_text, system_text, temperature=temperature, model=model, base_url=base_url,
+        )
+        cached = response_cache.lookup(response_key)
+        if cached is not None:
+            return cached
+    text = _chat_completion(
+        user_text, system_text, temperature=temperature, model=model, base_url=base_url,
+        api_key=api_key, stream=stream, on_progress=on_progress, validate=validate,
+    )
+    if response_key is not None:
+        response_cache.store(response_key, text, model=model)
+    return text
+
+
+def _chat_completion(
+    user_text: str,
+    system_text: str | None,
+    *,
+    temperature: float,
+    model: str | None,
+    base_url: str | None,
+    api_key: str | None,
+    stream: bool,
+    on_progress: Callable[[str, int], None] | None,
+    validate: Callable[[str], str | None] | None,
+) -> str:
+    if stream:
+        text = ""
+        pieces = 0
+        chunks = stream_chat_completion(
+            user_text, system_text, temperature=temperature, model=model,
+            base_url=base_url, api_key=api_key,
+        )
         try:
-            err = resp.json()
-        except Exception:
-            err = resp.text
-        raise LLMError(f"LLM HTTP {resp.status_code}: {err}")
+            for piece in chunks:
+                text += piece
+                pieces += 1
+                if validate is not None:
+                    reason = validate(text)
+                    if reason:
+                        raise LLMAborted(f"Respuesta cortada tras {pieces} trozos: {reason}")
+                if on_progress is not None:
+                    on_progress(text, pieces)
+        finally:
+            chunks.close()
+        if validate is not None and not text.strip():
+            raise LLMAborted("Respuesta vacía")
+        return text
+
+    resp, key = _request(
+        user_text, system_text, temperature=temperature, model=model,
+        base_url=base_url, api_key=api_key, stream=False,
+    )
+    text = _message_content(resp.json())
+    rate_limit.charge(key, rate_limit.estimate_tokens(text))
+    return text
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CLIENTE ASÍNCRONO (asyncio + httpx)
+# Mismo contrato y mismos LLMError que chat_completion, pero sin un hilo por
+# llamada: un solo event loop puede llevar decenas de llamadas a la vez.
+# ──────────────────────────────────────────────────────────────────────────────
+
+# Clientes httpx por event loop y proveedor (un AsyncClient no se comparte entre loops)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def _get_async_client(base_url: str):
+    """AsyncClient del loop actual para un proveedor, con conexiones keep-alive."""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(base_url)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=REQUEST_TIMEOUT,
+                limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS, max_keepalive_connections=POOL_MAXSIZE),
+                headers={"HTTP-Referer": "http://localhost:8000", "X-Title": "WebBuilder"},
+            )
+            clients[base_url] = client
+    return client
 
-    data = resp.json()
+
+async def aclose_async_clients() -> None:
+    """Cierra los clientes httpx del loop actual (al terminar el loop del worker)."""
+    with _lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+async def _aerror(key: str, resp, body: str) -> LLMError:
+    """LLMError de una respuesta httpx con error; un 429 pausa el bucket."""
+    error = _http_error(resp.status_code, body, resp.headers.get("Retry-After"))
+    if resp.status_code == 429:
+        await sync_to_async(rate_limit.penalize)(key, error.retry_after)
+    return error
+
+
+async def astream_chat_completion(
+    user_text: str,
+    system_text: str | None = None,
+    *,
+    temperature: float = 0.2,
+    model: str | None = None,
+    base_url: str | None = None,
+    api_key: str | None = None,
+) -> AsyncIterator[str]:
+    """Versión async de stream_chat_completion."""
+    import httpx
+
+    _base_url, url, headers, payload = _prepare(
+        user_text, system_text, temperature=temperature, model=model,
+        base_url=base_url, api_key=api_key, stream=True,
+    )
+    key = rate_limit.bucket_key(_base_url, payload["model"])
+    await rate_limit.aacquire(key, rate_limit.estimate_tokens(system_text, user_text))
+    received = 0
     try:
-        return data["choices"][0]["message"]["content"]
-    except Exception as e:
-        raise LLMError(f"Respuesta inesperada del LLM: {data}") from e
\ No newline at end of file
+        async with _get_async_client(_base_url).stream("POST", url, headers=headers, json=payload) as resp:
+            if resp.status_code >= 400:
+                body = (await resp.aread()).decode("utf-8", errors="replace")
+                raise await _aerror(key, resp, body)
+            async for line in resp.aiter_lines():
+                piece = _sse_piece(line)
+                if piece is _DONE:
+                    return
+                if piece:
+                    received += len(piece)
+                    yield piece
+    except httpx.HTTPError as e:
+        raise LLMError(f"Error de red llamando al LLM: {e}") from e
+    finally:
+        await sync_to_async(rate_limit.charge)(key, received // rate_limit.CHARS_PER_TOKEN)
+
+
+async def achat_completion(
+    user_text: str,
+    system_text: str | None = None,
+    *,
+    temperature: float = 0.2,
+    model: str | None = None,
+    base_url: str | None = None,
+    api_key: str | None = None,
+    stream: bool = False,
+    on_progress: Callable[[str, int], Awaitable[None] | None] | None = None,
+    validate: Callable[[str], str | None] | None = None,
+    cache: bool = False,
+) -> str:
+    """
+    Versión async de chat_completion (mismos argumentos y errores).
+    `on_progress` puede ser una función normal o una corrutina.
+    """
+    response_key = None
+    if cache and response_cache.enabled(temperature):
+        response_key = response_cache.cache_key(
+            user_text, system_text, temperature=temperature, model=model, base_url=base_url,
+        )
+        cached = await sync_to_async(response_cache.lookup)(response_key)
+        if cached is not None:
+            return cached
+    text = await _achat_completion(
+        user_text, system_text, temperature=temperature, model=model, base_url=base_url,
+        api_key=api_key, stream=stream, on_progress=on_progress, validate=validate,
+    )
+    if response_key is not None:
+        await sync_to_async(response_cache.store)(response_key, text, model=model)
+    return text
+
+
+async def _achat_completion(
+    user_text: str,
+    system_text: str | None,
+    *,
+    temperature: float,
+    model: str | None,
+    base_url: str | None,
+    api_key: str | None,
+    stream: bool,
+    on_progress: Callable[[str, int], Awaitable[None] | None] | None,
+    validate: Callable[[str], str | None] | None,
+) -> str:
+    import httpx
+
+    if stream:
+        text = ""
+        pieces = 0
+        chunks = astream_chat_completion(
+            user_text, system_text, temperature=temperature, model=model,
+            base_url=base_url, api_key=api_key,
+        )
+        try:
+            async for piece in chunks:
+                text += piece
+                pieces += 1
+                if validate is not None:
+                    reason = validate(text)
+                    if reason:
+                        raise LLMAborted(f"Respuesta cortada tras {pieces} trozos: {reason}")
+                if on_progress is not None:
+                    result = on_progress(text, pieces)
+                    if inspect.isawaitable(result):
+                        await result
+        finally:
+            await chunks.aclose()
+        if validate is not None and not text.strip():
+            raise LLMAborted("Respuesta vacía")
+        return text
+
+    _base_url, url, headers, payload = _prepare(
+        user_text, system_text, temperature=temperature, model=model,
+        base_url=base_url, api_key=api_key, stream=False,
+    )
+    key = rate_limit.bucket_key(_base_url, payload["model"])
+    await rate_limit.aacquire(key, rate_limit.estimate_tokens(system_text, user_text))
+    try:
+        resp = await _get_async_client(_base_url).post(url, headers=headers, json=payload)
+    except httpx.HTTPError as e:
+        raise LLMError(f"Error de red llamando al LLM: {e}") from e
+    if resp.status_code >= 400:
+        raise await _aerror(key, resp, resp.text)
+    try:
+        data = resp.json()
+    except ValueError as e:
+        raise LLMError(f"Respuesta inesperada del LLM: {resp.text[:500]}") from e
+    text = _message_content(data)
+    await sync_to_async(rate_limit.charge)(key, rate_limit.estimate_tokens(text))
+    return text
@@ -23,6 +23,7 @@ from __future__ import annotations
 import re
 from typing import Any
 
+from . import response_cache
 from .client import chat_completion, LLMError
 from .llm_utils import safe_dumps, parse_llm_json
 
@@ -263,6 +264,7 @@ def generate_site_plan(
                 model=model,
                 base_url=base_url,
                 api_key=api_key,
+                cache=True,
             )
         except LLMError:
             return _validate_and_normalize_schema({}, available_keys=available_keys)
@@ -272,6 +274,10 @@ def generate_site_plan(
             return _validate_and_normalize_schema(parsed, available_keys=available_keys)
 
         except Exception as exc:
+            # Respuesta inservible: fuera de la cache para no repetirla
+            response_cache.forget(response_cache.cache_key(
+                user_text, system_text, temperature=0.0, model=model, base_url=base_url,
+            ))
             last_error = f"{type(exc).__name__}: {exc}. Respuesta cruda: {raw[:600]}"
             if attempt >= retries:
                 return _validate_and_normalize_schema({}, available_keys=available_keys)
@@ -0,0 +1,299 @@
+"""
+rate_limit.py — Límite de peticiones al LLM compartido entre workers.
+
+Un token bucket por proveedor/modelo guardado en la BD (LLMRateBucket), así
+que todos los procesos (gunicorn y generation_worker) y todos sus hilos
+reparten el mismo presupuesto:
+
+  - LLM_RATE_LIMIT_RPM: peticiones por minuto (0 = sin límite).
+  - LLM_RATE_LIMIT_TPM: tokens por minuto (0 = sin límite). Se cobra una
+    estimación del prompt al entrar y la respuesta al terminar; el saldo
+    puede quedar en negativo y las siguientes llamadas esperan a cubrirlo.
+  - Retry-After: un 429 del proveedor bloquea el bucket hasta esa hora.
+
+Las llamadas que tienen que esperar se encolan (LLMRateTicket) y el turno se
+reparte por rondas entre usuarios (ver llm_user). En Postgres el bucket se
+bloquea con SELECT ... FOR UPDATE. SQLite solo admite un escritor: si otro
+hilo tiene la base bloqueada ("database is locked") la llamada lo trata como
+"aún no es su turno" y vuelve a intentarlo.
+
+Con los dos límites a 0 no se escribe nada: solo se respeta el Retry-After de
+un 429 reciente (una lectura, sin bloqueo).
+
+  - acquire / aacquire: espera turno y consume una petición.
+  - charge: cobra los tokens de la respuesta.
+  - penalize: aplica el Retry-After de un 429.
+  - llm_user: usuario al que se atribuyen las llamadas (cola justa).
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Ráfaga máxima: lo que se rellena en estos segundos (por debajo del límite por minuto)
+BURST_SECONDS = 10
+# Espera máxima entre dos sondeos del turno
+POLL_SECONDS = 0.5
+# Turnos sin sondear en este tiempo son de un proceso muerto: se descartan
+STALE_TICKET_SECONDS = 30
+# Espera tras un 429 sin cabecera Retry-After
+DEFAULT_RETRY_AFTER = 10
+# Caracteres por token (estimación; el proveedor no la da hasta el final)
+CHARS_PER_TOKEN = 4
+
+_current_user: contextvars.ContextVar[str] = contextvars.ContextVar("llm_user", default="")
+
+
+@contextlib.contextmanager
+def llm_user(user_id):
+    """Atribuye a `user_id` las llamadas al LLM hechas dentro del bloque."""
+    token = _current_user.set(str(user_id or ""))
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+
+def bucket_key(base_url: str, model: str) -> str:
+    return f"{base_url}|{model}"[:255]
+
+
+def estimate_tokens(*texts: str | None) -> int:
+    return sum(len(t or "") for t in texts) // CHARS_PER_TOKEN
+
+
+def _limits() -> tuple[int, int]:
+    return (
+        max(0, getattr(settings, "LLM_RATE_LIMIT_RPM", 0)),
+        max(0, getattr(settings, "LLM_RATE_LIMIT_TPM", 0)),
+    )
+
+
+def _is_locked_error(exc: OperationalError) -> bool:
+    """El error es SQLite con la base bloqueada por otro escritor (reintentable)."""
+    return connection.vendor == "sqlite" and "locked" in str(exc)
+
+
+def _blocked_wait(key: str) -> float:
+    """Sin límites: segundos que quedan del Retry-After de un 429 (lectura sin bloqueo)."""
+    from ...models import LLMRateBucket
+
+    until = (
+        LLMRateBucket.objects
+        .filter(key=key, blocked_until__gt=timezone.now())
+        .values_list("blocked_until", flat=True)
+        .first()
+    )
+    return (until - timezone.now()).total_seconds() if until else 0.0
+
+
+def _locked_bucket(key: str):
+    """Bucket de `key` bloqueado hasta el final de la transacción (lo crea lleno)."""
+    from ...models import LLMRateBucket
+
+    bucket = LLMRateBucket.objects.select_for_update().filter(key=key).first()
+    if bucket is not None:
+        return bucket
+    rpm, tpm = _limits()
+    try:
+        with transaction.atomic():
+            LLMRateBucket.objects.create(
+                key=key,
+                requests=rpm * BURST_SECONDS / 60,
+                tokens=tpm * BURST_SECONDS / 60,
+                updated_at=timezone.now(),
+            )
+    except IntegrityError:
+        pass   # Lo ha creado otro worker a la vez
+    return LLMRateBucket.objects.select_for_update().get(key=key)
+
+
+def _refill(bucket, now) -> float:
+    """Rellena el bucket por el tiempo transcurrido y devuelve los segundos hasta poder entrar."""
+    rpm, tpm = _limits()
+    elapsed = max(0.0, (now - bucket.updated_at).total_seconds())
+    bucket.updated_at = now
+    wait = 0.0
+    if rpm:
+        bucket.requests = min(max(1.0, rpm * BURST_SECONDS / 60), bucket.requests + elapsed * rpm / 60)
+        if bucket.requests < 1:
+            wait = max(wait, (1 - bucket.requests) * 60 / rpm)
+    if tpm:
+        bucket.tokens = min(tpm * BURST_SECONDS / 60, bucket.tokens + elapsed * tpm / 60)
+        if bucket.tokens <= 0:
+            wait = max(wait, (1 - bucket.tokens) * 60 / tpm)
+    if bucket.blocked_until and bucket.blocked_until > now:
+        wait = max(wait, (bucket.blocked_until - now).total_seconds())
+    return wait
+
+
+def _try_acquire(key: str, user_key: str, tokens: int, ticket_id: int | None) -> tuple[bool, float, int | None]:
+    """
+    Un intento: si es el turno de esta llamada y el bucket tiene saldo, lo
+    consume. Devuelve (concedido, segundos a esperar, id del turno en cola).
+    """
+    from ...models import LLMRateTicket
+
+    rpm, tpm = _limits()
+    with transaction.atomic():
+        bucket = _locked_bucket(key)
+        now = timezone.now()
+        wait = _refill(bucket, now)
+
+        queue = LLMRateTicket.objects.filter(bucket_key=key)
+        queue.filter(seen_at__lt=now - timedelta(seconds=STALE_TICKET_SECONDS)).delete()
+        head = queue.order_by("round", "id").values_list("id", flat=True).first()
+        my_turn = head == ticket_id if ticket_id is not None else head is None
+
+        if my_turn and wait <= 0:
+            if rpm:
+                bucket.requests -= 1
+            if tpm:
+                bucket.tokens -= tokens
+            bucket.save(update_fields=["requests", "tokens", "updated_at"])
+            if ticket_id is not None:
+                LLMRateTicket.objects.filter(pk=ticket_id).delete()
+            return True, 0.0, None
+
+        bucket.save(update_fields=["requests", "tokens", "updated_at"])
+        # Sin turno o con un turno que otro proceso borró por viejo (p. ej. este
+        # hilo tardó en volver a sondear): se pide turno de nuevo, si no esperaría siempre
+        if ticket_id is None or not LLMRateTicket.objects.filter(pk=ticket_id).update(seen_at=now):
+            ticket_id = LLMRateTicket.objects.create(
+                bucket_key=key,
+                user_key=user_key,
+                round=queue.filter(user_key=user_key).count(),
+                seen_at=now,
+            ).pk
+    # Si no es su turno, vuelve a mirar pronto: el de delante puede entrar ya
+    return False, min(wait if my_turn else POLL_SECONDS, POLL_SECONDS), ticket_id
+
+
+def _drop_ticket(ticket_id: int | None) -> None:
+    if ticket_id is not None:
+        from ...models import LLMRateTicket
+        LLMRateTicket.objects.filter(pk=ticket_id).delete()
+
+
+def acquire(key: str, tokens: int = 0) -> float:
+    """
+    Espera turno en el bucket `key` y consume una petición y `tokens`.
+    Devuelve los segundos esperados.
+    """
+    start = time.monotonic()
+    user_key = _current_user.get()
+    ticket_id = None
+    if _limits() == (0, 0):
+        wait = _blocked_wait(key)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    try:
+        while True:
+            try:
+                granted, wait, ticket_id = _try_acquire(key, user_key, tokens, ticket_id)
+            except OperationalError as exc:
+                if not _is_locked_error(exc):
+                    raise
+                granted, wait = False, POLL_SECONDS
+            if granted:
+                break
+            time.sleep(max(0.05, wait))
+    except BaseException:
+        _drop_ticket(ticket_id)
+        raise
+    waited = time.monotonic() - start
+    if waited >= 1:
+        logger.info("[llm] %.1fs esperando turno en %s (usuario %s)", waited, key, user_key or "-")
+    return waited
+
+
+async def aacquire(key: str, tokens: int = 0) -> float:
+    """Versión async de acquire (el event loop no se bloquea mientras espera)."""
+    start = time.monotonic()
+    user_key = _current_user.get()
+    ticket_id = None
+    if _limits() == (0, 0):
+        wait = await sync_to_async(_blocked_wait)(key)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+    try:
+        while True:
+            try:
+                granted, wait, ticket_id = await sync_to_async(_try_acquire)(key, user_key, tokens, ticket_id)
+            except OperationalError as exc:
+                if not _is_locked_error(exc):
+                    raise
+                granted, wait = False, POLL_SECONDS
+            if granted:
+                break
+            await asyncio.sleep(max(0.05, wait))
+    except BaseException:
+        await sync_to_async(_drop_ticket)(ticket_id)
+        raise
+    waited = time.monotonic() - start
+    if waited >= 1:
+        logger.info("[llm] %.1fs esperando turno en %s (usuario %s)", waited, key, user_key or "-")
+    return waited
+
+
+def charge(key: str, tokens: int) -> None:
+    """Cobra tokens ya consumidos (la respuesta) al bucket `key`."""
+    _, tpm = _limits()
+    if not tpm or tokens <= 0:
+        return
+    try:
+        with transaction.atomic():
+            bucket = _locked_bucket(key)
+            _refill(bucket, timezone.now())
+            bucket.tokens -= tokens
+            bucket.save(update_fields=["requests", "tokens", "updated_at"])
+    except OperationalError as exc:
+        if not _is_locked_error(exc):
+            raise
+        # Perder un cobro es mejor que romper la llamada que ya terminó
+        logger.warning("[llm] No se pudieron cobrar %s tokens en %s (base bloqueada)", tokens, key)
+
+
+def penalize(key: str, retry_after: float | None) -> None:
+    """El proveedor devolvió 429: nadie entra en `key` hasta que pase Retry-After."""
+    seconds = retry_after if retry_after and retry_after > 0 else DEFAULT_RETRY_AFTER
+    until = timezone.now() + timedelta(seconds=seconds)
+    try:
+        with transaction.atomic():
+            bucket = _locked_bucket(key)
+            if bucket.blocked_until is None or bucket.blocked_until < until:
+                bucket.blocked_until = until
+                bucket.save(update_fields=["blocked_until"])
+    except OperationalError as exc:
+        if not _is_locked_error(exc):
+            raise
+        logger.warning("[llm] No se pudo guardar la pausa de %s (base bloqueada)", key)
+    logger.warning("[llm] 429 en %s: en pausa %.0fs", key, seconds)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Cabecera Retry-After en segundos (acepta segundos o fecha HTTP)."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return (parsedate_to_datetime(value) - timezone.now()).total_seconds()
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,183 @@
+"""
+response_cache.py — Cache de respuestas deterministas del LLM.
+
+Las llamadas con temperatura 0 (traducción del prompt, estructura de páginas,
+design system y plan del asistente) devuelven siempre lo mismo para la misma
+entrada, así que su respuesta se guarda en la BD (LLMResponse) y la comparten
+todos los workers:
+
+  - La clave es el hash de (modelo, endpoint, system, user, temperatura).
+  - LLM_RESPONSE_CACHE_TTL: vida de cada respuesta en segundos.
+  - LLM_RESPONSE_CACHE_MAX_ENTRIES / LLM_RESPONSE_CACHE_MAX_MB: al guardar se
+    expulsan las caducadas y, si se pasa del límite, las menos usadas (LRU).
+
+chat_completion(..., cache=True) la usa de forma transparente; forget() borra
+una respuesta que resultó inservible (JSON roto) para que no se repita.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Contadores de este proceso (los aciertos acumulados de todos están en la BD)
+_stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += n
+
+
+def enabled(temperature: float) -> bool:
+    """Solo se cachean las llamadas deterministas (temperatura 0)."""
+    return getattr(settings, "LLM_RESPONSE_CACHE", True) and temperature == 0
+
+
+def cache_key(
+    user_text: str,
+    system_text: str | None,
+    *,
+    temperature: float,
+    model: str | None = None,
+    base_url: str | None = None,
+) -> str:
+    payload = json.dumps(
+        [
+            model or settings.LLM_MODEL,
+            (base_url or settings.LLM_BASE_URL).rstrip("/"),
+            system_text or "",
+            user_text,
+            temperature,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _expired_before():
+    return timezone.now() - timedelta(seconds=getattr(settings, "LLM_RESPONSE_CACHE_TTL", 7 * 24 * 3600))
+
+
+def lookup(key: str) -> str | None:
+    """Respuesta guardada para `key` (None si no hay o ha caducado)."""
+    from ...models import LLMResponse
+
+    try:
+        entry = (
+            LLMResponse.objects
+            .filter(pk=key, created_at__gte=_expired_before())
+            .only("response")
+            .first()
+        )
+        if entry is not None:
+            LLMResponse.objects.filter(pk=key).update(hits=F("hits") + 1, last_used_at=timezone.now())
+    except DatabaseError:
+        logger.warning("[llm] Cache de respuestas no disponible (lectura)")
+        return None
+    if entry is None:
+        _count("misses")
+        return None
+    _count("hits")
+    logger.info("[llm] Respuesta reutilizada de la cache (%s)", key[:12])
+    return entry.response
+
+
+def store(key: str, response: str, *, model: str | None = None) -> None:
+    """Guarda la respuesta de `key` y expulsa lo que sobre."""
+    from ...models import LLMResponse
+
+    if not response.strip():
+        return
+    now = timezone.now()
+    try:
+        LLMResponse.objects.update_or_create(
+            key=key,
+            defaults={
+                "llm_model": (model or settings.LLM_MODEL)[:100],
+                "response": response,
+                "size": len(response.encode("utf-8")),
+                "hits": 0,
+                "created_at": now,
+                "last_used_at": now,
+            },
+        )
+        _count("stored")
+        _evict()
+    except DatabaseError:
+        logger.warning("[llm] Cache de respuestas no disponible (escritura)")
+
+
+def forget(key: str) -> None:
+    """Borra una respuesta que no sirvió (p. ej. JSON que no se pudo parsear)."""
+    from ...models import LLMResponse
+
+    try:
+        LLMResponse.objects.filter(pk=key).delete()
+    except DatabaseError:
+        logger.warning("[llm] Cache de respuestas no disponible (borrado)")
+
+
+def _evict() -> None:
+    """Borra las caducadas y, por LRU, las que pasen de los límites de número y tamaño."""
+    from ...models import LLMResponse
+
+    evicted, _ = LLMResponse.objects.filter(created_at__lt=_expired_before()).delete()
+
+    max_entries = getattr(settings, "LLM_RESPONSE_CACHE_MAX_ENTRIES", 2000)
+    if max_entries > 0:
+        stale = list(
+            LLMResponse.objects.order_by("-last_used_at").values_list("pk", flat=True)[max_entries:]
+        )
+        if stale:
+            evicted += LLMResponse.objects.filter(pk__in=stale).delete()[0]
+
+    max_size = getattr(settings, "LLM_RESPONSE_CACHE_MAX_MB", 32) * 1024 * 1024
+    if max_size > 0:
+        excess = (LLMResponse.objects.aggregate(total=Sum("size"))["total"] or 0) - max_size
+        if excess > 0:
+            stale = []
+            for pk, size in LLMResponse.objects.order_by("last_used_at").values_list("pk", "size").iterator():
+                stale.append(pk)
+                excess -= size
+                if excess <= 0:
+                    break
+            evicted += LLMResponse.objects.filter(pk__in=stale).delete()[0]
+
+    if evicted:
+        _count("evicted", evicted)
+        logger.info("[llm] Cache de respuestas: %d expulsadas", evicted)
+
+
+def stats() -> dict:
+    """Aciertos/fallos de este proceso y estado de la cache compartida."""
+    from ...models import LLMResponse
+
+    with _stats_lock:
+        result = dict(_stats)
+    lookups = result["hits"] + result["misses"]
+    result["hit_rate"] = round(result["hits"] / lookups * 100, 1) if lookups else None
+    try:
+        totals = LLMResponse.objects.aggregate(total_hits=Sum("hits"), size=Sum("size"))
+        result["entries"] = LLMResponse.objects.count()
+        result["size"] = totals["size"] or 0
+        result["total_hits"] = totals["total_hits"] or 0
+    except DatabaseError:
+        result.update(entries=None, size=None, total_hits=None)
+    return result
+
+
+def format_stats() -> str:
+    with _stats_lock:
+        s = dict(_stats)
+    return f"{s['hits']} aciertos, {s['misses']} fallos, {s['stored']} guardadas, {s['evicted']} expulsadas"
@@ -8,6 +8,7 @@ from .internal import health_summary, container_shutdown
 from .site import (
     site_render,
     site_generate,
+    site_cancel_generation,
     site_download_zip,
     site_status,
     site_deploy,
@@ -34,6 +35,7 @@ __all__ = [
     "edit",
     "site_render",
     "site_generate",
+    "site_cancel_generation",
     "site_download_zip",
     "site_status",
     "site_deploy",
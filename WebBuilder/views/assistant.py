@@ -31,20 +31,23 @@ from django.urls import reverse
 from django.utils import timezone
 
 from ..forms import APIRequestForm
-from ..models import APIRequest
-from ..utils.analysis import build_analysis
+from ..models import APIRequest, PayloadBlob
+from ..utils.analysis import build_analysis, find_main_items
 from ..utils.analysis.helpers import get_by_path
-from ..utils.ingest.parsers import parse_raw, summarize_data
-from ..utils.ingest.url_reader import fetch_url, read_file
+from ..utils.ingest.pagination import crawl_pages
+from ..utils.ingest.parsers import parse_raw, parse_streamed, summarize_data
+from ..utils.ingest.url_reader import stream_file, stream_url
 from ..utils.llm.client import LLMError
 from ..utils.llm.llm_catalog import LLM_CATALOG
 from ..utils.llm.planner import PlanError, generate_site_plan
+from ..utils.llm.rate_limit import llm_user
+from .helpers import _build_request_analysis, _store_analysis
 
 
 # ────────────────────────── CONFIG ──────────────────────────────────
 
 CACHE_TIMEOUT = 3600  # 1h
-CACHE_KEY_PREFIX = "api_analysis"
+CACHE_KEY_PREFIX = "api_analysis_v2"  # v2: guarda ids de PayloadBlob, no el payload
 
 
 # ────────────────────────── HELPERS LLM ─────────────────────────────
@@ -106,16 +109,17 @@ def _call_llm_plan(
     examples = _build_examples(parsed_payload, main_path=main_path, available_keys=available_keys)
 
     try:
-        plan = generate_site_plan(
-            user_prompt=user_prompt or "",
-            available_keys=available_keys,
-            examples=examples,
-            main_collection_path=main_path,
-            retries=1,
-            model=llm_model,
-            base_url=llm_base_url,
-            api_key=llm_api_key,
-        )
+        with llm_user(api_request_obj.user_id):
+            plan = generate_site_plan(
+                user_prompt=user_prompt or "",
+                available_keys=available_keys,
+                examples=examples,
+                main_collection_path=main_path,
+                retries=1,
+                model=llm_model,
+                base_url=llm_base_url,
+                api_key=llm_api_key,
+            )
 
         if isinstance(plan, dict):
             plan["user_prompt"] = (user_prompt or "").strip()
@@ -272,7 +276,7 @@ def render_assistant(
 
     if api_request is not None and llm_plan is not None:
         context["preview_items"] = _build_preview_items(
-            api_request.parsed_data,
+            api_request.get_parsed_data(),
             analysis,
             llm_plan,
         )
@@ -304,8 +308,8 @@ def get_assistant(request):
     if api_request.field_mapping and isinstance(api_request.field_mapping, dict):
         saved_prompt = (api_request.field_mapping.get("user_prompt") or "").strip()
 
-    if api_request.parsed_data:
-        analysis = build_analysis(api_request.parsed_data, raw_text=api_request.raw_data or "")
+    if api_request.has_parsed_data:
+        analysis = _build_request_analysis(api_request)
         form = APIRequestForm(initial={
             "api_url": api_request.api_url,
             "user_prompt": saved_prompt,
@@ -364,13 +368,13 @@ def analyze_url(request):
             messages.error(request, str(e))
             return redirect("assistant")
 
-        analysis_result = build_analysis(api_request_obj.parsed_data, raw_text=api_request_obj.raw_data or "")
+        analysis_result = _build_request_analysis(api_request_obj)
 
         llm_plan, llm_error = _call_llm_plan(
             api_request_obj=api_request_obj,
             analysis_result=analysis_result,
             user_prompt=user_prompt,
-            parsed_payload=api_request_obj.parsed_data,
+            parsed_payload=api_request_obj.get_parsed_data(),
             llm_model=llm_model,
             llm_base_url=llm_base_url,
             llm_api_key=llm_api_key,
@@ -409,6 +413,10 @@ def analyze_url(request):
 
     cache_key = _get_cache_key(api_url)
     cached_data = cache.get(cache_key)
+    if cached_data and not PayloadBlob.all_exist(cached_data["raw_blob"], cached_data["parsed_blob"]):
+        # Se borró el último análisis que usaba esos blobs: se descarga de nuevo
+        cache.delete(cache_key)
+        cached_data = None
 
     # ── CACHE HIT ───────────────────────────────────────────────────
     if cached_data:
@@ -422,25 +430,28 @@ def analyze_url(request):
         )
 
         if not api_request_obj:
-            api_request_obj = APIRequest.objects.create(
+            # La fila nueva apunta a los mismos blobs: no se copia el payload
+            api_request_obj = APIRequest(
                 user=request.user,
                 api_url=api_url,
-                raw_data=cached_data["raw_text"],
-                parsed_data=cached_data["parsed_payload"],
+                ingest_meta=cached_data.get("ingest_meta"),
+                detected_format=cached_data.get("detected_format") or "",
                 response_summary=cached_data["response_summary"],
                 status="processed",
                 error_message="",
             )
+            api_request_obj.share_payload(cached_data["raw_blob"], cached_data["parsed_blob"])
+            if cached_data.get("analysis"):
+                _store_analysis(api_request_obj, cached_data["analysis"])
+            api_request_obj.save()
 
-        analysis_result = build_analysis(
-            cached_data["parsed_payload"],
-            raw_text=cached_data["raw_text"],
-        )
+        analysis_result = _build_request_analysis(api_request_obj)
+        parsed_payload = api_request_obj.get_parsed_data()
 
         llm_plan, llm_error = _call_llm_plan(
             api_request_obj=api_request_obj,
             analysis_result=analysis_result,
-            parsed_payload=cached_data["parsed_payload"],
+            parsed_payload=parsed_payload,
             user_prompt=user_prompt,
             llm_model=llm_model,
             llm_base_url=llm_base_url,
@@ -467,31 +478,51 @@ def analyze_url(request):
     uploaded_file = request.FILES.get("file_input")
 
     try:
+        links = {}
         if uploaded_file:
-            raw_text, fetch_summary = read_file(uploaded_file)
+            raw_text, fetch_summary, streamed = stream_file(uploaded_file)
             api_request_obj.input_type = "file"
         else:
-            raw_text, fetch_summary = fetch_url(api_url)
+            raw_text, fetch_summary, streamed, links = stream_url(api_url)
             api_request_obj.input_type = "url"
 
-        fmt, parsed_payload = parse_raw(raw_text)
-
-        analysis_result = build_analysis(parsed_payload, raw_text=raw_text)
-        parse_summary = summarize_data(fmt, parsed_payload)
+        # Los JSON grandes y los CSV llegan ya parseados en streaming (muestra + estadísticas)
+        ingest_meta = None
+        if streamed is not None:
+            fmt, parsed_payload, ingest_meta = parse_streamed(streamed)
+        else:
+            fmt, parsed_payload = parse_raw(raw_text)
+
+            # API paginada: se traen las páginas siguientes y se añaden a la colección
+            # principal antes de analizar (el análisis ve el dataset real, no una página)
+            if not uploaded_file and fmt == "json":
+                main_path = find_main_items(parsed_payload).get("path")
+                if main_path is not None:
+                    crawl = crawl_pages(api_url, parsed_payload, main_path, links=links)
+                    if crawl:
+                        fetch_summary += f" Paginación: {crawl['pages']} páginas (+{crawl['items_added']} items)."
+
+        analysis_result = build_analysis(parsed_payload, ingest_meta=ingest_meta, data_format=fmt)
+        parse_summary = summarize_data(fmt, parsed_payload, ingest_meta)
         response_summary = f"{fetch_summary} {parse_summary}"
 
-        api_request_obj.raw_data = raw_text
-        api_request_obj.parsed_data = parsed_payload
+        api_request_obj.set_payload(raw_text, parsed_payload)
+        api_request_obj.ingest_meta = ingest_meta
+        api_request_obj.detected_format = fmt
         api_request_obj.response_summary = response_summary
         api_request_obj.status = "processed"
         api_request_obj.error_message = ""
+        _store_analysis(api_request_obj, analysis_result)
         api_request_obj.save()
 
         cache.set(
             cache_key,
             {
-                "raw_text": raw_text,
-                "parsed_payload": parsed_payload,
+                "raw_blob": api_request_obj.raw_blob_id,
+                "parsed_blob": api_request_obj.parsed_blob_id,
+                "ingest_meta": ingest_meta,
+                "detected_format": fmt,
+                "analysis": analysis_result,
                 "response_summary": response_summary,
             },
             CACHE_TIMEOUT,
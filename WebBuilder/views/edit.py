@@ -24,9 +24,9 @@ from django.shortcuts import render, redirect
 from django.urls import reverse
 
 from ..models import APIRequest, GeneratedSite
-from ..utils.analysis import build_analysis
 from ..utils.analysis.helpers import get_by_path
-from .helpers import _get_fields_from_plan, _normalize_item
+from ..utils.analysis.sampling import pick_stratify_key, stratified_sample
+from .helpers import _build_request_analysis, _get_fields_from_plan, _normalize_item
 
 
 # ────────────────────────── helpers ─────────────────────────────────
@@ -38,7 +38,7 @@ def _normalize_site_type(value: str | None) -> str:
 
 
 def _get_available_keys_from_analysis(api_request: APIRequest) -> list[str]:
-    analysis = build_analysis(api_request.parsed_data, raw_text=api_request.raw_data or "")
+    analysis = _build_request_analysis(api_request)
     keys_info = analysis.get("keys") or {}
     return (keys_info.get("top") or [])[:30]
 
@@ -66,7 +66,7 @@ def edit(request, api_request_id: int):
         messages.error(request, "Este análisis no tiene schema del LLM todavía.")
         return redirect(reverse("assistant") + f"?api_request_id={api_request.id}")
 
-    if not api_request.parsed_data:
+    if not api_request.has_parsed_data:
         messages.error(request, "Este análisis no tiene datos parseados.")
         return redirect(reverse("assistant") + f"?api_request_id={api_request.id}")
 
@@ -92,7 +92,7 @@ def edit(request, api_request_id: int):
     plan.setdefault("fields", [])
 
     # Recalcular analysis para keys disponibles y main_path
-    analysis = build_analysis(api_request.parsed_data, raw_text=api_request.raw_data or "")
+    analysis = _build_request_analysis(api_request)
     main = analysis.get("main_collection") or {}
     main_path = main.get("path")
 
@@ -102,12 +102,13 @@ def edit(request, api_request_id: int):
     # Validar y limpiar fields del plan contra available_keys reales
     plan["fields"] = _validate_fields_against_keys(plan["fields"], available_keys)
 
-    # Items para preview
-    items = []
+    # Items para preview (y colección completa para muestrear al aceptar)
+    collection = []
     if main_path is not None:
-        node = get_by_path(api_request.parsed_data, main_path)
+        node = get_by_path(api_request.get_parsed_data(), main_path)
         if isinstance(node, list):
-            items = node[:12]
+            collection = node
+    items = collection[:12]
 
     # ──────────────── POST ────────────────────────────────────────────
     if request.method == "POST":
@@ -155,11 +156,14 @@ def edit(request, api_request_id: int):
             api_request.plan_accepted = True
             api_request.save(update_fields=["plan_accepted"])
 
-            # Sample items normalizados (de momento los seguimos calculando
-            # por si luego los reutilizas para el generator)
+            # Sample items normalizados para el generator: muestra variada de
+            # toda la colección (por categoría y por campos vacíos), no los 6 primeros
+            stratify_key = pick_stratify_key(fields, analysis.get("field_profile"))
             sample_items = [
                 _normalize_item(it, fields, index=idx)
-                for idx, it in enumerate(items[:6])
+                for idx, it in stratified_sample(
+                    collection, fields, stratify_key=stratify_key, seed=api_request.id,
+                )
             ]
 
             # Crear o recuperar GeneratedSite
@@ -198,30 +202,16 @@ def edit(request, api_request_id: int):
 
             site.save()
 
-            # Arrancar generación automáticamente
-            site.generation_status = "generating"
-            site.generation_error  = ""
-            site.project_files     = {}
-            site.save(update_fields=["generation_status", "generation_error", "project_files"])
-
-            import threading
-            from ..utils.generator.project_generator import generate_project_files
-
-            def _run():
-                try:
-                    files = generate_project_files(site)
-                    site.project_files     = files
-                    site.generation_status = "ready"
-                    site.generation_error  = ""
-                    site.save(update_fields=["project_files", "generation_status", "generation_error"])
-                except Exception as e:
-                    site.generation_status = "error"
-                    site.generation_error  = str(e)
-                    site.save(update_fields=["generation_status", "generation_error"])
-
-            threading.Thread(target=_run, daemon=True).start()
-
-            messages.success(request, "Plan aceptado. Generando el proyecto...")
+            # Arrancar generación automáticamente (la ejecuta generation_worker).
+            # Los pasos cuyas entradas no cambian se reutilizan salvo con "fresh".
+            # Con mode=fast se genera al momento sin LLM (luego se puede mejorar con IA).
+            from ..utils.generator.jobs import enqueue_generation, generate_fast
+            if request.POST.get("mode") == "fast":
+                generate_fast(site)
+                messages.success(request, "Plan aceptado. Versión rápida generada: puedes mejorarla con IA.")
+            else:
+                enqueue_generation(site, reuse_steps=not request.POST.get("fresh"))
+                messages.success(request, "Plan aceptado. Generando el proyecto...")
             return redirect("site_render", api_request_id=api_request.id)
 
     # ──────────────── GET — construir contexto ────────────────────────
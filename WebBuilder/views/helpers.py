@@ -5,13 +5,22 @@ Contiene:
   - _to_text: convierte cualquier valor a string truncado.
   - _get_fields_from_plan: extrae la lista de fields de un plan.
   - _normalize_item: convierte un item del dataset en un dict plano con las keys del schema.
+  - _build_request_analysis: análisis de un APIRequest guardado (persistido y reutilizado
+    mientras no cambie el payload).
+  - _store_analysis: guarda en el APIRequest un análisis recién calculado.
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
 from typing import Any
 
+from ..utils.analysis import build_analysis
+
+# Súbelo si cambia la salida de build_analysis: invalida los análisis guardados
+ANALYSIS_VERSION = 2
+
 
 def _to_text(value: Any, *, max_len: int = 180) -> str:
     if value is None:
@@ -47,3 +56,41 @@ def _normalize_item(raw_item: Any, fields: list[dict], *, index: int, max_len: i
         key = field["key"]
         result[key] = _to_text(raw_item.get(key), max_len=max_len)
     return result
+
+
+def _analysis_key(api_request) -> str:
+    """
+    Clave del análisis: solo depende del payload parseado (hash del blob),
+    del formato y de las estadísticas del ingest.
+    """
+    meta = json.dumps(api_request.ingest_meta, sort_keys=True, default=str) if api_request.ingest_meta else ""
+    source = f"{ANALYSIS_VERSION}|{api_request.parsed_blob_id or api_request.id}|{api_request.detected_format}|{meta}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def _store_analysis(api_request, analysis: dict) -> None:
+    """Asigna el análisis y su clave al APIRequest (sin guardar)."""
+    api_request.analysis = analysis
+    api_request.analysis_key = _analysis_key(api_request)
+
+
+def _build_request_analysis(api_request) -> dict:
+    """
+    Devuelve el análisis de un APIRequest ya guardado.
+    Si el análisis persistido corresponde al payload actual se devuelve sin
+    cargar parsed_data; si no, se recalcula una vez y se guarda.
+    El formato se lee de api_request.detected_format (se guarda al ingerir y
+    la migración 0027 lo rellena en las filas antiguas).
+    """
+    if api_request.analysis and api_request.analysis_key == _analysis_key(api_request):
+        return api_request.analysis
+
+    analysis = build_analysis(
+        api_request.get_parsed_data(),
+        ingest_meta=api_request.ingest_meta,
+        data_format=api_request.detected_format or None,
+    )
+    _store_analysis(api_request, analysis)
+    if api_request.pk:
+        api_request.save(update_fields=["analysis", "analysis_key"])
+    return api_request.analysis
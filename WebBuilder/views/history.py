@@ -5,9 +5,11 @@ Vistas de historial
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.core.cache import cache
 from django.core.paginator import Paginator
 
-from ..models import APIRequest, GeneratedSite
+from ..models import APIRequest, GeneratedSite, PayloadBlob
+from .assistant import _get_cache_key
 
 
 @login_required
@@ -75,7 +77,12 @@ def delete_analysis(request, api_request_id):
         return redirect("history_analysis")
 
     api_request = get_object_or_404(APIRequest, id=api_request_id, user=request.user)
+    blob_ids = (api_request.raw_blob_id, api_request.parsed_blob_id)
     api_request.delete()
+    # Solo se borran si ningún otro análisis los usa; entonces la cache de
+    # análisis de esa URL apunta a blobs que ya no existen
+    if PayloadBlob.release(*blob_ids):
+        cache.delete(_get_cache_key(api_request.api_url))
     messages.success(request, "Análisis eliminado correctamente.")
     return redirect("history_analysis")
 
@@ -14,6 +14,7 @@ from django.shortcuts import render
 from django.utils import timezone
 
 from ..models import APIRequest, GeneratedSite, GenerationLog
+from ..utils.llm import response_cache
 
 
 @user_passes_test(lambda u: u.is_staff, login_url='login')
@@ -219,6 +220,7 @@ def metrics_view(request):
         'model_stats':       model_stats,
         'error_steps':       error_steps,
         'steps_stats':       steps_stats,
+        'response_cache':    response_cache.stats(),
         # Generaciones
         'recent_sites':      recent_sites,
         'all_sites':         all_sites,
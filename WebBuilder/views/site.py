@@ -12,46 +12,13 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_GET, require_POST
 
 from ..models import APIRequest, GeneratedSite
-from ..utils.generator.project_generator import generate_project_files
+from ..utils.generator.jobs import cancel_generation, enqueue_generation, generate_fast
 
 from django.views.decorators.http import require_GET, require_POST
 
 import requests as http_requests
 from django.conf import settings
 
-# ---------------------------------------------------------------------------
-# Generación (sin cambios respecto al original)
-# ---------------------------------------------------------------------------
-
-import time  # añade esto arriba del todo junto a los otros imports
-
-def _run_generation(site_id: int):
-    from ..models import GeneratedSite
-    from ..utils.generator.notifications import notify_generation_done  # añade esto
-
-    start_time = time.time()  # añade esto
-
-    try:
-        site = GeneratedSite.objects.get(pk=site_id)
-        files = generate_project_files(site)
-        site.project_files = files
-        site.generation_status = "ready"
-        site.generation_error = ""
-        site.save(update_fields=["project_files", "generation_status", "generation_error"])
-
-        # Notificar a n8n
-        duration = int(time.time() - start_time)  # añade esto
-        notify_generation_done(site, duration_seconds=duration)  # añade esto
-
-    except Exception as e:
-        try:
-            site = GeneratedSite.objects.get(pk=site_id)
-            site.generation_status = "error"
-            site.generation_error = str(e)
-            site.save(update_fields=["generation_status", "generation_error"])
-        except Exception:
-            pass
-
 # Recojo los campos necesarios para las estadisitcas
 @login_required
 def site_render(request, api_request_id: int):
@@ -87,6 +54,10 @@ def site_render(request, api_request_id: int):
     retries = logs.filter(had_retry=True).count()
     consistency_errors = sum(len(l.consistency_errors) for l in logs)
 
+    # — ¿Los archivos actuales salen de la generación rápida? (se ofrece mejorarlos con IA)
+    last_job = site.generation_jobs.filter(status="done").order_by("-created_at").first()
+    fast_version = bool(last_job and last_job.mode == "fast")
+
     # — Desglose de archivos por tipo
     files = site.project_files or {}
     files_py   = sum(1 for k in files if k.endswith(".py"))
@@ -107,6 +78,7 @@ def site_render(request, api_request_id: int):
         "files_py":            files_py,
         "files_html":          files_html,
         "files_other":         files_other,
+        "fast_version":        fast_version,
     })
 
 @login_required
@@ -129,14 +101,27 @@ def site_generate(request, api_request_id: int):
             label="Antes de regenerar",
         )
 
-    site.generation_status = "generating"
-    site.generation_error = ""
-    site.project_files = {}
-    site.save(update_fields=["generation_status", "generation_error", "project_files"])
+    # mode=fast: versión determinista sin LLM, al momento.
+    # Si no, la generación la ejecuta el proceso generation_worker;
+    # "fresh" fuerza a repetir todos los pasos (sin reutilizar la cache de pasos)
+    if request.POST.get("mode") == "fast":
+        generate_fast(site)
+    else:
+        enqueue_generation(site, reuse_steps=not request.POST.get("fresh"))
+
+    return redirect("site_render", api_request_id=api_request.id)
 
-    thread = threading.Thread(target=_run_generation, args=(site.pk,), daemon=True)
-    thread.start()
 
+@login_required
+@require_POST
+def site_cancel_generation(request, api_request_id: int):
+    api_request = get_object_or_404(APIRequest, id=api_request_id, user=request.user)
+    site = get_object_or_404(GeneratedSite, project_source=api_request)
+
+    if cancel_generation(site):
+        messages.success(request, "Generación cancelada.")
+    else:
+        messages.error(request, "No hay ninguna generación en curso.")
     return redirect("site_render", api_request_id=api_request.id)
 
 @login_required
@@ -429,6 +414,7 @@ def site_refine_file(request, api_request_id: int):
     import re
     from ..models import SiteVersion
     from ..utils.llm.client import chat_completion, LLMError
+    from ..utils.llm.rate_limit import llm_user
 
     api_request = get_object_or_404(APIRequest, id=api_request_id, user=request.user)
     site = get_object_or_404(GeneratedSite, project_source=api_request)
@@ -470,11 +456,12 @@ def site_refine_file(request, api_request_id: int):
     user_identify = f"Archivos disponibles:\n{file_list}\n\nPetición: {message}"
 
     try:
-        target_path = chat_completion(
-            user_text=user_identify,
-            system_text=system_identify,
-            temperature=0.0,
-        ).strip().strip('"').strip("'")
+        with llm_user(request.user.pk):
+            target_path = chat_completion(
+                user_text=user_identify,
+                system_text=system_identify,
+                temperature=0.0,
+            ).strip().strip('"').strip("'")
     except Exception as e:
         return JsonResponse({"ok": False, "error": f"Error identificando archivo: {e}"}, status=500)
 
@@ -525,11 +512,12 @@ def site_refine_file(request, api_request_id: int):
     )
 
     try:
-        new_content = chat_completion(
-            user_text=user_rewrite,
-            system_text=system_rewrite,
-            temperature=0.3,
-        )
+        with llm_user(request.user.pk):
+            new_content = chat_completion(
+                user_text=user_rewrite,
+                system_text=system_rewrite,
+                temperature=0.3,
+            )
     except Exception as e:
         return JsonResponse({"ok": False, "error": f"Error del LLM: {e}"}, status=500)
 
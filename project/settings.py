@@ -194,6 +194,43 @@ SESSION_COOKIE_AGE = 60 * 60 * 24 * 14
 LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://openrouter.ai/api/v1")
 LLM_API_KEY = os.getenv("LLM_API_KEY", "")
 LLM_MODEL = os.getenv("LLM_MODEL", "meta-llama/llama-3.3-70b-instruct:free")
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"   # Respuestas por SSE: progreso por tokens y corte temprano
+# Límite compartido por todos los workers, por proveedor/modelo (0 = sin límite).
+# 20/min es el de los modelos :free de OpenRouter; los 429 con Retry-After se respetan siempre.
+LLM_RATE_LIMIT_RPM = int(os.getenv("LLM_RATE_LIMIT_RPM", "20"))    # Peticiones por minuto
+LLM_RATE_LIMIT_TPM = int(os.getenv("LLM_RATE_LIMIT_TPM", "0"))     # Tokens por minuto (estimados)
+# Respuestas de las llamadas con temperatura 0 guardadas en la BD (compartidas entre workers)
+LLM_RESPONSE_CACHE = os.getenv("LLM_RESPONSE_CACHE", "1") == "1"
+LLM_RESPONSE_CACHE_TTL = int(os.getenv("LLM_RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))  # Vida de cada respuesta (s)
+LLM_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("LLM_RESPONSE_CACHE_MAX_ENTRIES", "2000"))  # 0 = sin límite
+LLM_RESPONSE_CACHE_MAX_MB = int(os.getenv("LLM_RESPONSE_CACHE_MAX_MB", "32"))            # 0 = sin límite
+
+# Cache compartida entre workers (ficheros comprimidos en disco, con límite de tamaño y expulsión LRU)
+CACHES = {
+    "default": {
+        "BACKEND": "WebBuilder.utils.cache_backend.SizeBoundedFileCache",
+        "LOCATION": os.getenv("CACHE_DIR", str(BASE_DIR / ".cache")),
+        "TIMEOUT": 3600,
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "5000")),
+            "MAX_SIZE": int(os.getenv("CACHE_MAX_MB", "256")) * 1024 * 1024,
+        },
+    }
+}
+
+# Ingesta: páginas que se descargan de APIs paginadas y descargas simultáneas por host
+INGEST_MAX_PAGES = int(os.getenv("INGEST_MAX_PAGES", "5"))
+INGEST_PAGE_CONCURRENCY = int(os.getenv("INGEST_PAGE_CONCURRENCY", "4"))
+
+# Cola de generación (manage.py generation_worker)
+GENERATION_MAX_CONCURRENCY = int(os.getenv("GENERATION_MAX_CONCURRENCY", "4"))    # Generaciones simultáneas entre todos los workers
+GENERATION_WORKER_THREADS = int(os.getenv("GENERATION_WORKER_THREADS", "2"))      # Hilos por proceso worker
+GENERATION_PAGE_CONCURRENCY = int(os.getenv("GENERATION_PAGE_CONCURRENCY", "4"))  # Templates de página generados a la vez
+GENERATION_MAX_ATTEMPTS = int(os.getenv("GENERATION_MAX_ATTEMPTS", "2"))
+GENERATION_RETRY_DELAY = int(os.getenv("GENERATION_RETRY_DELAY", "60"))           # Segundos (x intento) antes de reintentar
+GENERATION_HEARTBEAT_SECONDS = int(os.getenv("GENERATION_HEARTBEAT_SECONDS", "15"))
+GENERATION_ORPHAN_AFTER = int(os.getenv("GENERATION_ORPHAN_AFTER", "180"))        # Sin latido en este tiempo => worker muerto
+GENERATION_STEP_CACHE_TTL = int(os.getenv("GENERATION_STEP_CACHE_TTL", str(7 * 24 * 3600)))  # Vida de los pasos cacheados (s)
 
 # n8n deploy
 N8N_DEPLOY_WEBHOOK = os.getenv("N8N_DEPLOY_WEBHOOK", "http://localhost:5678/webhook/webbuilder-deploy")